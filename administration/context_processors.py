@@ -1,17 +1,24 @@
+from django.utils.functional import SimpleLazyObject
+
 from .models import AdminNotification
 from .utils import get_registration_config
 
+
 def admin_notifications(request):
     """
-    Context processor to make admin notifications and settings available globally
+    Context processor to make admin notifications and settings available globally.
+    Both values are lazy, so only templates that use them pay for the query
+    (and the user lookup) or the config read.
     """
-    context = {}
-    if request.user.is_authenticated and request.user.role == 'ADMIN':
-        notifications = AdminNotification.objects.filter(is_read=False)[:5]
-        context['admin_notifications'] = notifications
-    
-    # Global registration setting
-    config = get_registration_config()
-    context['registration_enabled'] = config.get('registration_enabled', True)
-    
-    return context
+    def notifications():
+        if request.user.is_authenticated and request.user.role == 'ADMIN':
+            return list(AdminNotification.objects.filter(is_read=False)[:5])
+        return []
+
+    def registration_enabled():
+        return get_registration_config().get('registration_enabled', True)
+
+    return {
+        'admin_notifications': SimpleLazyObject(notifications),
+        'registration_enabled': SimpleLazyObject(registration_enabled),
+    }
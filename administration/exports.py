@@ -0,0 +1,218 @@
+import csv
+import zipfile
+
+from django.db.models import Sum
+
+from cases.models import Case, Heir, Asset, AssetComponent, Debt, Will, EstateObligationAllocation, PaymentSettlement
+
+EXPORT_CHUNK_SIZE = 500
+CSV_BOM = '\ufeff'
+
+
+class Echo:
+    """
+    File-like object whose write() just hands the value back, so csv.writer
+    can produce rows that are yielded straight into a StreamingHttpResponse.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _user_label(user):
+    if not user:
+        return 'غير معين'
+    return user.full_name or user.username
+
+
+def _deceased_label(case):
+    deceased = getattr(case, 'deceased', None)
+    return deceased.name if deceased else 'غير مدخل'
+
+
+def _heir_label(heir):
+    return heir.name if heir else '-'
+
+
+def _case_rows():
+    yield ['رقم القضية', 'المتوفى', 'القاضي', 'الحالة', 'تاريخ الإنشاء']
+    cases = (
+        Case.objects.select_related('judge', 'deceased')
+        .order_by('-created_at')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for case in cases:
+        yield [
+            case.display_case_number,
+            _deceased_label(case),
+            _user_label(case.judge),
+            case.get_status_display(),
+            case.created_at.strftime('%Y-%m-%d'),
+        ]
+
+
+def _heir_rows():
+    yield ['رقم القضية', 'الوريث', 'صلة القرابة', 'محجوب', 'نسبة الإرث %', 'قيمة النصيب', 'القيمة المخصصة', 'حالة القبول']
+    heirs = (
+        Heir.objects.select_related('case')
+        .order_by('case_id', 'id')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for heir in heirs:
+        yield [
+            heir.case.display_case_number,
+            heir.name,
+            heir.get_relationship_display(),
+            'نعم' if heir.is_blocked else 'لا',
+            heir.share_percentage,
+            heir.share_value,
+            heir.allocated_share,
+            heir.get_acceptance_status_display(),
+        ]
+
+
+def _asset_rows():
+    yield ['رقم القضية', 'النوع', 'الأصل', 'الجزء', 'القيمة', 'الالتزامات', 'مخصص لـ', 'مباع من قبل الوريث']
+    obligation_totals = {}
+    for row in EstateObligationAllocation.objects.values('asset_id', 'component_id').annotate(total=Sum('allocated_amount')):
+        if row['component_id']:
+            obligation_totals[('component', row['component_id'])] = row['total']
+        elif row['asset_id']:
+            obligation_totals[('asset', row['asset_id'])] = row['total']
+
+    assets = (
+        Asset.objects.select_related('case', 'assigned_to')
+        .order_by('case_id', 'id')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for asset in assets:
+        yield [
+            asset.case.display_case_number,
+            asset.get_asset_type_display(),
+            asset.description,
+            '',
+            asset.value,
+            obligation_totals.get(('asset', asset.id), 0),
+            _heir_label(asset.assigned_to),
+            'نعم' if asset.is_sold_by_heir else 'لا',
+        ]
+
+    components = (
+        AssetComponent.objects.select_related('asset__case', 'assigned_to')
+        .order_by('asset__case_id', 'asset_id', 'id')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for component in components:
+        yield [
+            component.asset.case.display_case_number,
+            component.asset.get_asset_type_display(),
+            component.asset.description,
+            component.description,
+            component.value,
+            obligation_totals.get(('component', component.id), 0),
+            _heir_label(component.assigned_to),
+            'نعم' if component.is_sold_by_heir else 'لا',
+        ]
+
+
+def _obligation_rows():
+    yield ['رقم القضية', 'النوع', 'الوصف', 'المبلغ', 'المخصص', 'المتبقي']
+    for model, kind in ((Debt, 'دين'), (Will, 'وصية')):
+        obligations = (
+            model.objects.select_related('case')
+            .annotate(allocated_total=Sum('obligation_allocations__allocated_amount'))
+            .order_by('case_id', 'id')
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        for obligation in obligations:
+            allocated = obligation.allocated_total or 0
+            remaining = obligation.amount - allocated
+            yield [
+                obligation.case.display_case_number,
+                kind,
+                obligation.description,
+                obligation.amount,
+                allocated,
+                remaining if remaining > 0 else 0,
+            ]
+
+
+def _settlement_rows():
+    yield ['رقم القضية', 'الدافع', 'المستلم', 'المبلغ', 'السبب', 'تأكيد الوريث', 'تأكيد المستلم', 'استلام القاضي', 'التسليم للمالك', 'التاريخ']
+    settlements = (
+        PaymentSettlement.objects.select_related('case', 'payer', 'original_owner')
+        .order_by('case_id', 'id')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for settlement in settlements:
+        yield [
+            settlement.case.display_case_number,
+            _heir_label(settlement.payer),
+            settlement.original_owner.name if settlement.original_owner else 'التركة',
+            settlement.amount,
+            settlement.reason,
+            'نعم' if settlement.heir_confirmed_payment else 'لا',
+            'نعم' if settlement.receiver_confirmed_payment else 'لا',
+            'نعم' if settlement.is_paid_to_judge else 'لا',
+            'نعم' if settlement.is_delivered_to_owner else 'لا',
+            settlement.created_at.strftime('%Y-%m-%d'),
+        ]
+
+
+EXPORT_DATASETS = {
+    'cases': ('monthly_operations.csv', _case_rows),
+    'heirs': ('heirs_shares.csv', _heir_rows),
+    'assets': ('assets.csv', _asset_rows),
+    'obligations': ('obligations.csv', _obligation_rows),
+    'settlements': ('settlements.csv', _settlement_rows),
+}
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield CSV_BOM.encode('utf-8')
+    for row in rows:
+        yield writer.writerow(row).encode('utf-8')
+
+
+class _ZipStream:
+    """
+    Write-only sink for zipfile: collects compressed bytes until the bundle
+    generator drains them, so the archive never sits fully in memory.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return b''.join(chunks)
+
+
+def iter_zip_bundle(dataset_names=None):
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name in dataset_names or EXPORT_DATASETS:
+            filename, rows = EXPORT_DATASETS[name]
+            with archive.open(filename, mode='w', force_zip64=True) as entry:
+                for chunk in iter_csv(rows()):
+                    entry.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+            data = stream.drain()
+            if data:
+                yield data
+    yield stream.drain()
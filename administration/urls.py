@@ -23,6 +23,8 @@ urlpatterns = [
     path('users/<int:user_id>/reject/', views.reject_user, name='reject_user'),
     path('marketplace/toggle/<int:listing_id>/', views.toggle_listing, name='toggle_listing'),
     path('export/csv/', views.export_cases_csv, name='export_csv'),
+    path('export/csv/<str:dataset>/', views.export_dataset_csv, name='export_dataset_csv'),
+    path('export/bundle/', views.export_bundle_zip, name='export_bundle'),
     path('export/print/', views.report_print_view, name='report_print'),
     path('users/management/', views.user_management, name='user_management'),
     path('users/create/', views.create_user, name='create_user'),
@@ -1,21 +1,47 @@
 import json
 import os
+import threading
 from django.conf import settings
 
 CONFIG_FILE = os.path.join(settings.BASE_DIR, 'registration_config.json')
+DEFAULT_CONFIG = {'registration_enabled': True}
 
-def get_registration_config():
-    if not os.path.exists(CONFIG_FILE):
-        return {'registration_enabled': True}
-    
+# In-process copy of the config file, keyed by its stat signature. Every worker
+# re-reads the file once after any worker rewrites it (os.replace gives it a new
+# inode and mtime), so a toggle is picked up everywhere on the next request.
+_cache = {'signature': None, 'config': DEFAULT_CONFIG}
+_lock = threading.Lock()
+
+
+def _signature():
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return {'registration_enabled': True}
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def get_registration_config():
+    signature = _signature()
+    if signature != _cache['signature']:
+        with _lock:
+            if signature is None:
+                config = DEFAULT_CONFIG
+            else:
+                try:
+                    with open(CONFIG_FILE, 'r') as f:
+                        config = json.load(f)
+                except (OSError, ValueError):
+                    config = DEFAULT_CONFIG
+            _cache['signature'], _cache['config'] = signature, config
+    return dict(_cache['config'])
+
 
 def set_registration_config(enabled):
     config = {'registration_enabled': enabled}
-    with open(CONFIG_FILE, 'w') as f:
+    # Write-then-rename so other workers never read a half-written file.
+    tmp_path = f"{CONFIG_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(config, f)
+    os.replace(tmp_path, CONFIG_FILE)
     return config
@@ -3,18 +3,24 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.db.models import Avg, Exists, OuterRef, Q, Sum, Count, Subquery
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.core.exceptions import ObjectDoesNotExist
-import csv
 from .models import AdminNotification, FiqhBook
+from .exports import EXPORT_DATASETS, iter_csv, iter_zip_bundle
 from .forms import FiqhBookForm, AdminUserCreationForm, AdminCaseCreationForm
 from cases.models import Case, Heir, Asset, PublicAssetListing, HeirAssetSelection, AssetComponent, Deceased
 from users.models import Feedback
 from .utils import get_registration_config, set_registration_config
+from jobs.services import enqueue_job
 
 User = get_user_model()
 
 
+def _queue_book_indexing(request, book_id):
+    # One job per book: the default per-task dedupe would swallow other books' jobs.
+    enqueue_job('chat_bot.sync_fiqh_book', user=request.user, dedupe=False, book_id=book_id)
+
+
 def _admin_guard(request):
     if request.user.role != 'ADMIN':
         return redirect('dashboard:index')
@@ -665,22 +671,29 @@ def toggle_listing(request, listing_id):
 def export_cases_csv(request):
     if request.user.role != 'ADMIN':
         return redirect('users:dashboard')
-        
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response['Content-Disposition'] = 'attachment; filename="monthly_operations.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['رقم القضية', 'القاضي', 'الحالة', 'تاريخ الإنشاء'])
-    
-    cases = Case.objects.all().order_by('-created_at')
-    for case in cases:
-        writer.writerow([
-            case.case_number,
-            (case.judge.full_name or case.judge.username) if case.judge else 'غير معين',
-            case.get_status_display(),
-            case.created_at.strftime('%Y-%m-%d')
-        ])
-    
+
+    return export_dataset_csv(request, 'cases')
+
+@login_required
+def export_dataset_csv(request, dataset):
+    if request.user.role != 'ADMIN':
+        return redirect('users:dashboard')
+
+    if dataset not in EXPORT_DATASETS:
+        raise Http404('نوع التصدير غير معروف.')
+
+    filename, rows = EXPORT_DATASETS[dataset]
+    response = StreamingHttpResponse(iter_csv(rows()), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+def export_bundle_zip(request):
+    if request.user.role != 'ADMIN':
+        return redirect('users:dashboard')
+
+    response = StreamingHttpResponse(iter_zip_bundle(), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="monthly_operations_bundle.zip"'
     return response
 
 @login_required
@@ -880,8 +893,9 @@ def upload_fiqh_book(request):
     if request.method == 'POST':
         form = FiqhBookForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'تم رفع الكتاب الفقهي بنجاح.')
+            book = form.save()
+            _queue_book_indexing(request, book.id)
+            messages.success(request, 'تم رفع الكتاب الفقهي بنجاح، وستتم إضافته للمساعد الذكي خلال دقائق.')
             return redirect('dashboard:library')
     else:
         form = FiqhBookForm()
@@ -898,6 +912,8 @@ def edit_fiqh_book(request, book_id):
         form = FiqhBookForm(request.POST, request.FILES, instance=book)
         if form.is_valid():
             form.save()
+            if 'pdf_file' in form.changed_data:
+                _queue_book_indexing(request, book.id)
             messages.success(request, f'تم تحديث بيانات الكتاب: {book.title} بنجاح.')
             return redirect('dashboard:library')
     else:
@@ -912,6 +928,8 @@ def delete_fiqh_book(request, book_id):
     
     book = get_object_or_404(FiqhBook, id=book_id)
     title = book.title
+    book_id = book.id
     book.delete()
+    _queue_book_indexing(request, book_id)
     messages.error(request, f'تم حذف الكتاب: {title} نهائياً.')
     return redirect('dashboard:library')
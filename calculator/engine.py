@@ -215,7 +215,13 @@ class InheritanceEngine:
         husband_present = get_count([Heir.Relationship.HUSBAND]) > 0
         wife_present = get_count([Heir.Relationship.WIFE]) > 0
         
-        has_siblings_multiple_or_mix = len([h for h in self.active_heirs if 'BROTHER' in h.relationship or 'SISTER' in h.relationship]) > 1
+        # Two or more siblings of any line reduce the mother to 1/6, even when the father blocks them.
+        siblings = [
+            Heir.Relationship.BROTHER, Heir.Relationship.SISTER,
+            Heir.Relationship.BROTHER_FATHER, Heir.Relationship.SISTER_FATHER,
+            Heir.Relationship.BROTHER_MOTHER, Heir.Relationship.SISTER_MOTHER
+        ]
+        has_siblings_multiple_or_mix = len([h for h in self.heirs if not h.is_blocked and h.relationship in siblings]) > 1
 
         total_faraid_share = Decimal(0)
 
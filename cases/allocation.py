@@ -0,0 +1,220 @@
+from decimal import Decimal
+
+CENT = Decimal("0.01")
+
+
+def _to_cents(amount):
+    return int((Decimal(str(amount)) / CENT).to_integral_value())
+
+
+def _from_cents(cents):
+    return (Decimal(cents) * CENT).quantize(CENT)
+
+
+class AllocationSolver:
+    """
+    Assigns indivisible estate items (whole assets or components) to heirs so
+    that the cash needed to equalize everyone to their legal share is minimal.
+
+    The objective is the total absolute deviation sum(|allocated - share|);
+    when item and share totals match, the equalization cash paid between heirs
+    is half of it. Small cases are solved exactly with branch-and-bound, large
+    ones (or ones that exhaust the node budget) keep the best greedy +
+    local-search answer.
+
+    The budget is counted in search nodes rather than seconds so the same
+    estate always yields the same proposal: the judge's preview and the
+    later apply are solved separately and compared by fingerprint.
+    """
+
+    EXACT_ITEM_LIMIT = 20
+    # About 50 ms of search in CPython.
+    NODE_LIMIT = 20000
+    SWAP_ITEM_LIMIT = 400
+
+    def __init__(self, items, targets):
+        # items: {item_key: value}, targets: {heir_id: share_value}
+        self.item_keys = sorted(items, key=lambda key: (-_to_cents(items[key]), str(key)))
+        self.values = [_to_cents(items[key]) for key in self.item_keys]
+        self.heir_ids = list(targets)
+        self.targets = [_to_cents(targets[heir_id]) for heir_id in self.heir_ids]
+        self.nodes = 0
+
+    def solve(self):
+        if not self.heir_ids:
+            return self._result([], is_optimal=not self.item_keys, method="none")
+
+        owners = self._greedy()
+        owners = self._local_search(owners)
+        method = "heuristic"
+        is_optimal = False
+
+        if self._deviation(self._allocated(owners)) <= abs(sum(self.values) - sum(self.targets)):
+            # No assignment can deviate less than items and shares differ in total.
+            is_optimal = True
+        elif len(self.item_keys) <= self.EXACT_ITEM_LIMIT:
+            exact_owners, completed = self._branch_and_bound(owners)
+            owners = exact_owners
+            if completed:
+                method = "exact"
+                is_optimal = True
+
+        return self._result(owners, is_optimal=is_optimal, method=method)
+
+    def _deviation(self, allocated):
+        return sum(abs(a - t) for a, t in zip(allocated, self.targets))
+
+    def _allocated(self, owners):
+        allocated = [0] * len(self.heir_ids)
+        for index, owner in enumerate(owners):
+            allocated[owner] += self.values[index]
+        return allocated
+
+    def _greedy(self):
+        # Largest item first, always to the heir furthest below their share.
+        allocated = [0] * len(self.heir_ids)
+        owners = []
+        for value in self.values:
+            owner = max(range(len(self.heir_ids)), key=lambda j: (self.targets[j] - allocated[j], -j))
+            allocated[owner] += value
+            owners.append(owner)
+        return owners
+
+    def _local_search(self, owners):
+        owners = list(owners)
+        allocated = self._allocated(owners)
+        heir_range = range(len(self.heir_ids))
+
+        def delta(j, change):
+            return abs(allocated[j] + change - self.targets[j]) - abs(allocated[j] - self.targets[j])
+
+        improved = True
+        while improved:
+            improved = False
+            # Moves: hand one item to another heir.
+            for index, value in enumerate(self.values):
+                src = owners[index]
+                best_gain, best_dst = 0, None
+                for dst in heir_range:
+                    if dst == src:
+                        continue
+                    gain = delta(src, -value) + delta(dst, value)
+                    if gain < best_gain:
+                        best_gain, best_dst = gain, dst
+                if best_dst is not None:
+                    allocated[src] -= value
+                    allocated[best_dst] += value
+                    owners[index] = best_dst
+                    improved = True
+
+            if len(self.values) > self.SWAP_ITEM_LIMIT:
+                continue
+
+            # Swaps: exchange two items between heirs.
+            for i in range(len(self.values)):
+                for k in range(i + 1, len(self.values)):
+                    a, b = owners[i], owners[k]
+                    diff = self.values[i] - self.values[k]
+                    if a == b or diff == 0:
+                        continue
+                    if delta(a, -diff) + delta(b, diff) < 0:
+                        allocated[a] -= diff
+                        allocated[b] += diff
+                        owners[i], owners[k] = b, a
+                        improved = True
+        return owners
+
+    def _branch_and_bound(self, incumbent):
+        heir_count = len(self.heir_ids)
+        suffix = [0] * (len(self.values) + 1)
+        for index in range(len(self.values) - 1, -1, -1):
+            suffix[index] = suffix[index + 1] + self.values[index]
+
+        best = {"owners": list(incumbent), "cost": self._deviation(self._allocated(incumbent))}
+        allocated = [0] * heir_count
+        owners = [0] * len(self.values)
+        self.nodes = 0
+
+        def lower_bound(index):
+            over = deficit = 0
+            for a, t in zip(allocated, self.targets):
+                if a > t:
+                    over += a - t
+                else:
+                    deficit += t - a
+            # Remaining items can close at most suffix[index] of the deficit.
+            return over + max(0, deficit - suffix[index])
+
+        def search(index):
+            self.nodes += 1
+            if self.nodes > self.NODE_LIMIT:
+                return False
+            if lower_bound(index) >= best["cost"]:
+                return True
+            if index == len(self.values):
+                best["cost"] = self._deviation(allocated)
+                best["owners"] = list(owners)
+                return True
+
+            value = self.values[index]
+            tried = set()
+            order = sorted(range(heir_count), key=lambda j: allocated[j] - self.targets[j])
+            for j in order:
+                # Heirs in the same state are interchangeable for the rest of the search.
+                state = (allocated[j], self.targets[j])
+                if state in tried:
+                    continue
+                tried.add(state)
+                allocated[j] += value
+                owners[index] = j
+                completed = search(index + 1)
+                allocated[j] -= value
+                if not completed:
+                    return False
+            return True
+
+        completed = search(0)
+        return best["owners"], completed
+
+    def _result(self, owners, is_optimal, method):
+        allocated = self._allocated(owners)
+        differences = [a - t for a, t in zip(allocated, self.targets)]
+        transfers = self._transfers(differences)
+        return {
+            "assignment": {key: self.heir_ids[owner] for key, owner in zip(self.item_keys, owners)},
+            "allocated": {heir_id: _from_cents(a) for heir_id, a in zip(self.heir_ids, allocated)},
+            "differences": {heir_id: _from_cents(d) for heir_id, d in zip(self.heir_ids, differences)},
+            "total_deviation": _from_cents(sum(abs(d) for d in differences)),
+            "transfers": transfers,
+            "settlement_total": sum((transfer["amount"] for transfer in transfers), Decimal("0.00")),
+            "is_optimal": is_optimal,
+            "method": method,
+        }
+
+    def _transfers(self, differences):
+        """
+        Pair over-allocated heirs with under-allocated ones. Surplus left after
+        every deficit is covered is owed to the estate (receiver None).
+        """
+        payers = sorted(((d, j) for j, d in enumerate(differences) if d > 0), reverse=True)
+        receivers = sorted(((-d, j) for j, d in enumerate(differences) if d < 0), reverse=True)
+        payers = [[d, j] for d, j in payers]
+        receivers = [[d, j] for d, j in receivers]
+
+        transfers = []
+        r = 0
+        for payer in payers:
+            while payer[0] > 0 and r < len(receivers):
+                amount = min(payer[0], receivers[r][0])
+                transfers.append({
+                    "payer": self.heir_ids[payer[1]],
+                    "receiver": self.heir_ids[receivers[r][1]],
+                    "amount": _from_cents(amount),
+                })
+                payer[0] -= amount
+                receivers[r][0] -= amount
+                if receivers[r][0] == 0:
+                    r += 1
+            if payer[0] > 0:
+                transfers.append({"payer": self.heir_ids[payer[1]], "receiver": None, "amount": _from_cents(payer[0])})
+        return transfers
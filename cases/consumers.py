@@ -62,3 +62,12 @@ class CallConsumer(AsyncWebsocketConsumer):
 
         # Send message to WebSocket
         await self.send(text_data=json.dumps(message_data))
+
+    # Server-side session deltas (see cases.realtime.publish_session_event)
+    async def session_event(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'session_event',
+            'event': event['event'],
+            'case_id': event['case_id'],
+            'data': event['data'],
+        }))
@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import json
+import os
+import struct
+import time
+import uuid
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LatencyStats:
+    def __init__(self):
+        self.samples = []
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+        return {
+            "count": len(ordered),
+            "p50_ms": to_ms(percentile(ordered, 0.50)),
+            "p99_ms": to_ms(percentile(ordered, 0.99)),
+            "max_ms": to_ms(ordered[-1] if ordered else None),
+        }
+
+
+class ExternalSessionClient:
+    """
+    Minimal RFC 6455 text-frame client for a running daphne process. Written
+    on asyncio streams because autobahn's asyncio flavour cannot be imported
+    next to daphne, which pins txaio to twisted.
+    """
+
+    def __init__(self, base_url, session_link):
+        self.url = f"{base_url.rstrip('/')}/ws/session/{session_link}/"
+        self.base_url = base_url
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        parts = urlsplit(self.url)
+        secure = parts.scheme == "wss"
+        port = parts.port or (443 if secure else 80)
+        self.reader, self.writer = await asyncio.open_connection(parts.hostname, port, ssl=True if secure else None)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write((
+            f"GET {parts.path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        await self.writer.drain()
+        response = await self.reader.readuntil(b"\r\n\r\n")
+        status_line = response.split(b"\r\n", 1)[0]
+        if b" 101 " not in status_line:
+            raise ConnectionError(f"{self.url}: {status_line.decode(errors='replace')}")
+
+    def _frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", length)
+        mask = os.urandom(4)
+        return bytes(header) + mask + bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+    async def send_json(self, message):
+        self.writer.write(self._frame(0x1, json.dumps(message).encode("utf-8")))
+        await self.writer.drain()
+
+    async def _read_frame(self):
+        first, second = await self.reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await self.reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await self.reader.readexactly(8))
+        return first & 0x0F, await self.reader.readexactly(length)
+
+    async def receive_json(self, timeout):
+        async def read_text():
+            while True:
+                opcode, payload = await self._read_frame()
+                if opcode == 0x1:
+                    return json.loads(payload.decode("utf-8"))
+                if opcode == 0x8:
+                    raise ConnectionError("server closed the websocket")
+                if opcode == 0x9:
+                    self.writer.write(self._frame(0xA, payload))
+
+        return await asyncio.wait_for(read_text(), timeout)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.write(self._frame(0x8, struct.pack("!H", 1000)))
+            self.writer.close()
+
+
+async def _collect(client, expected, timeout, stats, delivered):
+    deadline = time.perf_counter() + timeout
+    received = 0
+    while received < expected:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            message = await client.receive_json(remaining)
+        except asyncio.TimeoutError:
+            break
+        if message.get("type") != "incoming_call":
+            continue
+        # room_name carries "<sender base url>|<send time>" so latency and
+        # cross-process delivery can be measured on receipt.
+        sender_url, sent_at = message["room_name"].rsplit("|", 1)
+        stats.record(time.perf_counter() - float(sent_at))
+        key = "same_process" if sender_url == client.base_url else "cross_process"
+        delivered[key] += 1
+        received += 1
+    return received
+
+
+class InProcessSessionClient:
+    """
+    Client that drives the ASGI application inside this process through
+    channels' WebsocketCommunicator, so consumer and channel-layer cost can
+    be benchmarked without a network or a daphne fleet.
+    """
+
+    def __init__(self, base_url, session_link):
+        self.base_url = base_url
+        self.path = f"/ws/session/{session_link}/"
+        self.communicator = None
+
+    async def connect(self):
+        from channels.testing import WebsocketCommunicator
+        from mawareth_project.asgi import application
+
+        self.communicator = WebsocketCommunicator(application, self.path)
+        connected, _ = await self.communicator.connect()
+        if not connected:
+            raise ConnectionError(f"{self.path}: connection refused")
+
+    async def send_json(self, message):
+        await self.communicator.send_json_to(message)
+
+    async def receive_json(self, timeout):
+        return await self.communicator.receive_json_from(timeout=timeout)
+
+    async def close(self):
+        # A receive timeout makes the communicator cancel the application, so
+        # only disconnect consumers that are still running.
+        if self.communicator is not None and not self.communicator.future.done():
+            await self.communicator.disconnect()
+
+
+async def _room_traffic(clients, messages_per_room, timeout, stats, delivered):
+    collectors = [
+        asyncio.create_task(_collect(client, messages_per_room, timeout, stats, delivered))
+        for client in clients
+    ]
+    for index in range(messages_per_room):
+        sender = clients[index % len(clients)]
+        await sender.send_json({
+            "type": "incoming_call",
+            "caller": "loadtest",
+            "room_name": f"{sender.base_url}|{time.perf_counter()}",
+        })
+    received = sum(await asyncio.gather(*collectors))
+    await clients[0].send_json({"type": "end_call"})
+    return received
+
+
+async def run_session_load(
+    base_urls, rooms, clients_per_room, messages_per_room, timeout=10.0,
+    client_factory=ExternalSessionClient, connect_concurrency=200,
+):
+    """
+    Open `clients_per_room` websocket clients in each of `rooms` session groups,
+    spreading them round-robin over `base_urls` (one per daphne process), and
+    check every call signal reaches every member of its group.
+    """
+    stats = LatencyStats()
+    delivered = {"same_process": 0, "cross_process": 0}
+    room_clients = []
+    for _ in range(rooms):
+        session_link = str(uuid.uuid4())
+        room_clients.append([
+            client_factory(base_urls[index % len(base_urls)], session_link)
+            for index in range(clients_per_room)
+        ])
+    all_clients = [client for clients in room_clients for client in clients]
+
+    semaphore = asyncio.Semaphore(connect_concurrency)
+
+    async def connect(client):
+        async with semaphore:
+            await client.connect()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(client) for client in all_clients))
+    connect_elapsed = time.perf_counter() - started
+    # Give every consumer time to join the group before traffic starts.
+    await asyncio.sleep(0.2)
+
+    traffic_started = time.perf_counter()
+    received = await asyncio.gather(*(
+        _room_traffic(clients, messages_per_room, timeout, stats, delivered)
+        for clients in room_clients
+    ))
+    traffic_elapsed = time.perf_counter() - traffic_started
+    await asyncio.gather(*(client.close() for client in all_clients))
+
+    total_received = sum(received)
+    expected = rooms * clients_per_room * messages_per_room
+    return {
+        "rooms": rooms,
+        "clients": len(all_clients),
+        "processes": len(base_urls),
+        "connect_s": round(connect_elapsed, 3),
+        "connections_per_s": round(len(all_clients) / connect_elapsed, 1) if connect_elapsed else None,
+        "messages_sent": rooms * messages_per_room,
+        "expected_deliveries": expected,
+        "delivered": total_received,
+        "missing": expected - total_received,
+        "same_process_deliveries": delivered["same_process"],
+        "cross_process_deliveries": delivered["cross_process"],
+        "traffic_s": round(traffic_elapsed, 3),
+        "deliveries_per_s": round(total_received / traffic_elapsed, 1) if traffic_elapsed else None,
+        "latency": stats.summary(),
+    }
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from cases.models import Case
+from jobs.services import enqueue_job
+
+
+class Command(BaseCommand):
+    help = "Queue a recalculation of heirs' allocated shares (completed cases unless --case is given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--case", type=int, action="append", dest="case_ids", help="Case id; repeat for several cases.")
+        parser.add_argument("--allocate-pool", action="store_true",
+                            help="Also spread the unassigned pool over the heirs (one auto_allocate job per case).")
+
+    def handle(self, *args, **options):
+        cases = Case.objects.all()
+        if options["case_ids"]:
+            cases = cases.filter(id__in=options["case_ids"])
+        else:
+            cases = cases.filter(status=Case.Status.COMPLETED)
+        cases = list(cases.only("id"))
+        if not cases:
+            self.stdout.write("No cases to recalculate.")
+            return
+        if options["allocate_pool"]:
+            for case in cases:
+                enqueue_job("cases.auto_allocate", case=case, case_id=case.id)
+            self.stdout.write(f"Queued {len(cases)} auto-allocation jobs.")
+        else:
+            enqueue_job("cases.sync_allocated_shares", dedupe=False, case_ids=[case.id for case in cases])
+            self.stdout.write(f"Queued a share recalculation for {len(cases)} cases.")
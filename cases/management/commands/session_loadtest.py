@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cases.loadtest import ExternalSessionClient, InProcessSessionClient, run_session_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive websocket clients through session groups, either against running daphne "
+        "processes (--url) or against the ASGI app inside this process (--in-process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", action="append", dest="urls",
+            help="Base websocket URL of a daphne process, e.g. ws://127.0.0.1:8001. Repeat for each process.",
+        )
+        parser.add_argument("--rooms", type=int, default=10, help="Number of session groups.")
+        parser.add_argument("--clients-per-room", type=int, default=10, help="Websocket clients joined to each group.")
+        parser.add_argument("--messages-per-room", type=int, default=5, help="incoming_call signals sent in each group.")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for deliveries in each group.")
+        parser.add_argument("--connect-concurrency", type=int, default=200, help="Maximum handshakes in flight at once.")
+        parser.add_argument(
+            "--in-process", action="store_true",
+            help="Benchmark CallConsumer and the configured channel layer in-process instead of over the network.",
+        )
+
+    def handle(self, *args, **options):
+        if options["in_process"]:
+            urls, client_factory = ["in-process"], InProcessSessionClient
+        else:
+            urls, client_factory = options["urls"] or ["ws://127.0.0.1:8000"], ExternalSessionClient
+        if options["rooms"] < 1 or options["clients_per_room"] < 1:
+            raise CommandError("--rooms and --clients-per-room must be at least 1.")
+
+        report = asyncio.run(run_session_load(
+            urls,
+            rooms=options["rooms"],
+            clients_per_room=options["clients_per_room"],
+            messages_per_room=options["messages_per_room"],
+            timeout=options["timeout"],
+            client_factory=client_factory,
+            connect_concurrency=options["connect_concurrency"],
+        ))
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if report["missing"]:
+            # With several processes this usually means the channel layer is
+            # process-local (no REDIS_URL configured).
+            raise CommandError(f"{report['missing']} deliveries were lost.")
+        self.stdout.write(self.style.SUCCESS("All session signals were delivered."))
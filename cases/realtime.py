@@ -0,0 +1,112 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import HeirAssetSelection
+
+logger = logging.getLogger(__name__)
+
+
+class SessionEvent:
+    SELECTION_ADDED = 'selection_added'
+    SELECTION_REMOVED = 'selection_removed'
+    CONFLICT_CREATED = 'conflict_created'
+    CONFLICT_RESOLVED = 'conflict_resolved'
+    RAFFLE_RESOLVED = 'raffle_resolved'
+    SETTLEMENT_CONFIRMED = 'settlement_confirmed'
+
+
+def session_group_name(session_link):
+    # Same group CallConsumer joins, so call signals and session deltas share one socket.
+    return f'session_{session_link}'
+
+
+def publish_session_event(case, event, **data):
+    """
+    Broadcast a compact delta to everyone connected to the case session.
+    Sent after the surrounding transaction commits so clients never see
+    changes that were rolled back.
+    """
+    if not case.session_link:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    message = {
+        'type': 'session_event',
+        'event': event,
+        'case_id': case.id,
+        'data': data,
+    }
+    group = session_group_name(case.session_link)
+
+    def send():
+        # The change is already committed; a layer outage must not turn the request into a 500.
+        try:
+            async_to_sync(channel_layer.group_send)(group, message)
+        except Exception:
+            logger.exception("Could not publish %s to %s", event, group)
+
+    transaction.on_commit(send)
+
+
+def _selection_key(asset_id, component_id):
+    return ('component', component_id) if component_id else ('asset', asset_id)
+
+
+def get_heir_selection_keys(heir):
+    return {
+        _selection_key(asset_id, component_id)
+        for asset_id, component_id in HeirAssetSelection.objects.filter(heir=heir).values_list('asset_id', 'component_id')
+    }
+
+
+def publish_selection_changes(case, heir, before_keys):
+    """
+    Compare the heir's selections with a snapshot taken before the change and
+    publish one added/removed event per item that actually changed.
+    """
+    after_keys = get_heir_selection_keys(heir)
+    for event, keys in (
+        (SessionEvent.SELECTION_REMOVED, before_keys - after_keys),
+        (SessionEvent.SELECTION_ADDED, after_keys - before_keys),
+    ):
+        for kind, item_id in sorted(keys):
+            publish_session_event(case, event, heir_id=heir.id, heir_name=heir.name, item_type=kind, item_id=item_id)
+
+
+def conflict_event_data(conflict):
+    return {
+        'conflict_id': conflict.id,
+        'status': conflict.status,
+        'owner_heir_id': conflict.owner_heir_id,
+        'requesting_heir_id': conflict.requesting_heir_id,
+        'item_type': 'component' if conflict.component_id else 'asset',
+        'item_id': conflict.component_id or conflict.parent_asset_id,
+    }
+
+
+def raffle_event_data(raffle):
+    return {
+        'raffle_id': raffle.id,
+        'winner_id': raffle.winner_id,
+        'winner_name': raffle.winner.name if raffle.winner_id else None,
+        'item_type': 'component' if raffle.component_id else 'asset',
+        'item_id': raffle.component_id or raffle.asset_id,
+    }
+
+
+def settlement_event_data(settlement):
+    return {
+        'settlement_id': settlement.id,
+        'payer_id': settlement.payer_id,
+        'receiver_id': settlement.original_owner_id,
+        'amount': str(settlement.amount),
+        'heir_confirmed': settlement.heir_confirmed_payment,
+        'receiver_confirmed': settlement.receiver_confirmed_payment,
+        'paid_to_judge': settlement.is_paid_to_judge,
+        'delivered': settlement.is_delivered_to_owner,
+    }
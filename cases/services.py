@@ -1,6 +1,10 @@
-from decimal import Decimal
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .allocation import AllocationSolver
 from .models import Asset, Heir, HeirAssetSelection, AssetComponent, Debt, Will, PaymentSettlement, DisputeRaffle, AllocationProposal, ComponentConflictRequest, Case, CaseAuditLog
 
 
@@ -163,19 +167,29 @@ def get_heir_distribution_catalog(case):
     }
 
 
+def _allocated_total_subquery(model):
+    totals = (
+        model.objects.filter(assigned_to=OuterRef("pk"))
+        .order_by()
+        .values("assigned_to")
+        .annotate(total=Sum("value"))
+        .values("total")
+    )
+    return Coalesce(Subquery(totals), Value(Decimal("0.00")), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
 def sync_case_heir_allocated_shares(case):
-    heirs = case.heirs.prefetch_related("allocated_assets", "allocated_components")
-    for heir in heirs:
-        assets_total = sum(
-            (get_target_effective_value(asset) for asset in heir.allocated_assets.all()),
-            Decimal("0.00"),
+    # Same totals as summing get_target_effective_value over each heir's
+    # allocated assets and components, computed in one grouped query.
+    heirs = list(
+        case.heirs.annotate(
+            assets_total=_allocated_total_subquery(Asset),
+            components_total=_allocated_total_subquery(AssetComponent),
         )
-        components_total = sum(
-            (get_target_effective_value(component) for component in heir.allocated_components.all()),
-            Decimal("0.00"),
-        )
-        heir.allocated_share = assets_total + components_total
-        heir.save(update_fields=["allocated_share"])
+    )
+    for heir in heirs:
+        heir.allocated_share = heir.assets_total + heir.components_total
+    Heir.objects.bulk_update(heirs, ["allocated_share"])
 
 
 def sanitize_heir_allocation_targets(case):
@@ -199,6 +213,279 @@ def sanitize_heir_allocation_targets(case):
     return catalog
 
 
+OPTIMAL_ALLOCATION_SETTLEMENT_REASON = "فرق قيمة التوزيع المقترح آليًا (تسوية نقدية بين الورثة)"
+
+
+def get_unpaid_suggested_settlements(case):
+    """
+    Cash transfers recorded when the judge accepted the solver's proposal and
+    nobody has paid yet. They only become payable once the session is
+    published, so they do not block publishing and are dropped when the
+    judge resets or replaces the suggested allocation.
+    """
+    return PaymentSettlement.objects.filter(
+        case=case,
+        reason=OPTIMAL_ALLOCATION_SETTLEMENT_REASON,
+        heir_confirmed_payment=False,
+        is_paid_to_judge=False,
+    )
+
+
+def get_publish_blocking_settlements(case):
+    return PaymentSettlement.objects.filter(case=case, is_delivered_to_owner=False).exclude(
+        id__in=get_unpaid_suggested_settlements(case).values("id")
+    )
+
+
+def get_heir_allocation_catalog(case):
+    """Assets and components the judge can hand out on the heirs allocation stage."""
+    reserved = get_obligation_reserved_target_ids(case)
+    assets = list(
+        case.assets.filter(components__isnull=True)
+        .exclude(id__in=reserved["asset_ids"])
+        .order_by("id")
+    )
+    components = list(
+        AssetComponent.objects.filter(asset__case=case)
+        .exclude(id__in=reserved["component_ids"])
+        .select_related("asset")
+        .order_by("id")
+    )
+    return assets, components, reserved
+
+
+def build_optimal_allocation(case):
+    """
+    Propose the asset/component assignment that needs the least cash
+    equalization between heirs. Split components are left out in favour of
+    their sub-components so no value is counted twice.
+    """
+    assets, components, _ = get_heir_allocation_catalog(case)
+    split_parent_ids = {component.parent_component_id for component in components if component.parent_component_id}
+    items = {f"asset:{asset.id}": asset.value for asset in assets}
+    items.update({
+        f"component:{component.id}": component.value
+        for component in components
+        if component.id not in split_parent_ids
+    })
+    targets = {
+        heir.id: heir.share_value
+        for heir in case.heirs.filter(is_blocked=False, share_value__gt=0).order_by("id")
+    }
+    return AllocationSolver(items, targets).solve()
+
+
+def optimal_allocation_fingerprint(proposal):
+    """Stable hash of a proposal, posted back so the judge applies exactly what was previewed."""
+    payload = {
+        "assignment": sorted(proposal["assignment"].items()),
+        "transfers": [
+            [transfer["payer"], transfer["receiver"], str(transfer["amount"])]
+            for transfer in proposal["transfers"]
+        ],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def apply_optimal_allocation(case, proposal, acting_user=None):
+    assets, components, reserved = get_heir_allocation_catalog(case)
+    asset_owners = {}
+    component_owners = {}
+    for key, heir_id in proposal["assignment"].items():
+        kind, target_id = key.split(":")
+        if kind == "asset":
+            asset_owners[int(target_id)] = heir_id
+        else:
+            component_owners[int(target_id)] = heir_id
+
+    settlement_total = proposal["settlement_total"]
+
+    with transaction.atomic():
+        case.assets.exclude(id__in=reserved["asset_ids"]).update(assigned_to=None)
+        for asset in assets:
+            asset.assigned_to_id = asset_owners.get(asset.id)
+        for component in components:
+            component.assigned_to_id = component_owners.get(component.id)
+        Asset.objects.bulk_update(assets, ["assigned_to"])
+        AssetComponent.objects.bulk_update(components, ["assigned_to"])
+
+        get_unpaid_suggested_settlements(case).delete()
+        PaymentSettlement.objects.bulk_create([
+            PaymentSettlement(
+                case=case,
+                payer_id=transfer["payer"],
+                original_owner_id=transfer["receiver"],
+                amount=transfer["amount"],
+                reason=OPTIMAL_ALLOCATION_SETTLEMENT_REASON,
+            )
+            for transfer in proposal["transfers"]
+        ])
+
+        sync_case_heir_allocated_shares(case)
+        CaseAuditLog.objects.create(
+            case=case,
+            action=CaseAuditLog.ActionType.INFO_UPDATED,
+            description=f"تم اعتماد التوزيع المقترح آليًا للأصول على الورثة بإجمالي تسويات نقدية {settlement_total}.",
+            user=acting_user,
+        )
+
+
+def parse_heir_allocation_form(data):
+    """
+    Owner maps from the judge's allocation form, whose radio fields are
+    asset_<id> / comp_<id> with the chosen heir id as the value.
+    """
+    asset_owners, component_owners = {}, {}
+    for key, value in data.items():
+        prefix, _, target_id = key.partition("_")
+        if not value or prefix not in ("asset", "comp"):
+            continue
+        try:
+            target_id, heir_id = int(target_id), int(value)
+        except ValueError:
+            continue
+        owners = asset_owners if prefix == "asset" else component_owners
+        owners[target_id] = heir_id
+    return asset_owners, component_owners
+
+
+def _posted_share(data, heir):
+    value = (data.get(f"value_{heir.id}") or "").strip()
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def load_heir_allocation(case, data):
+    """
+    Everything a save of the allocation form needs, fetched up front: the
+    heirs, every assignable asset and component (one in_bulk each), the posted
+    owners and the resulting total per heir. Targets reserved for debts and
+    wills, or outside the case, are ignored as before.
+    """
+    asset_owners, component_owners = parse_heir_allocation_form(data)
+    reserved = get_obligation_reserved_target_ids(case)
+    heirs = list(case.heirs.all())
+    assets = case.assets.exclude(id__in=reserved["asset_ids"]).in_bulk()
+    components = (
+        AssetComponent.objects.filter(asset__case=case)
+        .exclude(id__in=reserved["component_ids"])
+        .in_bulk()
+    )
+
+    totals = {heir.id: Decimal("0.00") for heir in heirs}
+    unknown_heir = False
+    for owners, targets in ((asset_owners, assets), (component_owners, components)):
+        for target_id, heir_id in owners.items():
+            if target_id not in targets:
+                continue
+            if heir_id not in totals:
+                unknown_heir = True
+                continue
+            totals[heir_id] += Decimal(str(targets[target_id].value))
+    asset_owners = {i: h for i, h in asset_owners.items() if i in assets and h in totals}
+    component_owners = {i: h for i, h in component_owners.items() if i in components and h in totals}
+
+    # Changing any owner replaces an accepted suggestion, whose transfers no
+    # longer balance the new assignment.
+    replaces_suggestion = any(
+        owners.get(target.id) != target.assigned_to_id
+        for owners, targets in ((asset_owners, assets), (component_owners, components))
+        for target in targets.values()
+    )
+    # Cash equalization settlements count towards the heir's share.
+    balances = get_heir_settlement_balances(case, include_suggested=not replaces_suggestion)
+    for heir_id, balance in balances.items():
+        if heir_id in totals:
+            totals[heir_id] += balance
+
+    return {
+        "heirs": heirs,
+        "assets": assets,
+        "components": components,
+        "asset_owners": asset_owners,
+        "component_owners": component_owners,
+        "replaces_suggestion": replaces_suggestion,
+        "totals": totals,
+        "shares": {heir.id: _posted_share(data, heir) for heir in heirs},
+        "descriptions": {heir.id: data.get(f"desc_{heir.id}") for heir in heirs},
+        "unknown_heir": unknown_heir,
+    }
+
+
+def get_heir_allocation_errors(allocation, require_shares=False):
+    errors = []
+    if allocation["unknown_heir"]:
+        errors.append("تم اختيار وريث لا ينتمي إلى هذه القضية.")
+    for heir in allocation["heirs"]:
+        target = allocation["shares"][heir.id]
+        if target is None:
+            target = Decimal(str(heir.share_value or 0))
+        if require_shares and not heir.is_blocked and target <= 0:
+            errors.append(f"خطأ في بيانات الوريث {heir.name}: النصيب الشرعي غير محتسب.")
+        allocated = allocation["totals"][heir.id].quantize(Decimal("0.01"))
+        target = target.quantize(Decimal("0.01"))
+        if allocated != target:
+            errors.append(
+                f"خطأ في تخصيص الوريث {heir.name}: إجمالي ما تم تخصيصه للوريث ({allocated}) "
+                f"لا يساوي نصيبه الشرعي ({target})."
+            )
+    return errors
+
+
+def save_heir_allocation(case, allocation):
+    """
+    Apply a validated allocation: one bulk_update per target table (posted
+    owner or cleared), then the heirs' shares, notes and allocated totals in
+    one grouped aggregate and one bulk_update. Unpaid transfers of a replaced
+    suggestion are deleted.
+    """
+    with transaction.atomic():
+        if allocation["replaces_suggestion"]:
+            get_unpaid_suggested_settlements(case).delete()
+        assets = list(allocation["assets"].values())
+        components = list(allocation["components"].values())
+        for asset in assets:
+            asset.assigned_to_id = allocation["asset_owners"].get(asset.id)
+        for component in components:
+            component.assigned_to_id = allocation["component_owners"].get(component.id)
+        Asset.objects.bulk_update(assets, ["assigned_to"])
+        AssetComponent.objects.bulk_update(components, ["assigned_to"])
+
+        heirs = list(
+            case.heirs.annotate(
+                assets_total=_allocated_total_subquery(Asset),
+                components_total=_allocated_total_subquery(AssetComponent),
+            )
+        )
+        for heir in heirs:
+            share = allocation["shares"].get(heir.id)
+            description = allocation["descriptions"].get(heir.id)
+            if share is not None:
+                heir.share_value = share
+            if description:
+                heir.allocation_description = description
+            heir.allocated_share = heir.assets_total + heir.components_total
+        Heir.objects.bulk_update(heirs, ["share_value", "allocation_description", "allocated_share"])
+    return heirs
+
+
+def get_heir_settlement_balances(case, include_suggested=True):
+    """Net cash each heir receives (+) or pays (-) through the case settlements."""
+    settlements = PaymentSettlement.objects.filter(case=case)
+    if not include_suggested:
+        settlements = settlements.exclude(id__in=get_unpaid_suggested_settlements(case).values("id"))
+    balances = {}
+    for payer_id, original_owner_id, amount in settlements.values_list("payer_id", "original_owner_id", "amount"):
+        balances[payer_id] = balances.get(payer_id, Decimal("0.00")) - amount
+        if original_owner_id:
+            balances[original_owner_id] = balances.get(original_owner_id, Decimal("0.00")) + amount
+    return balances
+
+
 def get_case_judge_completion_status(case):
     heirs = case.heirs.all()
     active_disputes = DisputeRaffle.objects.filter(case=case, is_resolved=False)
@@ -236,7 +523,9 @@ def get_case_judge_completion_status(case):
     }
 
 
-def finalize_case_distribution(case, acting_user=None):
+def finalize_case_distribution(case, acting_user=None, progress=None):
+    progress = progress or (lambda percent, message="": None)
+    progress(5, "جارٍ التحقق من جاهزية القضية")
     status = get_case_judge_completion_status(case)
     if status["is_completed"]:
         return False, "تم إنهاء هذه القضية مسبقًا."
@@ -253,70 +542,121 @@ def finalize_case_distribution(case, acting_user=None):
             return False, "لا يمكن اعتماد القسمة لوجود مبالغ معلقة (تسويات مالية) لم يتم سدادها بعد."
         if not status["all_heirs_approved"] and not status["all_heirs_consented"]:
             return False, "لا يمكن الاعتماد لعدم إجماع الورثة بالتراضي، أو لعدم قيام القاضي لاعتماد جميع الحصص يدوياً."
-    heirs = list(case.heirs.all())
-    relevant_proposals = AllocationProposal.objects.filter(case=case, status__in=["PENDING", "ACCEPTED"], difference_amount__gt=0)
-
     with transaction.atomic():
-        for heir in heirs:
-            intents = HeirAssetSelection.objects.filter(heir=heir)
-            for intent in intents:
-                target = intent.asset or intent.component
-                if not target or target.assigned_to:
-                    continue
-                target.assigned_to = heir
-                target.save()
-                heir.allocated_share += get_target_effective_value(target)
-
-            pledge_intent = intents.filter(requires_pledge=True, pledge_amount__gt=0).first()
-            if pledge_intent:
-                PaymentSettlement.objects.get_or_create(
-                    case=case,
-                    payer=heir,
-                    amount=pledge_intent.pledge_amount,
-                    reason="فرق قيمة اختيار العينات (تعهد بالدفع)",
-                    defaults={"heir_confirmed_payment": False},
-                )
-
-            heir.acceptance_status = Heir.AcceptanceStatus.ACCEPTED
-            heir.is_judge_confirmed = True
-            heir.save()
-
-        for proposal in relevant_proposals.filter(status="ACCEPTED"):
-            heir = proposal.heir
-            for asset in proposal.assets.all():
-                if not asset.assigned_to:
-                    asset.assigned_to = heir
-                    asset.save()
-                    heir.allocated_share += get_target_effective_value(asset)
-            for component in proposal.components.all():
-                if not component.assigned_to:
-                    component.assigned_to = heir
-                    component.save()
-                    heir.allocated_share += get_target_effective_value(component)
-
-            if proposal.difference_amount > 0:
-                PaymentSettlement.objects.get_or_create(
+        # Row lock on the case so two finalize requests cannot interleave.
+        locked_case = Case.objects.select_for_update().get(pk=case.pk)
+        if locked_case.status == Case.Status.COMPLETED:
+            return False, "تم إنهاء هذه القضية مسبقًا."
+
+        progress(15, "جارٍ تحميل اختيارات الورثة ومقترحات التوزيع")
+        asset_rows = list(Asset.objects.filter(case=case).values("id", "value", "assigned_to_id"))
+        component_rows = list(AssetComponent.objects.filter(asset__case=case).values("id", "value", "assigned_to_id"))
+        owners = {
+            "asset": {row["id"]: row["assigned_to_id"] for row in asset_rows},
+            "component": {row["id"]: row["assigned_to_id"] for row in component_rows},
+        }
+        changed = {"asset": {}, "component": {}}
+
+        def claim(kind, target_id, heir_id):
+            if target_id not in owners[kind] or owners[kind][target_id]:
+                return
+            owners[kind][target_id] = heir_id
+            changed[kind][target_id] = heir_id
+
+        settlements = {}
+
+        def pledge(heir_id, amount, reason):
+            settlements.setdefault((heir_id, Decimal(str(amount)), reason), None)
+
+        intents = HeirAssetSelection.objects.filter(heir__case=case).order_by("heir_id", "id").values(
+            "heir_id", "asset_id", "component_id", "requires_pledge", "pledge_amount",
+        )
+        pledged_heir_ids = set()
+        for intent in intents:
+            if intent["asset_id"]:
+                claim("asset", intent["asset_id"], intent["heir_id"])
+            elif intent["component_id"]:
+                claim("component", intent["component_id"], intent["heir_id"])
+            if intent["requires_pledge"] and intent["pledge_amount"] > 0 and intent["heir_id"] not in pledged_heir_ids:
+                pledged_heir_ids.add(intent["heir_id"])
+                pledge(intent["heir_id"], intent["pledge_amount"], "فرق قيمة اختيار العينات (تعهد بالدفع)")
+
+        progress(35, "جارٍ تطبيق مقترحات التوزيع المقبولة")
+        accepted_proposals = AllocationProposal.objects.filter(
+            case=case,
+            status=AllocationProposal.Status.ACCEPTED,
+            difference_amount__gt=0,
+        ).order_by("id")
+        proposal_assets = AllocationProposal.assets.through.objects.filter(allocationproposal__in=accepted_proposals)
+        proposal_components = AllocationProposal.components.through.objects.filter(allocationproposal__in=accepted_proposals)
+        targets_by_proposal = {}
+        for proposal_id, asset_id in proposal_assets.values_list("allocationproposal_id", "asset_id"):
+            targets_by_proposal.setdefault(proposal_id, []).append(("asset", asset_id))
+        for proposal_id, component_id in proposal_components.values_list("allocationproposal_id", "assetcomponent_id"):
+            targets_by_proposal.setdefault(proposal_id, []).append(("component", component_id))
+
+        for proposal in accepted_proposals.values("id", "heir_id", "difference_amount"):
+            for kind, target_id in targets_by_proposal.get(proposal["id"], []):
+                claim(kind, target_id, proposal["heir_id"])
+            pledge(proposal["heir_id"], proposal["difference_amount"], "فرق قيمة متفق عليه بجلسة التوزيع (عبر مقترح القاضي)")
+
+        progress(55, "جارٍ حفظ الملكية النهائية والتسويات")
+        if changed["asset"]:
+            Asset.objects.bulk_update(
+                [Asset(id=target_id, assigned_to_id=heir_id) for target_id, heir_id in changed["asset"].items()],
+                ["assigned_to"],
+            )
+        if changed["component"]:
+            AssetComponent.objects.bulk_update(
+                [AssetComponent(id=target_id, assigned_to_id=heir_id) for target_id, heir_id in changed["component"].items()],
+                ["assigned_to"],
+            )
+
+        if settlements:
+            existing = set(
+                PaymentSettlement.objects.filter(
                     case=case,
-                    payer=heir,
-                    amount=proposal.difference_amount,
-                    reason="فرق قيمة متفق عليه بجلسة التوزيع (عبر مقترح القاضي)",
-                    defaults={"heir_confirmed_payment": False},
-                )
-            heir.acceptance_status = Heir.AcceptanceStatus.ACCEPTED
-            heir.is_judge_confirmed = True
-            heir.save()
+                    reason__in={reason for _, _, reason in settlements},
+                ).values_list("payer_id", "amount", "reason")
+            )
+            PaymentSettlement.objects.bulk_create([
+                PaymentSettlement(case=case, payer_id=heir_id, amount=amount, reason=reason, heir_confirmed_payment=False)
+                for heir_id, amount, reason in settlements
+                if (heir_id, amount, reason) not in existing
+            ])
 
         HeirAssetSelection.objects.filter(heir__case=case).delete()
         AllocationProposal.objects.filter(case=case).delete()
 
-        sync_case_heir_allocated_shares(case)
-        auto_allocate(case)
+        progress(70, "جارٍ احتساب الحصص النهائية")
+        values = {
+            "asset": {row["id"]: Decimal(str(row["value"])) for row in asset_rows},
+            "component": {row["id"]: Decimal(str(row["value"])) for row in component_rows},
+        }
+        allocated_totals = {}
+        unassigned_value = Decimal("0.00")
+        for kind, kind_owners in owners.items():
+            for target_id, heir_id in kind_owners.items():
+                if heir_id:
+                    allocated_totals[heir_id] = allocated_totals.get(heir_id, Decimal("0.00")) + values[kind][target_id]
+                else:
+                    unassigned_value += values[kind][target_id]
+
+        expected_totals = get_heir_expected_settlement_totals(case)
+        heirs = list(case.heirs.all())
+        remaining = {
+            heir.id: max(heir.share_value - allocated_totals.get(heir.id, Decimal("0.00")) - expected_totals.get(heir.id, Decimal("0.00")), 0)
+            for heir in heirs
+        }
+        pool_shares = distribute_pool_proportionally(remaining, unassigned_value + get_case_settlements_owed_to_estate(case))
+        for heir in heirs:
+            heir.allocated_share = allocated_totals.get(heir.id, Decimal("0.00")) + pool_shares.get(heir.id, Decimal("0.00"))
+            heir.acceptance_status = Heir.AcceptanceStatus.ACCEPTED
+            heir.is_judge_confirmed = True
+        Heir.objects.bulk_update(heirs, ["allocated_share", "acceptance_status", "is_judge_confirmed"])
 
+        progress(90, "جارٍ إغلاق القضية")
         case.assets.all().update(is_locked=True)
-        case.heirs.all().update(
-            acceptance_status=Heir.AcceptanceStatus.ACCEPTED,
-            is_judge_confirmed=True,
-        )
         ComponentConflictRequest.objects.filter(case=case).update(status=ComponentConflictRequest.Status.CANCELED)
 
         case.allow_heir_selection = False
@@ -332,48 +672,86 @@ def finalize_case_distribution(case, acting_user=None):
 
     return True, "تم اعتماد التوزيع بنجاح وإغلاق القضية رسميًا."
 
+
+def get_heir_expected_settlement_totals(case):
+    """Settlement amounts each heir is due to receive, keyed by heir id."""
+    rows = (
+        PaymentSettlement.objects.filter(case=case, original_owner__isnull=False)
+        .values("original_owner_id")
+        .annotate(total=Sum("amount"))
+    )
+    return {row["original_owner_id"]: row["total"] for row in rows}
+
+
+def get_case_settlements_owed_to_estate(case):
+    # PaymentSettlements that have no original_owner are typically owed to the estate pool
+    return PaymentSettlement.objects.filter(case=case, original_owner__isnull=True).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+
+
+def distribute_pool_proportionally(remaining_by_heir, total_pool):
+    """
+    Split total_pool among heirs proportionally to their remaining share value,
+    never giving an heir more than they still need. Returns {heir_id: amount}.
+    """
+    needing_more = {heir_id: rem for heir_id, rem in remaining_by_heir.items() if rem > 0}
+    total_needed = sum(needing_more.values(), Decimal("0"))
+    if total_needed == 0 or total_pool <= 0:
+        return {}
+
+    shares = {}
+    for heir_id, rem in needing_more.items():
+        allocated_from_pool = total_pool * (rem / total_needed)
+        shares[heir_id] = rem if allocated_from_pool > rem else allocated_from_pool
+    return shares
+
+
 def auto_allocate(case):
     """
     Distributes remaining unassigned assets and cash pool among heirs proportionally 
     to their remaining share value.
     """
-    from django.db.models import Sum
-    
     unassigned_assets_val = Asset.objects.filter(case=case, assigned_to__isnull=True).aggregate(total=Sum('value'))['total'] or Decimal('0')
     unassigned_comps_val = AssetComponent.objects.filter(asset__case=case, assigned_to__isnull=True).aggregate(total=Sum('value'))['total'] or Decimal('0')
-    
+
     # Calculate cash owed to the estate by heirs (liquidity from over-selections)
-    # PaymentSettlements that have no original_owner are typically owed to the estate pool
-    settlements_owed = PaymentSettlement.objects.filter(case=case, original_owner__isnull=True).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    
+    settlements_owed = get_case_settlements_owed_to_estate(case)
+
     total_pool = unassigned_assets_val + unassigned_comps_val + settlements_owed
-    
-    heirs = case.heirs.all()
-    
-    # Calculate who still needs more
-    heirs_needing_more = []
-    total_shares_needing_more = Decimal('0')
-    
-    for heir in heirs:
-        rem = heir.remaining_share()
-        if rem > 0:
-            heirs_needing_more.append((heir, rem))
-            total_shares_needing_more += rem
-            
-    if total_shares_needing_more == 0 or total_pool <= 0:
+    if total_pool <= 0:
+        return
+
+    heirs = list(case.heirs.all())
+    real_values = get_heir_real_allocated_values(case)
+    remaining = {
+        heir.id: max(heir.share_value - real_values.get(heir.id, Decimal("0.00")), 0)
+        for heir in heirs
+    }
+    pool_shares = distribute_pool_proportionally(remaining, total_pool)
+    if not pool_shares:
         # Everyone got their share, or there is nothing in the pool
         return
 
-    # Proportional distribution of the total unassigned value
-    for heir, rem in heirs_needing_more:
-        proportion = rem / total_shares_needing_more
-        allocated_from_pool = total_pool * proportion
-        # Ensure we do not exceed the remaining share mathematically
-        if allocated_from_pool > rem:
-            allocated_from_pool = rem
-            
-        heir.allocated_share += allocated_from_pool
-        heir.save()
+    updated = []
+    for heir in heirs:
+        if heir.id in pool_shares:
+            heir.allocated_share += pool_shares[heir.id]
+            updated.append(heir)
+    Heir.objects.bulk_update(updated, ["allocated_share"])
+
+
+def get_heir_real_allocated_values(case):
+    """Grouped equivalent of Heir.real_allocated_value for every heir of the case."""
+    totals = {}
+    grouped = (
+        Asset.objects.filter(case=case, assigned_to__isnull=False).values_list("assigned_to_id").annotate(total=Sum("value")),
+        AssetComponent.objects.filter(asset__case=case, assigned_to__isnull=False).values_list("assigned_to_id").annotate(total=Sum("value")),
+    )
+    for rows in grouped:
+        for heir_id, total in rows:
+            totals[heir_id] = totals.get(heir_id, Decimal("0.00")) + total
+    for heir_id, total in get_heir_expected_settlement_totals(case).items():
+        totals[heir_id] = totals.get(heir_id, Decimal("0.00")) + total
+    return totals
 
 def get_allocation_warnings(case):
     """
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from jobs.registry import JobError, register_task
+from .models import Case, DisputeRaffle
+from .services import auto_allocate, finalize_case_distribution, sync_case_heir_allocated_shares
+
+
+def _get_case(case_id):
+    try:
+        return Case.objects.get(id=case_id)
+    except Case.DoesNotExist:
+        raise JobError("القضية غير موجودة.")
+
+
+@register_task("cases.finalize_case_distribution")
+def finalize_case_distribution_task(job, case_id, user_id=None):
+    from .views import reconcile_case_disputes
+
+    case = _get_case(case_id)
+    acting_user = get_user_model().objects.filter(id=user_id).first() if user_id else None
+    # The review page refreshes disputes in the background; never finalize on a stale set.
+    job.report_progress(2, "جارٍ مطابقة اختيارات الورثة والنزاعات")
+    reconcile_case_disputes(case)
+    success, message_text = finalize_case_distribution(case, acting_user, progress=job.report_progress)
+    if not success:
+        raise JobError(message_text)
+    return {"message": message_text, "redirect_url": reverse("cases:final_report", args=[case.id])}
+
+
+@register_task("cases.auto_allocate")
+def auto_allocate_task(job, case_id):
+    case = _get_case(case_id)
+    job.report_progress(10, "جارٍ تحديث القيم المخصصة للورثة")
+    sync_case_heir_allocated_shares(case)
+    job.report_progress(60, "جارٍ توزيع الرصيد غير المخصص")
+    auto_allocate(case)
+    return {"message": "تم توزيع الرصيد غير المخصص على الورثة."}
+
+
+def _open_disputes(case):
+    disputes = DisputeRaffle.objects.filter(case=case, is_resolved=False)
+    return (
+        set(disputes.values_list("id", "asset_id", "component_id")),
+        set(DisputeRaffle.contenders.through.objects.filter(disputeraffle__in=disputes).values_list("disputeraffle_id", "heir_id")),
+    )
+
+
+@register_task("cases.reconcile_case_disputes")
+def reconcile_case_disputes_task(job, case_id):
+    from .views import reconcile_case_disputes
+
+    case = _get_case(case_id)
+    job.report_progress(10, "جارٍ مطابقة اختيارات الورثة والنزاعات")
+    before = _open_disputes(case)
+    reconcile_case_disputes(case)
+    # The review page only reloads when the refresh actually changed something.
+    return {"message": "تم تحديث النزاعات القائمة.", "changed": _open_disputes(case) != before}
+
+
+@register_task("cases.sync_allocated_shares")
+def sync_allocated_shares_task(job, case_ids):
+    cases = list(Case.objects.filter(id__in=case_ids))
+    for index, case in enumerate(cases, start=1):
+        sync_case_heir_allocated_shares(case)
+        job.report_progress(index * 100 / len(cases), f"تمت إعادة احتساب {index} من {len(cases)} قضية")
+    return {"message": f"تمت إعادة احتساب الحصص المخصصة لـ {len(cases)} قضية."}
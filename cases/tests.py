@@ -1,3 +1,114 @@
-from django.test import TestCase
+import asyncio
+import os
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .models import Case
+from .realtime import SessionEvent, publish_session_event, session_group_name
+
+
+class PublishSessionEventTests(TestCase):
+    def setUp(self):
+        self.case = Case.objects.create(case_number="1")
+        self.layer = get_channel_layer()
+        self.group = session_group_name(self.case.session_link)
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(self.group, self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.layer.group_discard)(self.group, self.channel)
+
+    def test_event_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            publish_session_event(self.case, SessionEvent.SELECTION_ADDED, heir_id=7)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message, {
+            'type': 'session_event',
+            'event': SessionEvent.SELECTION_ADDED,
+            'case_id': self.case.id,
+            'data': {'heir_id': 7},
+        })
+
+    def test_layer_failure_is_logged_not_raised(self):
+        with mock.patch.object(self.layer, 'group_send', side_effect=ConnectionError("layer down")):
+            with self.assertLogs('cases.realtime', 'ERROR') as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    publish_session_event(self.case, SessionEvent.RAFFLE_RESOLVED, raffle_id=1)
+        self.assertIn(SessionEvent.RAFFLE_RESOLVED, logs.output[0])
+
+
+def _redis_layer_hosts():
+    """
+    Hosts for a channels_redis layer: the real server at REDIS_URL when set,
+    otherwise an in-memory fakeredis server. None when neither is available.
+    """
+    try:
+        import channels_redis  # noqa: F401
+    except ImportError:
+        return None
+    if os.environ.get("REDIS_URL"):
+        return [os.environ["REDIS_URL"]]
+    try:
+        # channels_redis runs Lua scripts, which fakeredis only supports with lupa.
+        import lupa  # noqa: F401
+        from fakeredis import FakeServer
+        from fakeredis.aioredis import FakeConnection
+    except ImportError:
+        return None
+    return [{"connection_class": FakeConnection, "server": FakeServer()}]
+
+
+@skipUnless(_redis_layer_hosts(), "needs channels_redis and REDIS_URL or fakeredis[lua]")
+class RedisSessionEventTests(TestCase):
+    """
+    Same path as production with REDIS_URL set: the publishing process and the
+    process holding the websocket only share Redis, never a layer instance.
+    """
+
+    def setUp(self):
+        self.case = Case.objects.create(case_number="1")
+        config = {
+            "hosts": _redis_layer_hosts(),
+            # A fresh prefix keeps runs against a shared server apart.
+            "prefix": f"mawareth-test-{uuid.uuid4().hex}",
+            **settings.CHANNEL_LAYER_OPTIONS,
+        }
+        self.enterContext(override_settings(CHANNEL_LAYERS={
+            "default": {"BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": config},
+        }))
+        from channels_redis.core import RedisChannelLayer
+
+        self.subscriber = RedisChannelLayer(**config)
+        self.group = session_group_name(self.case.session_link)
+        self.channel = async_to_sync(self.subscriber.new_channel)()
+        async_to_sync(self.subscriber.group_add)(self.group, self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.subscriber.flush)()
+
+    def test_event_reaches_another_layer_instance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_session_event(self.case, SessionEvent.SETTLEMENT_CONFIRMED, settlement_id=3, amount="50.00")
+
+        publisher = get_channel_layer()
+        self.assertIsInstance(publisher, type(self.subscriber))
+        self.assertIsNot(publisher, self.subscriber)
+
+        async def receive():
+            return await asyncio.wait_for(self.subscriber.receive(self.channel), timeout=5)
+
+        message = async_to_sync(receive)()
+        self.assertEqual(message, {
+            'type': 'session_event',
+            'event': SessionEvent.SETTLEMENT_CONFIRMED,
+            'case_id': self.case.id,
+            'data': {'settlement_id': 3, 'amount': "50.00"},
+        })
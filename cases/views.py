@@ -10,9 +10,12 @@ from .models import Case, Heir, Asset, AssetComponent, HeirAssetSelection, Dispu
 from django.db import transaction
 from django.db.models import Count, Q, Sum, F
 from .forms import CaseForm, DeceasedForm
+from .realtime import SessionEvent, publish_session_event, raffle_event_data, settlement_event_data
 from .services import auto_allocate, finalize_case_distribution, get_allocation_warnings, are_case_obligations_settled, get_case_judge_completion_status, get_case_obligation_status, get_target_effective_value, get_obligation_target_catalog
 from django.views.decorators.http import require_POST
 from django.urls import reverse
+from jobs.models import BackgroundJob
+from jobs.services import enqueue_job, get_active_job, get_failed_job
 from urllib.parse import urlencode
 
 
@@ -244,6 +247,7 @@ def _resolve_lottery_dispute(case, dispute, acting_user):
                 HeirAssetSelection.objects.get_or_create(heir=heir, component=oc, defaults={'status': HeirAssetSelection.SelectionStatus.PENDING})
 
     CaseAuditLog.objects.create(case=case, action=CaseAuditLog.ActionType.RAFFLE_RESULT, description=f"القرعة على {target.description} فاز بها {winner.name}.", user=acting_user)
+    publish_session_event(case, SessionEvent.RAFFLE_RESOLVED, **raffle_event_data(dispute))
     
     # Update cached share if confirmed
     if winner.is_judge_confirmed:
@@ -254,7 +258,6 @@ def _resolve_lottery_dispute(case, dispute, acting_user):
 
 def _build_review_context(case):
     """المنطق المركزي لبناء بيانات شاشة مراجعة القاضي"""
-    reconcile_case_disputes(case)
     heirs = case.heirs.all()
     
     # 0. إصلاح وترقية النصوص في التسويات المالية الحالية تلقائياً
@@ -526,19 +529,21 @@ def review_distribution(request, case_id):
             payment = get_object_or_404(PaymentSettlement, id=payment_id, case=case)
             payment.is_paid_to_judge = True
             payment.save(update_fields=['is_paid_to_judge'])
+            publish_session_event(case, SessionEvent.SETTLEMENT_CONFIRMED, **settlement_event_data(payment))
             payer_name = payment.payer.name if payment.payer else ''
             messages.success(request, f"تم تأكيد استلام الدفعة من {payer_name} بنجاح.")
             return redirect('cases:review_section', case_id=case.id, section='settlements')
 
         elif action == 'approve':
-            from .services import finalize_case_distribution
-            success, message_text = finalize_case_distribution(case, request.user)
-            if success:
-                messages.success(request, message_text)
+            job = enqueue_job('cases.finalize_case_distribution', case=case, user=request.user, case_id=case.id, user_id=request.user.id)
+            if job.status == BackgroundJob.Status.SUCCEEDED:
+                messages.success(request, job.result['message'])
                 return redirect('cases:final_report', case_id=case.id)
+            if job.status == BackgroundJob.Status.FAILED:
+                messages.error(request, job.display_error)
             else:
-                messages.error(request, message_text)
-                return redirect('cases:review_section', case_id=case.id, section='decision')
+                messages.info(request, "جارٍ اعتماد التوزيع النهائي في الخلفية، ستظهر النتيجة تلقائيًا عند الانتهاء.")
+            return redirect('cases:review_section', case_id=case.id, section='decision')
 
     if case.status == Case.Status.COMPLETED: return redirect('cases:final_report', case_id=case.id)
     return redirect('cases:review_section', case_id=case_id, section='overview')
@@ -549,6 +554,7 @@ def start_lottery(request, case_id):
     if case.status == Case.Status.COMPLETED:
         return redirect('cases:final_report', case_id=case.id)
     
+    # The draw needs the current contenders, so this page reconciles inline rather than on the queue.
     reconcile_case_disputes(case)
     active_disputes = list(DisputeRaffle.objects.filter(case=case, is_resolved=False).prefetch_related('contenders'))
     resolved_disputes = DisputeRaffle.objects.filter(case=case, is_resolved=True).select_related('winner', 'asset', 'component')
@@ -783,8 +789,14 @@ def allocate_share(request, case_id, heir_id):
 def review_section(request, case_id, section):
     case = get_object_or_404(Case, id=case_id)
     if section not in REVIEW_SECTION_LABELS: section = 'overview'
+    # Disputes are refreshed on the job queue; the page reloads if that changes them.
+    reconcile_job = enqueue_job('cases.reconcile_case_disputes', case=case, user=request.user, case_id=case.id)
     context = _build_review_context(case)
+    context['reconcile_job'] = None if reconcile_job.is_finished else reconcile_job
     context.update({'review_sections': REVIEW_SECTION_LABELS, 'active_review_section': section, 'section_template': f'cases/review_sections/{section}.html'})
+    context['finalize_job'] = get_active_job('cases.finalize_case_distribution', case)
+    if not context['finalize_job']:
+        context['failed_finalize_job'] = get_failed_job('cases.finalize_case_distribution', case)
     return render(request, 'cases/review_dashboard.html', context)
 
 @login_required
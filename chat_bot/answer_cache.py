@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_ANSWER_CACHE = {
+    "ENABLED": True,
+    "PATH": None,
+    "THRESHOLD": 0.9,
+    "TTL": 7 * 24 * 3600,
+    "MAX_ENTRIES": 5000,
+    "REQUIRE_SAME_CHUNKS": True,
+}
+
+
+def get_answer_cache_settings():
+    return {**DEFAULT_ANSWER_CACHE, **getattr(settings, "CHAT_BOT_ANSWER_CACHE", {})}
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype="float32").reshape(-1)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by question meaning rather than text. A stored answer is
+    reused when a new question's embedding is within `threshold` cosine
+    similarity of the cached one, it was produced against the same index
+    version, and (by default) retrieval returned the same chunks, so
+    "نصيب الزوجة" can reuse "كم ترث الزوجة" while "نصيب الزوج" cannot.
+
+    Entries live in an optional SQLite file shared by every worker; each
+    process keeps a normalized matrix of the live rows and reloads it when
+    another connection writes to the file.
+    """
+
+    def __init__(self, path=None, threshold=0.9, ttl=7 * 24 * 3600, max_entries=5000, require_same_chunks=True):
+        self.path = str(path) if path else None
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.require_same_chunks = require_same_chunks
+        self._lock = threading.Lock()
+        self._db = None
+        self._entries = []
+        self._matrix = None
+        self._loaded = None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with sqlite3.connect(self.path) as connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS answers ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, index_version TEXT, created_at REAL, "
+                    "question TEXT, vector BLOB, chunk_ids TEXT, answer TEXT)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS answers_version ON answers (index_version, created_at)")
+
+    def _connection(self):
+        # One connection guarded by the lock: PRAGMA data_version is per connection.
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        return self._db
+
+    def _refresh(self, index_version):
+        if not self.path:
+            return
+        # data_version changes whenever another connection commits to the file.
+        data_version = self._connection().execute("PRAGMA data_version").fetchone()[0]
+        if self._loaded == (index_version, data_version):
+            return
+        rows = self._connection().execute(
+            "SELECT created_at, vector, chunk_ids, answer FROM answers "
+            "WHERE index_version = ? AND created_at >= ? ORDER BY id",
+            (index_version, time.time() - self.ttl),
+        ).fetchall()
+        self._entries = [
+            {
+                "index_version": index_version,
+                "created_at": created_at,
+                "chunk_ids": tuple(json.loads(chunk_ids)),
+                "answer": answer,
+                "vector": np.frombuffer(blob, dtype="float32"),
+            }
+            for created_at, blob, chunk_ids, answer in rows
+        ]
+        self._matrix = None
+        self._loaded = (index_version, data_version)
+
+    def _live(self, index_version, now):
+        entries = [
+            entry for entry in self._entries
+            if entry["index_version"] == index_version and now - entry["created_at"] <= self.ttl
+        ]
+        if len(entries) != len(self._entries):
+            self._entries = entries
+            self._matrix = None
+        if self._matrix is None and entries:
+            self._matrix = np.vstack([entry["vector"] for entry in entries])
+        return entries
+
+    def lookup(self, vector, chunk_ids, index_version):
+        """Return {"answer", "similarity"} for the closest usable entry, or None."""
+        query = unit(vector)
+        with self._lock:
+            self._refresh(index_version)
+            entries = self._live(index_version, time.time())
+            if not entries or self._matrix.shape[1] != query.shape[0]:
+                return None
+            similarities = self._matrix @ query
+            for row in np.argsort(-similarities):
+                similarity = float(similarities[row])
+                if similarity < self.threshold:
+                    break
+                entry = entries[row]
+                if self.require_same_chunks and entry["chunk_ids"] != tuple(chunk_ids):
+                    continue
+                return {"answer": entry["answer"], "similarity": similarity}
+        return None
+
+    def store(self, question, vector, chunk_ids, answer, index_version):
+        entry = {
+            "index_version": index_version,
+            "created_at": time.time(),
+            "chunk_ids": tuple(int(i) for i in chunk_ids),
+            "answer": answer,
+            "vector": unit(vector),
+        }
+        with self._lock:
+            if self.path:
+                connection = self._connection()
+                with connection:
+                    connection.execute(
+                        "INSERT INTO answers (index_version, created_at, question, vector, chunk_ids, answer) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (index_version, entry["created_at"], question, entry["vector"].tobytes(),
+                         json.dumps(entry["chunk_ids"]), answer),
+                    )
+                    # Expired rows and rows from older indexes go first, then the oldest beyond the cap.
+                    connection.execute(
+                        "DELETE FROM answers WHERE created_at < ? OR index_version != ?",
+                        (entry["created_at"] - self.ttl, index_version),
+                    )
+                    connection.execute(
+                        "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY id DESC LIMIT ?)",
+                        (self.max_entries,),
+                    )
+            self._entries.append(entry)
+            self._entries = self._entries[-self.max_entries:]
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            if self.path:
+                connection = self._connection()
+                with connection:
+                    connection.execute("DELETE FROM answers")
+            self._entries = []
+            self._matrix = None
+            self._loaded = None
+
+
+@lru_cache(maxsize=None)
+def get_answer_cache():
+    config = get_answer_cache_settings()
+    if not config["ENABLED"]:
+        return None
+    return SemanticAnswerCache(
+        path=config["PATH"],
+        threshold=config["THRESHOLD"],
+        ttl=config["TTL"],
+        max_entries=config["MAX_ENTRIES"],
+        require_same_chunks=config["REQUIRE_SAME_CHUNKS"],
+    )
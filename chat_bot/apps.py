@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ChatBotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chat_bot'
+
+    def ready(self):
+        from .embeddings import get_embedding_backend, get_embedding_settings
+
+        # Load a local embedding model once per worker instead of on the first question.
+        if get_embedding_settings()["PRELOAD"]:
+            get_embedding_backend().warm_up()
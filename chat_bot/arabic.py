@@ -0,0 +1,51 @@
+import re
+import unicodedata
+
+# Harakat, Quranic marks and tatweel carry no meaning for matching.
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_LETTER_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    # Persian letter forms some PDF extractors emit for Arabic text.
+    "ھ": "ه", "ی": "ي", "ک": "ك",
+})
+_LETTER_MAP_KEEP_TA = {**_LETTER_MAP}
+del _LETTER_MAP_KEEP_TA[ord("ة")]
+_TOKEN = re.compile(r"[\w]+", re.UNICODE)
+# Longest first so "وال" wins over "ال".
+_ARTICLE_PREFIXES = ("وبال", "وكال", "ولل", "فلل", "وال", "بال", "كال", "فال", "لل", "ال")
+_WORD_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+
+STOPWORDS = frozenset(
+    "في من علي الي عن ما ماذا كم هل هو هي هم ان او ثم اذا لا لم لن قد كل مع هذا هذه ذلك التي الذي "
+    "الذين كان كانت يكون عند بعد قبل حتي اي كيف متي اين لماذا ايضا وهو وهي ولا وما".split()
+)
+
+
+def normalize_arabic(text, keep_ta_marbuta=False):
+    """
+    Fold the spellings that vary across books and PDF extractors: presentation
+    forms (NFKC), diacritics and tatweel, alef/hamza seats, alef maqsura and
+    ta marbuta. Keep ta marbuta where it carries meaning (والد / والدة).
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _DIACRITICS.sub("", text)
+    return text.translate(_LETTER_MAP_KEEP_TA if keep_ta_marbuta else _LETTER_MAP).translate(_WORD_DIGITS)
+
+
+def light_stem(token):
+    for prefix in _ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    return token
+
+
+def tokenize(text, drop_stopwords=True):
+    tokens = []
+    for token in _TOKEN.findall(normalize_arabic(text).lower()):
+        if drop_stopwords and token in STOPWORDS:
+            continue
+        tokens.append(light_stem(token))
+    return tokens
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .arabic import tokenize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+CHUNKS_PATH = "rag/chunks.json"
+# Chunk text keyed by the id stored in the FAISS index. Workers read it on
+# demand, so the corpus lives once in the OS page cache instead of once per process.
+CHUNK_DB_PATH = "rag/chunks.sqlite3"
+LOCK_PATH = "rag/index.lock"
+CORPUS_SOURCE = "knowledg_pdf"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS chunks ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT NOT NULL, book_id INTEGER, "
+    "position INTEGER NOT NULL, text TEXT NOT NULL, text_hash TEXT NOT NULL, document TEXT, page INTEGER)",
+    "CREATE INDEX IF NOT EXISTS chunks_book ON chunks (book_id)",
+    # BM25 inverted index over Arabic-normalized, lightly stemmed tokens; rowid = chunk id.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(tokens)",
+)
+
+# Columns added after the first release, for stores created before them.
+ADDED_COLUMNS = (("document", "TEXT"), ("page", "INTEGER"))
+
+_schema_checked = False
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def lexical_tokens(text):
+    return " ".join(tokenize(text))
+
+
+def chunk_text(chunk):
+    """Entries of chunks.json are {"text", "document", "page"} dicts; older files hold plain strings."""
+    return chunk if isinstance(chunk, str) else chunk["text"]
+
+
+def read_legacy_chunks():
+    if not os.path.exists(CHUNKS_PATH):
+        return None
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@contextmanager
+def index_lock():
+    """Serialize index and chunk store writers across worker processes on this host."""
+    os.makedirs(os.path.dirname(LOCK_PATH) or ".", exist_ok=True)
+    with open(LOCK_PATH, "w") as handle:
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class ChunkStore:
+    """Read-write access for the ingestion job and the index build."""
+
+    def __init__(self, path=CHUNK_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(chunks)")}
+        for name, declaration in ADDED_COLUMNS:
+            if name not in columns:
+                self.connection.execute(f"ALTER TABLE chunks ADD COLUMN {name} {declaration}")
+        self._backfill_lexical()
+
+    def _backfill_lexical(self):
+        # Stores written before the lexical index existed get it on first open.
+        if self.connection.execute("SELECT 1 FROM chunks_fts LIMIT 1").fetchone() or self.is_empty():
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO chunks_fts (rowid, tokens) VALUES (?, ?)",
+                ((chunk_id, lexical_tokens(text)) for chunk_id, text in self.connection.execute("SELECT id, text FROM chunks").fetchall()),
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def is_empty(self):
+        return self.connection.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is None
+
+    def book_chunks(self, book_id):
+        """{text_hash: id} for the chunks currently indexed for a book."""
+        return dict(self.connection.execute("SELECT text_hash, id FROM chunks WHERE book_id = ?", (book_id,)))
+
+    def insert(self, rows, ids=None):
+        """rows: [(source, book_id, position, text, document, page)]; returns the new ids."""
+        new_ids = []
+        with self.connection:
+            for offset, (source, book_id, position, text, document, page) in enumerate(rows):
+                cursor = self.connection.execute(
+                    "INSERT INTO chunks (id, source, book_id, position, text, text_hash, document, page) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ids[offset] if ids is not None else None, source, book_id, position, text, chunk_hash(text),
+                     document, page),
+                )
+                new_ids.append(cursor.lastrowid)
+                self.connection.execute(
+                    "INSERT INTO chunks_fts (rowid, tokens) VALUES (?, ?)", (cursor.lastrowid, lexical_tokens(text))
+                )
+        return new_ids
+
+    def import_corpus(self, chunks, positions=None):
+        """
+        Corpus chunks from chunks.json, keeping their list positions as ids.
+        `positions` limits the import to the entries a partial build indexed.
+        """
+        positions = range(len(chunks)) if positions is None else positions
+        rows = []
+        for position in positions:
+            chunk = chunks[position]
+            meta = {} if isinstance(chunk, str) else chunk
+            rows.append((CORPUS_SOURCE, None, position, chunk_text(chunk), meta.get("document"), meta.get("page")))
+        return self.insert(rows, ids=list(positions))
+
+    def update_positions(self, positions):
+        with self.connection:
+            self.connection.executemany("UPDATE chunks SET position = ? WHERE id = ?", [(p, i) for i, p in positions.items()])
+
+    def delete(self, ids):
+        with self.connection:
+            self.connection.executemany("DELETE FROM chunks WHERE id = ?", [(int(i),) for i in ids])
+            self.connection.executemany("DELETE FROM chunks_fts WHERE rowid = ?", [(int(i),) for i in ids])
+
+
+def write_corpus_store(chunks, path=CHUNK_DB_PATH, positions=None):
+    """Replace the store with just the corpus chunks; readers switch over atomically."""
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    store = ChunkStore(tmp_path)
+    try:
+        store.import_corpus(chunks, positions)
+    finally:
+        store.close()
+    os.replace(tmp_path, path)
+
+
+def ensure_chunk_store():
+    """
+    Make sure the SQLite store exists, converting a chunks.json-only deploy
+    once. Returns False when there is no chunk text at all.
+    """
+    global _schema_checked
+    if os.path.exists(CHUNK_DB_PATH):
+        if not _schema_checked:
+            # Once per process: bring stores from older releases up to the current schema.
+            with index_lock():
+                ChunkStore(CHUNK_DB_PATH).close()
+            _schema_checked = True
+        return True
+    if not os.path.exists(CHUNKS_PATH):
+        return False
+    with index_lock():
+        if not os.path.exists(CHUNK_DB_PATH):
+            print("📦 Converting rag/chunks.json to rag/chunks.sqlite3...")
+            write_corpus_store(read_legacy_chunks())
+    return True
+
+
+class ChunkTexts:
+    """
+    Read-only, lazily queried view of the store. Each thread gets its own
+    connection because retrieval runs in asyncio worker threads.
+    """
+
+    def __init__(self, path=CHUNK_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def __bool__(self):
+        return True
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def get_many(self, ids):
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        return dict(self._connection().execute(f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", ids))
+
+    def sources(self, ids):
+        """{id: (document, page)} so answers can cite where a chunk came from."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = self._connection().execute(f"SELECT id, document, page FROM chunks WHERE id IN ({placeholders})", ids)
+        return {chunk_id: (document, page) for chunk_id, document, page in rows}
+
+    def lexical_search(self, tokens, limit):
+        """Chunk ids ranked by BM25 for any of the (already normalized) query tokens."""
+        terms = sorted(set(tokens))
+        if not terms:
+            return []
+        query = " OR ".join(f'"{term}"' for term in terms)
+        rows = self._connection().execute(
+            "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?", (query, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,147 @@
+import re
+import unicodedata
+
+import fitz
+
+from .arabic import normalize_arabic
+
+# Size limits per chunk. MAX_CHARS matches the embedding budget
+# (CHAT_BOT_EMBEDDINGS["MAX_CHARS"]) so no chunk is truncated before embedding.
+CHUNK_TOKENS = 96
+OVERLAP_TOKENS = 16
+CHUNK_MAX_CHARS = 350
+# Pages handed to one extraction worker at a time.
+PAGES_PER_TASK = 16
+
+_WHITESPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?؟:؛])\s+")
+_TERMINAL = (".", "!", "?", "؟", ":", "؛", "،", ",")
+# Section openers in fiqh books, matched on normalized text.
+_HEADING_START = re.compile(
+    r"^(باب|الباب|فصل|الفصل|مبحث|المبحث|مطلب|المطلب|كتاب|مساله|المساله|القسم|تمهيد|مقدمه|خاتمه|تنبيه|فائده)\b"
+)
+
+
+def clean_text(text):
+    """
+    Readable Arabic from PDF text: NFKC turns presentation forms and
+    ligatures back into ordinary letters, and line breaks become spaces.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def estimate_tokens(text):
+    # Subword tokenizers split Arabic words into roughly one piece per four letters.
+    return sum(-(-len(word) // 4) for word in text.split())
+
+
+def is_heading(text):
+    words = text.split()
+    if not words or len(words) > 10:
+        return False
+    if _HEADING_START.match(normalize_arabic(text)):
+        return True
+    return len(words) <= 5 and not text.endswith(_TERMINAL)
+
+
+def page_paragraphs(page):
+    """Text blocks of one page in PDF reading order, cleaned."""
+    paragraphs = []
+    for block in page.get_text("blocks"):
+        text = clean_text(block[4]) if block[6] == 0 else ""
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def extract_pages(path, start, stop):
+    """[(page_number, [paragraph, ...])] for pages start..stop-1; runs in worker processes."""
+    with fitz.open(path) as doc:
+        return [(number + 1, page_paragraphs(doc[number])) for number in range(start, min(stop, doc.page_count))]
+
+
+def iter_paragraphs(path, executor=None, pages_per_task=PAGES_PER_TASK):
+    """
+    Yield (page_number, paragraph) in reading order. With an executor, page
+    ranges are extracted in parallel while results are consumed in order,
+    so the document never has to be held as one string.
+    """
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    ranges = [(start, start + pages_per_task) for start in range(0, page_count, pages_per_task)]
+    if executor is None:
+        results = (extract_pages(path, start, stop) for start, stop in ranges)
+    else:
+        results = executor.map(extract_pages, [path] * len(ranges), *zip(*ranges)) if ranges else []
+    for pages in results:
+        for number, paragraphs in pages:
+            for paragraph in paragraphs:
+                yield number, paragraph
+
+
+def _units(paragraphs, max_tokens, max_chars):
+    """Split paragraphs into (page, words, is_heading) pieces that each fit in one chunk."""
+    for page, paragraph in paragraphs:
+        if is_heading(paragraph):
+            yield page, paragraph.split(), True
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            words = sentence.split()
+            piece = []
+            for word in words:
+                if piece and not _fits(piece + [word], max_tokens, max_chars):
+                    yield page, piece, False
+                    piece = []
+                piece.append(word)
+            if piece:
+                yield page, piece, False
+
+
+def _fits(words, max_tokens, max_chars):
+    return sum(len(word) + 1 for word in words) - 1 <= max_chars and estimate_tokens(" ".join(words)) <= max_tokens
+
+
+def chunk_paragraphs(paragraphs, document=None, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS,
+                     max_chars=CHUNK_MAX_CHARS):
+    """
+    Pack (page, paragraph) pairs into chunks of whole sentences. A heading
+    always starts a new chunk; inside a section consecutive chunks share
+    about `overlap_tokens` of text so a rule split across the boundary is
+    still retrievable. Yields {"text", "document", "page"} dicts.
+    """
+    words, pages = [], []
+    body = False  # a run of headings stays together with the text that follows it
+
+    def emit():
+        text = " ".join(words)
+        if len(text) > 10:
+            return {"text": text, "document": document, "page": pages[0]}
+        return None
+
+    for page, unit, heading in _units(paragraphs, max_tokens, max_chars):
+        if words and ((heading and body) or not _fits(words + unit, max_tokens, max_chars)):
+            chunk = emit()
+            if chunk:
+                yield chunk
+            if heading:
+                words, pages, body = [], [], False
+            else:
+                # Carry the tail of the previous chunk, as much as still fits.
+                carry = 0
+                while carry < len(words) - 1 and estimate_tokens(" ".join(words[-(carry + 1):])) <= overlap_tokens:
+                    carry += 1
+                words, pages = (words[-carry:], pages[-carry:]) if carry else ([], [])
+                while words and not _fits(words + unit, max_tokens, max_chars):
+                    words, pages = words[1:], pages[1:]
+        words += unit
+        pages += [page] * len(unit)
+        body = body or not heading
+    if words:
+        chunk = emit()
+        if chunk:
+            yield chunk
+
+
+def extract_pdf_chunks(path, document=None, executor=None):
+    return list(chunk_paragraphs(iter_paragraphs(path, executor), document=document))
+
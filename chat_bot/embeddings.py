@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .arabic import tokenize
+
+DEFAULT_EMBEDDINGS = {
+    "BACKEND": "chat_bot.embeddings.RemoteEmbeddingBackend",
+    "MODEL": "BAAI/bge-m3",
+    "MAX_CHARS": 350,
+    "TIMEOUT": 20,
+    "RETRIES": 2,
+    "MEMORY_CACHE_SIZE": 2048,
+    "DISK_CACHE_PATH": None,
+    "PRELOAD": False,
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def get_embedding_settings():
+    return {**DEFAULT_EMBEDDINGS, **getattr(settings, "CHAT_BOT_EMBEDDINGS", {})}
+
+
+def normalize_text(text, max_chars):
+    return _WHITESPACE.sub(" ", text or "").strip()[:max_chars]
+
+
+def text_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def as_matrix(vectors):
+    """
+    Coerce whatever the provider returned ([v], [[v]], ndarray, ...) into a
+    float32 matrix with one row per input text.
+    """
+    matrix = np.asarray(vectors, dtype="float32")
+    while matrix.ndim > 2:
+        # Token-level outputs: keep the first (CLS) position like before.
+        matrix = matrix[:, 0]
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+
+class BaseEmbeddingBackend:
+    def __init__(self, model, max_chars=350, **options):
+        self.model = model
+        self.max_chars = max_chars
+        self.options = options
+
+    def warm_up(self):
+        pass
+
+    def embed_batch(self, texts):
+        """Return a float32 matrix for already-normalized texts, or None on failure."""
+        raise NotImplementedError
+
+    def embed_texts(self, texts):
+        prepared = [normalize_text(text, self.max_chars) for text in texts]
+        if not prepared:
+            return np.zeros((0, 0), dtype="float32")
+        return self.embed_batch(prepared)
+
+    def embed(self, text):
+        matrix = self.embed_texts([text])
+        if matrix is None or not len(matrix):
+            return None
+        return matrix[0]
+
+    async def aembed_batch(self, texts):
+        # Backends without a native async client run in a worker thread.
+        return await asyncio.to_thread(self.embed_batch, texts)
+
+    async def aembed_texts(self, texts):
+        prepared = [normalize_text(text, self.max_chars) for text in texts]
+        if not prepared:
+            return np.zeros((0, 0), dtype="float32")
+        return await self.aembed_batch(prepared)
+
+    async def aembed(self, text):
+        matrix = await self.aembed_texts([text])
+        if matrix is None or not len(matrix):
+            return None
+        return matrix[0]
+
+
+class RemoteEmbeddingBackend(BaseEmbeddingBackend):
+    """
+    Hugging Face inference API. One client per process so the underlying
+    HTTP session (and its connection pool) is reused across questions.
+    """
+
+    def __init__(self, model, max_chars=350, timeout=20, retries=2, **options):
+        super().__init__(model, max_chars=max_chars, **options)
+        self.timeout = timeout
+        self.retries = retries
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def token(self):
+        return os.environ.get("HUGGINGFACE_API_KEY")
+
+    def get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from huggingface_hub import InferenceClient
+
+                    self._client = InferenceClient(token=self.token, timeout=self.timeout)
+        return self._client
+
+    def get_async_client(self):
+        # httpx async clients belong to the event loop that created them.
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from huggingface_hub import AsyncInferenceClient
+
+            client = AsyncInferenceClient(token=self.token, timeout=self.timeout)
+            self._async_clients[loop] = client
+        return client
+
+    def _check_result(self, result, texts):
+        matrix = as_matrix(result)
+        if len(matrix) == len(texts):
+            return matrix
+        print(f"Embedding Error: expected {len(texts)} vectors, got {len(matrix)}")
+        return None
+
+    def embed_batch(self, texts):
+        if not self.token:
+            print("MISSING HUGGINGFACE_API_KEY")
+            return None
+
+        client = self.get_client()
+        payload = texts[0] if len(texts) == 1 else texts
+        for attempt in range(self.retries):
+            try:
+                matrix = self._check_result(client.feature_extraction(payload, model=self.model), texts)
+                if matrix is not None:
+                    return matrix
+            except Exception as e:
+                print(f"Embedding Error: {e}")
+            if attempt + 1 < self.retries:
+                time.sleep(0.5 * (attempt + 1))
+        return None
+
+    async def aembed_batch(self, texts):
+        if not self.token:
+            print("MISSING HUGGINGFACE_API_KEY")
+            return None
+
+        client = self.get_async_client()
+        payload = texts[0] if len(texts) == 1 else texts
+        for attempt in range(self.retries):
+            try:
+                matrix = self._check_result(await client.feature_extraction(payload, model=self.model), texts)
+                if matrix is not None:
+                    return matrix
+            except Exception as e:
+                print(f"Embedding Error: {e}")
+            if attempt + 1 < self.retries:
+                await asyncio.sleep(0.5 * (attempt + 1))
+        return None
+
+
+class LocalEmbeddingBackend(BaseEmbeddingBackend):
+    """
+    CPU model loaded once per worker through sentence-transformers (optional
+    dependency, only needed when this backend is configured).
+    """
+
+    def __init__(self, model, max_chars=350, batch_size=32, **options):
+        super().__init__(model, max_chars=max_chars, **options)
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        self.get_model()
+
+    def get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError as exc:
+                        raise ImproperlyConfigured(
+                            "LocalEmbeddingBackend requires the sentence-transformers package."
+                        ) from exc
+                    self._model = SentenceTransformer(self.model, device="cpu")
+        return self._model
+
+    def embed_batch(self, texts):
+        vectors = self.get_model().encode(texts, batch_size=self.batch_size, normalize_embeddings=True)
+        return as_matrix(vectors)
+
+
+class HashingEmbeddingBackend(BaseEmbeddingBackend):
+    """
+    Offline stand-in for the embedding service: normalized Arabic tokens and
+    token bigrams hashed into `dim` buckets. Similar wording gives similar
+    vectors, which is enough to exercise retrieval end to end without the
+    network. `latency` (seconds) simulates the remote round trip.
+    """
+
+    def __init__(self, model="hashing", max_chars=350, dim=1024, latency=0.0, **options):
+        super().__init__(model, max_chars=max_chars, **options)
+        self.dim = dim
+        self.latency = latency
+
+    def _vector(self, text):
+        tokens = tokenize(text)
+        vector = np.zeros(self.dim, dtype="float32")
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            vector[zlib.crc32(feature.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_batch(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return np.vstack([self._vector(text) for text in texts])
+
+    async def aembed_batch(self, texts):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return np.vstack([self._vector(text) for text in texts])
+
+
+class EmbeddingCache:
+    """
+    Question -> vector cache: an in-process LRU in front of an optional
+    SQLite file shared by every worker on the host.
+    """
+
+    def __init__(self, max_entries=2048, path=None):
+        self.max_entries = max_entries
+        self.path = str(path) if path else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with sqlite3.connect(self.path) as connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)"
+                )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            self._local.connection = connection
+        return connection
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.path:
+            placeholders = ",".join("?" * len(missing))
+            rows = self._connection().execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+            ).fetchall()
+            with self._lock:
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype="float32")
+                    found[key] = vector
+                    self._remember(key, vector)
+        return found
+
+    def set_many(self, items):
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+        if self.path and items:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                    [(key, len(vector), np.asarray(vector, dtype="float32").tobytes()) for key, vector in items.items()],
+                )
+
+
+class CachedEmbeddingBackend(BaseEmbeddingBackend):
+    def __init__(self, backend, cache):
+        super().__init__(backend.model, max_chars=backend.max_chars)
+        self.backend = backend
+        self.cache = cache
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+    def _lookup(self, texts):
+        keys = [text_key(self.model, text) for text in texts]
+        found = self.cache.get_many(keys)
+        misses = list(OrderedDict((key, text) for key, text in zip(keys, texts) if key not in found).items())
+        return keys, found, misses
+
+    def _store(self, keys, found, misses, matrix):
+        if misses:
+            if matrix is None:
+                return None
+            fresh = {key: matrix[row] for row, (key, _) in enumerate(misses)}
+            self.cache.set_many(fresh)
+            found.update(fresh)
+        return np.vstack([found[key] for key in keys]).astype("float32", copy=False)
+
+    def embed_batch(self, texts):
+        keys, found, misses = self._lookup(texts)
+        matrix = self.backend.embed_batch([text for _, text in misses]) if misses else None
+        return self._store(keys, found, misses, matrix)
+
+    async def aembed_batch(self, texts):
+        keys, found, misses = self._lookup(texts)
+        matrix = await self.backend.aembed_batch([text for _, text in misses]) if misses else None
+        return self._store(keys, found, misses, matrix)
+
+
+@lru_cache(maxsize=None)
+def get_embedding_backend():
+    config = get_embedding_settings()
+    backend_class = import_string(config["BACKEND"])
+    backend = backend_class(
+        config["MODEL"],
+        max_chars=config["MAX_CHARS"],
+        timeout=config["TIMEOUT"],
+        retries=config["RETRIES"],
+    )
+    if not config["MEMORY_CACHE_SIZE"] and not config["DISK_CACHE_PATH"]:
+        return backend
+    cache = EmbeddingCache(max_entries=config["MEMORY_CACHE_SIZE"], path=config["DISK_CACHE_PATH"])
+    return CachedEmbeddingBackend(backend, cache)
@@ -0,0 +1,120 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+DEFAULT_REPLY = "ترث الزوجة الربع عند عدم وجود الفرع الوارث، والثمن عند وجوده."
+
+
+def split_tokens(text):
+    return re.findall(r"\S+\s*", text) or [text]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path.rstrip("/") != COMPLETIONS_PATH:
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        server = self.server
+        server.requests.append(body)
+        tokens = split_tokens(server.reply)
+        model = body.get("model", "fake")
+
+        time.sleep(server.first_token_delay)
+        if not body.get("stream"):
+            self._send_json({
+                "id": "fake-completion",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": server.reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(server.token_delay)
+            self._send_chunk(self._event(model, {"content": token}, None))
+        self._send_chunk(self._event(model, {}, "stop"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _event(self, model, delta, finish_reason):
+        chunk = {
+            "id": "fake-completion",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    OpenAI/Groq-compatible chat completions endpoint that answers with a fixed
+    reply, token by token, after configurable delays. Point
+    CHAT_BOT_LLM["BASE_URL"] at `base_url` to exercise the chat views offline.
+
+        with FakeLLMServer(first_token_delay=0.5) as server:
+            ...  # server.base_url, server.requests
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, reply=DEFAULT_REPLY, first_token_delay=0.0, token_delay=0.02):
+        super().__init__((host, port), FakeLLMHandler)
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.requests = []
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,356 @@
+import re
+from decimal import Decimal
+
+from django.conf import settings
+
+from calculator.engine import InheritanceEngine
+from cases.models import Heir
+
+from .arabic import normalize_arabic
+
+DEFAULT_CALCULATOR = {
+    "ENABLED": True,
+    # Answer enumeration questions straight from the engine; questions that
+    # also ask for reasoning still go to the LLM, with the computed table.
+    "INSTANT": True,
+    # The LLM only explains a table it is given, so it needs far fewer tokens.
+    "MAX_TOKENS": 400,
+}
+
+R = Heir.Relationship
+
+# Word forms are normalized with ta marbuta kept (والد / والدة).
+# form -> (kind, number); number 0 means a plural that needs an explicit count.
+_BASES = {
+    "ابن": ("son", 1), "ولد": ("son", 1), "ابنين": ("son", 2), "ابنان": ("son", 2),
+    "ولدين": ("son", 2), "ولدان": ("son", 2), "ابناء": ("son", 0),
+    "بنت": ("daughter", 1), "ابنة": ("daughter", 1), "بنتين": ("daughter", 2), "بنتان": ("daughter", 2),
+    "ابنتين": ("daughter", 2), "ابنتان": ("daughter", 2), "بنات": ("daughter", 0),
+    "زوج": ("husband", 1),
+    "زوجة": ("wife", 1), "زوجتين": ("wife", 2), "زوجتان": ("wife", 2), "زوجات": ("wife", 0),
+    "اب": ("father", 1), "والد": ("father", 1), "ابو": ("father", 1),
+    "ام": ("mother", 1), "والدة": ("mother", 1),
+    "اخ": ("brother", 1), "شقيق": ("brother", 1), "اخوين": ("brother", 2), "اخوان": ("brother", 2),
+    "شقيقين": ("brother", 2), "شقيقان": ("brother", 2), "اخوة": ("brother", 0), "اشقاء": ("brother", 0),
+    "اخت": ("sister", 1), "شقيقة": ("sister", 1), "اختين": ("sister", 2), "اختان": ("sister", 2),
+    "شقيقتين": ("sister", 2), "شقيقتان": ("sister", 2), "اخوات": ("sister", 0), "شقيقات": ("sister", 0),
+    "جد": ("grandfather", 1),
+    "جدة": ("grandmother", 1), "جدتين": ("grandmother", 2), "جدتان": ("grandmother", 2), "جدات": ("grandmother", 0),
+    "عم": ("uncle", 1), "عمين": ("uncle", 2), "عمان": ("uncle", 2), "اعمام": ("uncle", 0),
+    # Relatives the engine does not model (ذوو الأرحام): leave those questions to the LLM.
+    "خال": ("unsupported", 1), "خالة": ("unsupported", 1), "عمة": ("unsupported", 1),
+    "اخوال": ("unsupported", 0), "خالات": ("unsupported", 0), "عمات": ("unsupported", 0),
+}
+
+# (kind of the first word, second word) -> kind of the compound, e.g. ابن + الابن -> son_of_son.
+_COMPOUNDS = {
+    ("son", "ابن"): "son_of_son", ("daughter", "ابن"): "daughter_of_son",
+    ("son", "اخ"): "son_of_brother", ("son", "عم"): "son_of_uncle",
+    ("mother", "اب"): "grandmother_father", ("mother", "ام"): "grandmother_mother",
+    ("father", "اب"): "grandfather", ("father", "ام"): "unsupported",
+    ("son", "بنت"): "unsupported", ("daughter", "بنت"): "unsupported",
+    ("son", "اخت"): "unsupported", ("daughter", "اخت"): "unsupported",
+    ("daughter", "اخ"): "unsupported", ("daughter", "عم"): "unsupported",
+}
+
+_LINES = {
+    "لاب": "father", "للاب": "father", "لام": "mother", "للام": "mother",
+    "شقيق": "full", "شقيقة": "full", "اشقاء": "full", "شقيقين": "full", "شقيقان": "full",
+    "شقيقتين": "full", "شقيقتان": "full", "شقيقات": "full",
+}
+
+# (kind, line) -> relationship; line None means it was not stated.
+_RELATIONSHIPS = {
+    ("husband", None): R.HUSBAND, ("wife", None): R.WIFE,
+    ("son", None): R.SON, ("daughter", None): R.DAUGHTER,
+    ("father", None): R.FATHER, ("mother", None): R.MOTHER,
+    ("son_of_son", None): R.SON_OF_SON, ("daughter_of_son", None): R.DAUGHTER_OF_SON,
+    ("grandfather", None): R.GRANDFATHER_FATHER, ("grandfather", "father"): R.GRANDFATHER_FATHER,
+    ("grandmother", "father"): R.GRANDMOTHER_FATHER, ("grandmother_father", None): R.GRANDMOTHER_FATHER,
+    ("grandmother", "mother"): R.GRANDMOTHER_MOTHER, ("grandmother_mother", None): R.GRANDMOTHER_MOTHER,
+    ("brother", "full"): R.BROTHER, ("brother", "father"): R.BROTHER_FATHER, ("brother", "mother"): R.BROTHER_MOTHER,
+    ("sister", "full"): R.SISTER, ("sister", "father"): R.SISTER_FATHER, ("sister", "mother"): R.SISTER_MOTHER,
+    ("son_of_brother", "full"): R.SON_OF_BROTHER, ("son_of_brother", "father"): R.SON_OF_BROTHER_FATHER,
+    ("uncle", "full"): R.UNCLE, ("uncle", "father"): R.UNCLE_FATHER,
+    ("son_of_uncle", "full"): R.SON_OF_UNCLE, ("son_of_uncle", "father"): R.SON_OF_UNCLE_FATHER,
+}
+
+# When the line is not stated, the common reading is assumed and said so in the answer.
+_DEFAULT_LINES = {
+    "brother": ("full", "الإخوة أشقاء"), "sister": ("full", "الأخوات شقيقات"),
+    "son_of_brother": ("full", "ابن الأخ ابنَ أخ شقيق"), "uncle": ("full", "العم شقيقاً"),
+    "son_of_uncle": ("full", "ابن العم ابنَ عم شقيق"), "grandmother": ("mother", "الجدة من جهة الأم"),
+}
+
+_NUMBERS = {
+    "واحد": 1, "واحدة": 1, "اثنين": 2, "اثنان": 2, "اثنتين": 2, "اثنتان": 2,
+    "ثلاث": 3, "ثلاثة": 3, "اربع": 4, "اربعة": 4, "خمس": 5, "خمسة": 5, "ست": 6, "ستة": 6,
+    "سبع": 7, "سبعة": 7, "ثمان": 8, "ثماني": 8, "ثمانية": 8, "تسع": 9, "تسعة": 9, "عشر": 10, "عشرة": 10,
+}
+
+# At most one of these per estate; more means the question is not a real enumeration.
+_SINGLE = {R.HUSBAND, R.FATHER, R.MOTHER, R.GRANDFATHER_FATHER, R.GRANDMOTHER_FATHER, R.GRANDMOTHER_MOTHER}
+
+_FEMALE = {
+    R.WIFE, R.DAUGHTER, R.MOTHER, R.SISTER, R.DAUGHTER_OF_SON, R.GRANDMOTHER_FATHER, R.GRANDMOTHER_MOTHER,
+    R.SISTER_FATHER, R.SISTER_MOTHER,
+}
+_FEMALE_KINDS = {"wife", "daughter", "mother", "sister", "grandmother", "daughter_of_son"}
+
+# Longer forms first, so "توفيت" is not read as "توفي" followed by a stray "ت".
+_DEATH = re.compile(r"(توفيت|توفي|توفى|ماتت|مات|هلكت|هلك|المتوفي|المتوفاة|متوفي|متوفاة|الميتة|الميت|ورثتها|ورثته|الورثة)")
+_FEMALE_DEATH = re.compile(r"(توفيت|ماتت|هلكت|متوفاة|المتوفاة|الميتة|امراة|ورثتها)")
+_QUESTION_WORDS = {"هل", "فهل", "ما", "فما", "وما", "كم", "فكم", "كيف", "فكيف", "ماذا", "فماذا", "لمن"}
+_STOP_WORDS = {"نصيب", "يرث", "ترث", "يرثون", "مع"}
+# Words a question puts between the heirs ("مات رجل وترك ...", "... وترك 100000 ريال").
+# Any other word may be a relative the parser cannot read, so the question goes to the LLM.
+_FILLER = {
+    "عن", "رجل", "امراة", "شخص", "هالك", "هالكة", "ترك", "تركت", "خلف", "خلفت", "تاركا", "تاركة", "له", "لها", "من", "فقط",
+    "ورثة", "وارث", "هم", "هو", "هي", "كل", "مبلغ", "قدره", "قدرها", "تركة", "تركته", "تركتها", "مال", "مالا",
+    "قيمتها", "دينار", "ريال", "جنيه", "درهم", "دولار", "ليرة", "الف", "الاف", "مليون", "ملايين",
+}
+_EXPLAIN = re.compile(r"(لماذا|علل|تعليل|دليل|الدليل|اشرح|شرح|وضح|كيف|السبب|سبب)")
+_WORD = re.compile(r"[^\W\d_]+|\d+")
+_MULTIPLIERS = {"الف": 1000, "الاف": 1000, "مليون": 1000000, "ملايين": 1000000}
+_ESTATE = re.compile(
+    r"(?:(?:ترك|تركة|تركته|تركتها|مبلغ|قدره|قدرها|قيمتها|مالا)\D{0,15}?(\d[\d,]*(?:\.\d+)?)\s*(الف|الاف|مليون|ملايين)?)"
+    r"|(?:(\d[\d,]*(?:\.\d+)?)\s*(الف|الاف|مليون|ملايين)?\s*(?:دينار|ريال|جنيه|درهم|دولار|ليرة))"
+)
+
+
+def get_calculator_settings():
+    return {**DEFAULT_CALCULATOR, **getattr(settings, "CHAT_BOT_CALCULATOR", {})}
+
+
+class HeirQuestion:
+    """An estate described in a chat question: who inherits, how many of each, and the amount if given."""
+
+    def __init__(self, heirs, estate=None, assumptions=()):
+        self.heirs = heirs  # [(relationship, count)] in the order they were mentioned
+        self.estate = estate
+        self.assumptions = list(assumptions)
+
+
+def _bare(word):
+    word = word[2:] if word.startswith("ال") and len(word) > 3 else word
+    # شقيقا / شقيقاً
+    return word[:-1] if word.endswith("ا") and word[:-1] in _LINES else word
+
+
+def _forms(word):
+    """The word as written, without a leading conjunction, article or possessive suffix."""
+    forms = [word]
+    if len(word) > 2 and word[0] in "وف":
+        forms.append(word[1:])
+    for form in list(forms):
+        # "لزوجة" but not "لام"/"لاب", which name a line (أخ لأم).
+        if form.startswith("ل") and len(form) > 3 and form not in _LINES:
+            forms.append(form[1:])
+    for form in list(forms):
+        if form.startswith("ال") and len(form) > 3:
+            forms.append(form[2:])
+    for form in list(forms):
+        # زوجها، ابنه، زوجته، اخيه، and the accusative اخا / ابنا
+        for suffix in ("ها", "ه", "ا"):
+            if form.endswith(suffix) and len(form) > len(suffix) + 1:
+                stem = form[:-len(suffix)]
+                forms.append(stem)
+                if stem.endswith("ت"):
+                    forms.append(stem[:-1] + "ة")
+                elif suffix != "ا" and stem.endswith(("ا", "ي")) and len(stem) > 2:
+                    # The dual ابناه / ابنيها before the five nouns اباه / اخيه.
+                    forms.extend((stem + "ن", stem[:-1]))
+    return forms
+
+
+def _lookup(word, table):
+    for form in _forms(word):
+        if form in table:
+            return table[form]
+    return None
+
+
+def _possessive(word):
+    return word.endswith(("ه", "ها")) and _lookup(word, _BASES) is not None and word not in _BASES
+
+
+def _filler(word):
+    return word.isdigit() or _bare(word) in _LINES or any(form in _FILLER for form in _forms(word))
+
+
+def _number(word):
+    if word.isdigit():
+        return int(word) if len(word) <= 2 else None
+    return _lookup(word, _NUMBERS)
+
+
+def parse_estate(text):
+    match = _ESTATE.search(text)
+    if not match:
+        return None
+    amount, multiplier = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    value = Decimal(amount.replace(",", ""))
+    return value * _MULTIPLIERS.get(multiplier, 1)
+
+
+def _read_heir(words, i):
+    """Relative starting at words[i]: (kind, grammatical number, line, next index), or None."""
+    base = _lookup(words[i], _BASES)
+    if base is None:
+        return None
+    kind, grammatical = base
+    i += 1
+    if i < len(words):
+        compound = _COMPOUNDS.get((kind, _bare(words[i])))
+        if compound:
+            kind, i = compound, i + 1
+    line = None
+    if i < len(words) and _bare(words[i]) in _LINES:
+        line, i = _LINES[_bare(words[i])], i + 1
+    elif i + 1 < len(words) and words[i] == "من" and _bare(words[i + 1]) in ("اب", "ام"):
+        line, i = ("father" if _bare(words[i + 1]) == "اب" else "mother"), i + 2
+    return kind, grammatical, line, i
+
+
+def parse_heir_question(question):
+    """
+    Recognize "توفي عن زوجة وأم وابنين"-style questions. Returns a
+    HeirQuestion, or None when the question is not a complete enumeration
+    the engine can compute (no death, unknown counts, relatives it does not
+    model, contradictory spouses...).
+    """
+    text = normalize_arabic(question, keep_ta_marbuta=True)
+    death = _DEATH.search(text)
+    if not death:
+        return None
+    female = bool(_FEMALE_DEATH.search(text))
+    estate = parse_estate(text)
+
+    words = _WORD.findall(text[death.end():])
+    # "...فما نصيب الأم؟": the heirs are listed before the question itself.
+    for position, word in enumerate(words):
+        if word in _QUESTION_WORDS or word in _STOP_WORDS or any(_EXPLAIN.fullmatch(form) for form in _forms(word)):
+            words = words[:position]
+            break
+    i = 0
+    # "توفي زوجها عن ..." names the deceased, not an heir; "ورثته زوجة وابن" lists heirs straight away.
+    if words and words[0] != "عن" and not death.group().startswith(("ورثت", "الورثة")):
+        subject = _read_heir(words, 0)
+        if subject:
+            if _possessive(words[0]) or subject[0] == "unsupported":
+                return None
+            female = subject[0] in _FEMALE_KINDS
+            i = subject[3]
+
+    counts = {}
+    assumptions = []
+    pending = None
+    while i < len(words):
+        heir = _read_heir(words, i)
+        if heir is None:
+            # A count only applies to the relative right after it.
+            pending = _number(words[i])
+            if pending is None and not _filler(words[i]):
+                return None
+            i += 1
+            continue
+        kind, grammatical, line, i = heir
+        if kind == "unsupported":
+            return None
+        if kind in _DEFAULT_LINES and line is None:
+            line, reading = _DEFAULT_LINES[kind]
+            assumptions.append(f"اعتُبر {reading} لعدم ذكر الجهة.")
+        elif kind == "grandmother" and line == "full":
+            line = None
+
+        relationship = _RELATIONSHIPS.get((kind, line))
+        if relationship is None:
+            return None
+
+        # "ثلاثة أبناء" / "أبناء ثلاثة"; dual and singular forms carry their own count.
+        count = pending
+        if (count is None and not grammatical and i < len(words) and _number(words[i]) is not None
+                and (i + 1 >= len(words) or _read_heir(words, i + 1) is None)):
+            count, i = _number(words[i]), i + 1
+        count = count or grammatical
+        pending = None
+        if not count:
+            return None
+        counts[relationship] = counts.get(relationship, 0) + count
+
+    if not counts or (R.HUSBAND in counts and R.WIFE in counts):
+        return None
+    female = female or R.HUSBAND in counts
+    if (female and R.WIFE in counts) or counts.get(R.WIFE, 0) > 4:
+        return None
+    if any(counts.get(relationship, 0) > 1 for relationship in _SINGLE):
+        return None
+    return HeirQuestion(list(counts.items()), estate, dict.fromkeys(assumptions))
+
+
+def compute_shares(parsed):
+    """Run the engine on unsaved Heir rows; returns [(relationship, count, share dict of one member)]."""
+    heirs = []
+    members = []
+    for relationship, count in parsed.heirs:
+        group = []
+        for _ in range(count):
+            heir = Heir(id=len(heirs) + 1, name=relationship.label, relationship=relationship,
+                        gender=Heir.Gender.FEMALE if relationship in _FEMALE else Heir.Gender.MALE)
+            heirs.append(heir)
+            group.append(heir.id)
+        members.append((relationship, count, group))
+    shares = InheritanceEngine(parsed.estate or Decimal(0), heirs).calculate()
+    return [(relationship, count, shares.get(group[0], {})) for relationship, count, group in members]
+
+
+def _amount(value):
+    return f"{value:,.2f}"
+
+
+def format_shares(parsed, rows):
+    lines = ["توزيع التركة وفق محرك المواريث للورثة المذكورين:"]
+    for relationship, count, share in rows:
+        label = relationship.label + (f" ×{count}" if count > 1 else "")
+        if share.get("is_blocked"):
+            lines.append(f"- {label}: محجوب ({share.get('blocking_reason', '')})")
+            continue
+        each = ("لكل واحدة " if relationship in _FEMALE else "لكل واحد ") if count > 1 else ""
+        adjustment = f" بعد {share['adjustment']}" if share.get("adjustment") else ""
+        line = f"- {label}: {share['fraction']}{adjustment} — {each}{share['percentage']:.2f}% من التركة"
+        if parsed.estate:
+            line += f" ({_amount(share['value'])})"
+        lines.append(line)
+    if parsed.estate:
+        lines.append(f"صافي التركة: {_amount(parsed.estate)}")
+    else:
+        lines.append("لم تُذكر قيمة التركة، فالنسب من صافي التركة بعد التجهيز والديون والوصية.")
+    lines.extend(parsed.assumptions)
+    return "\n".join(lines)
+
+
+class EngineAnswer:
+    def __init__(self, table, instant):
+        self.table = table
+        self.instant = instant
+
+    @property
+    def answer(self):
+        return self.table + "\n\nهذا حساب آلي بحسب الورثة المذكورين فقط؛ تُراعى موانع الإرث وتفاصيل الحالة عند القاضي."
+
+
+def engine_answer(question):
+    """EngineAnswer for computable inheritance questions, otherwise None."""
+    config = get_calculator_settings()
+    if not config["ENABLED"]:
+        return None
+    parsed = parse_heir_question(question)
+    if parsed is None:
+        return None
+    rows = compute_shares(parsed)
+    if any(not share for _, _, share in rows):
+        # The engine left an heir who is not blocked without a share: a case it does not cover.
+        return None
+    table = format_shares(parsed, rows)
+    explain = _EXPLAIN.search(normalize_arabic(question, keep_ta_marbuta=True))
+    return EngineAnswer(table, instant=config["INSTANT"] and not explain)
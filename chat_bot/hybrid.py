@@ -0,0 +1,124 @@
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .arabic import tokenize
+from .retrieval import dense_search, get_rag_resources
+
+DEFAULT_RETRIEVAL = {
+    # Dense-only retrieval when False (the behaviour before hybrid search).
+    "HYBRID": True,
+    "K": 3,
+    # How many ids each retriever contributes before fusion and re-ranking.
+    "CANDIDATES": 20,
+    # Reciprocal rank fusion constant; larger values flatten the head of each list.
+    "RRF_K": 60,
+    "RERANKER": "chat_bot.hybrid.TermCoverageReranker",
+    "RERANKER_OPTIONS": {},
+}
+
+
+def get_retrieval_settings():
+    return {**DEFAULT_RETRIEVAL, **getattr(settings, "CHAT_BOT_RETRIEVAL", {})}
+
+
+def rrf_fuse(rankings, k=60):
+    """Merge ranked id lists by reciprocal rank fusion; returns [(id, score)] best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class TermCoverageReranker:
+    """
+    Cheap default: orders fused candidates by how many distinct query terms
+    each chunk contains, falling back to the fused rank between equals.
+    Fiqh questions hinge on specific heirs and shares (الام، السدس...), which
+    a nearby-but-wrong chunk often lacks.
+    """
+
+    def __init__(self, rank_weight=0.25):
+        self.rank_weight = rank_weight
+
+    def rerank(self, question, hits):
+        terms = set(tokenize(question))
+        if not terms:
+            return hits
+        scored = []
+        for rank, (chunk_id, text) in enumerate(hits):
+            coverage = len(terms.intersection(tokenize(text))) / len(terms)
+            scored.append((coverage + self.rank_weight / (rank + 1), chunk_id, text))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(chunk_id, text) for _, chunk_id, text in scored]
+
+
+class CrossEncoderReranker:
+    """
+    Scores (question, chunk) pairs with a local cross-encoder through
+    sentence-transformers (optional dependency, only needed when configured).
+    """
+
+    def __init__(self, model="BAAI/bge-reranker-v2-m3", max_length=512):
+        self.model = model
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+
+    def get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                    except ImportError as exc:
+                        raise ImproperlyConfigured(
+                            "CrossEncoderReranker requires the sentence-transformers package."
+                        ) from exc
+                    self._model = CrossEncoder(self.model, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def rerank(self, question, hits):
+        if not hits:
+            return hits
+        scores = self.get_model().predict([(question, text) for _, text in hits])
+        order = sorted(range(len(hits)), key=lambda i: float(scores[i]), reverse=True)
+        return [hits[i] for i in order]
+
+
+@lru_cache(maxsize=None)
+def get_reranker():
+    config = get_retrieval_settings()
+    if not config["RERANKER"]:
+        return None
+    return import_string(config["RERANKER"])(**config["RERANKER_OPTIONS"])
+
+
+def hybrid_search(question, vector, k=None):
+    """
+    Return [(chunk_id, text), ...]: FAISS neighbours and BM25 matches over
+    normalized Arabic tokens, fused by reciprocal rank and re-ranked.
+    """
+    config = get_retrieval_settings()
+    index, chunks = get_rag_resources()
+    if not index or not chunks:
+        return None
+    return hybrid_hits(index, chunks, question, vector, k or config["K"], config)
+
+
+def hybrid_hits(index, chunks, question, vector, k, config=DEFAULT_RETRIEVAL):
+    candidates = max(config["CANDIDATES"], k)
+    dense = dense_search(index, vector, candidates)
+    lexical = chunks.lexical_search(tokenize(question), candidates)
+    fused = [chunk_id for chunk_id, _ in rrf_fuse([dense, lexical], config["RRF_K"])[:candidates]]
+
+    texts = chunks.get_many(fused)
+    hits = [(chunk_id, texts[chunk_id]) for chunk_id in fused if chunk_id in texts]
+    reranker = get_reranker()
+    if reranker is not None:
+        hits = reranker.rerank(question, hits)
+    return hits[:k]
@@ -0,0 +1,81 @@
+import time
+
+import faiss
+import numpy as np
+
+from .index_factory import create_index, normalized
+
+
+def percentile_ms(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000, 3)
+
+
+def corpus_vectors(index):
+    """Stored vectors of a flat (or ID-mapped flat/HNSW) index, normalized."""
+    inner = index.index if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) else index
+    return normalized(inner.reconstruct_n(0, inner.ntotal))
+
+
+def synthetic_vectors(count, dim, seed=0, clusters=256):
+    # Clustered rather than uniform noise, which is closer to how topic chunks sit in embedding space.
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    labels = rng.integers(0, clusters, count)
+    return normalized(centers[labels] + 0.6 * rng.standard_normal((count, dim)).astype("float32"))
+
+
+def sample_queries(vectors, count, noise=0.05, seed=1):
+    """Perturbed corpus vectors stand in for questions about the indexed text."""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    return normalized(picks + noise * rng.standard_normal(picks.shape).astype("float32"))
+
+
+def benchmark_kind(kind, vectors, queries, truth, ks, config):
+    started = time.perf_counter()
+    index = create_index(vectors.shape[1], kind, config, train_vectors=vectors if kind == "ivfpq" else None)
+    index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+    build_s = time.perf_counter() - started
+
+    top_k = max(ks)
+    latencies = []
+    found = np.empty((len(queries), top_k), dtype="int64")
+    for row, query in enumerate(queries):
+        # One question at a time, like the chat view, so latency is per request.
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), top_k)
+        latencies.append(time.perf_counter() - started)
+        found[row] = ids[0]
+
+    recall = {
+        f"recall@{k}": round(float(np.mean([
+            len(set(found[row, :k]) & set(truth[row, :k])) / k for row in range(len(queries))
+        ])), 4)
+        for k in ks
+    }
+    return {
+        "kind": kind,
+        "build_s": round(build_s, 3),
+        **recall,
+        "p50_ms": percentile_ms(latencies, 0.50),
+        "p99_ms": percentile_ms(latencies, 0.99),
+        "index_mb": round(len(faiss.serialize_index(index)) / 2 ** 20, 2),
+    }
+
+
+def run_index_benchmark(vectors, kinds, ks=(3, 10), query_count=200, config=None):
+    """
+    Compare index kinds on the same vectors. Ground truth is exact cosine
+    search, so the flat row is the baseline (recall 1.0).
+    """
+    from .index_factory import DEFAULT_INDEX
+
+    config = config or DEFAULT_INDEX
+    queries = sample_queries(vectors, query_count)
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, max(ks))
+    return [benchmark_kind(kind, vectors, queries, truth, ks, config) for kind in kinds]
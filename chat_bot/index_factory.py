@@ -0,0 +1,157 @@
+import faiss
+import numpy as np
+
+DEFAULT_INDEX = {
+    # "auto" picks by corpus size; or force "flat", "hnsw" or "ivfpq".
+    "KIND": "auto",
+    "HNSW_MIN_VECTORS": 50000,
+    "IVFPQ_MIN_VECTORS": 1000000,
+    "HNSW_M": 32,
+    "HNSW_EF_CONSTRUCTION": 200,
+    "HNSW_EF_SEARCH": 64,
+    "IVF_NPROBE": 16,
+    "PQ_BYTES": 64,
+    "MAX_TRAINING_VECTORS": 100000,
+}
+
+INDEX_KINDS = ("flat", "hnsw", "ivfpq")
+
+
+def get_index_settings():
+    from django.conf import settings
+
+    return {**DEFAULT_INDEX, **getattr(settings, "CHAT_BOT_INDEX", {})}
+
+
+def choose_kind(count, config=DEFAULT_INDEX):
+    kind = config["KIND"]
+    if kind != "auto":
+        return kind
+    if count >= config["IVFPQ_MIN_VECTORS"]:
+        return "ivfpq"
+    if count >= config["HNSW_MIN_VECTORS"]:
+        return "hnsw"
+    return "flat"
+
+
+def normalized(vectors):
+    """float32 copy with unit rows: inner product on these is cosine similarity."""
+    matrix = np.array(vectors, dtype="float32", copy=True).reshape(len(vectors), -1)
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+def uses_cosine(index):
+    return index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+
+def prepare_vectors(index, vectors):
+    """Vectors as the index expects them (normalized for cosine indexes, raw for legacy L2 ones)."""
+    if uses_cosine(index):
+        return normalized(vectors)
+    return np.ascontiguousarray(vectors, dtype="float32").reshape(len(vectors), -1)
+
+
+def _ivf_lists(count):
+    # ~4*sqrt(n) lists, with enough training points (39 per centroid) to be meaningful.
+    return max(1, min(int(4 * np.sqrt(count)), count // 39))
+
+
+def _pq_subquantizers(dim, pq_bytes):
+    m = min(pq_bytes, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def create_index(dim, kind, config=DEFAULT_INDEX, train_vectors=None):
+    """
+    Empty ID-mapped cosine index of the given kind. IVF-PQ is trained on
+    `train_vectors` (already normalized).
+    """
+    if kind == "flat":
+        inner = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(dim, config["HNSW_M"], faiss.METRIC_INNER_PRODUCT)
+        inner.hnsw.efConstruction = config["HNSW_EF_CONSTRUCTION"]
+    elif kind == "ivfpq":
+        if train_vectors is None or not len(train_vectors):
+            raise ValueError("IVF-PQ needs training vectors.")
+        if len(train_vectors) > config["MAX_TRAINING_VECTORS"]:
+            # k-means cost grows with the sample; a random subset trains just as well.
+            picks = np.random.default_rng(0).choice(len(train_vectors), config["MAX_TRAINING_VECTORS"], replace=False)
+            train_vectors = train_vectors[np.sort(picks)]
+        nlist = _ivf_lists(len(train_vectors))
+        m = _pq_subquantizers(dim, config["PQ_BYTES"])
+        inner = faiss.index_factory(dim, f"IVF{nlist},PQ{m}", faiss.METRIC_INNER_PRODUCT)
+        inner.train(train_vectors)
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+    index = faiss.IndexIDMap2(inner)
+    configure_search(index, config)
+    return index
+
+
+def build_index(vectors, ids, kind="auto", config=DEFAULT_INDEX):
+    matrix = normalized(vectors)
+    kind = choose_kind(len(matrix), config) if kind == "auto" else kind
+    index = create_index(matrix.shape[1], kind, config, train_vectors=matrix if kind == "ivfpq" else None)
+    index.add_with_ids(matrix, np.asarray(ids, dtype="int64"))
+    return index
+
+
+def index_kind(index):
+    inner = faiss.downcast_index(index.index) if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if faiss.try_extract_index_ivf(inner) is not None:
+        return "ivfpq"
+    return "flat"
+
+
+def configure_search(index, config=DEFAULT_INDEX):
+    """Search-time knobs are not all persisted with the index, so apply them after every load."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = config["HNSW_EF_SEARCH"]
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        ivf.nprobe = config["IVF_NPROBE"]
+    return index
+
+
+def all_ids(index):
+    return faiss.vector_to_array(index.id_map).astype("int64")
+
+
+def resize_for_corpus(index, config=DEFAULT_INDEX):
+    """
+    Rebuild an exact cosine index as the kind its size now calls for, so a
+    library grown book by book leaves the flat scan behind. Only flat
+    indexes are converted, since they still hold the original vectors.
+    """
+    if not uses_cosine(index) or index_kind(index) != "flat":
+        return index
+    kind = choose_kind(index.ntotal, config)
+    if kind == "flat":
+        return index
+    return build_index(index.index.reconstruct_n(0, index.ntotal), all_ids(index), kind=kind, config=config)
+
+
+def remove_ids(index, ids, config=DEFAULT_INDEX):
+    """
+    Remove ids and return the resulting index. HNSW graphs cannot delete
+    nodes, so those are rebuilt from their stored vectors without the ids.
+    """
+    ids = np.asarray(ids, dtype="int64")
+    if index_kind(index) != "hnsw":
+        index.remove_ids(ids)
+        return index
+
+    current = all_ids(index)
+    keep = ~np.isin(current, ids)
+    vectors = index.index.reconstruct_n(0, index.ntotal)[keep]
+    rebuilt = create_index(index.d, "hnsw", config)
+    if len(vectors):
+        rebuilt.add_with_ids(vectors, current[keep])
+    return rebuilt
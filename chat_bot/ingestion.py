@@ -0,0 +1,121 @@
+import os
+
+import faiss
+import numpy as np
+
+from .chunk_store import ChunkStore, chunk_hash, index_lock, read_legacy_chunks
+from .chunking import extract_pdf_chunks
+from .embeddings import get_embedding_backend
+from .index_factory import (
+    all_ids, choose_kind, create_index, get_index_settings, normalized, prepare_vectors, remove_ids, resize_for_corpus,
+)
+from .retrieval import INDEX_PATH
+
+EMBED_BATCH_SIZE = 32
+
+
+class IngestionError(Exception):
+    pass
+
+
+def load_library_index(store):
+    """
+    Return the ID-mapped index, importing the corpus built by
+    rag/build_index.py (ids = positions in chunks.json) on first use.
+    """
+    index = faiss.read_index(INDEX_PATH) if os.path.exists(INDEX_PATH) else None
+    if index is None:
+        return None
+
+    id_mapped = isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2))
+    if store.is_empty():
+        chunks = read_legacy_chunks()
+        # A partial build (--allow-partial) indexes only some positions of chunks.json.
+        positions = sorted(all_ids(index).tolist()) if id_mapped else list(range(index.ntotal))
+        if chunks is None or (positions and positions[-1] >= len(chunks)) or (not id_mapped and len(chunks) != index.ntotal):
+            raise IngestionError("rag/index.faiss does not match rag/chunks.json; rebuild it first.")
+        store.import_corpus(chunks, positions)
+    if id_mapped:
+        return index
+
+    # Indexes from before the ID map (plain IndexFlatL2) keep their metric; ids are positions.
+    mapped = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+    if index.ntotal:
+        mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype="int64"))
+    write_index(mapped)
+    return mapped
+
+
+def write_index(index):
+    # Workers reload when the file changes, so never expose a half-written one.
+    faiss.write_index(index, INDEX_PATH + ".tmp")
+    os.replace(INDEX_PATH + ".tmp", INDEX_PATH)
+
+
+def embed_chunks(texts, progress=None):
+    backend = get_embedding_backend()
+    matrices = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        matrix = backend.embed_texts(texts[start:start + EMBED_BATCH_SIZE])
+        if matrix is None:
+            # A plain exception lets the job queue retry the whole ingestion.
+            raise RuntimeError("Embedding service failed while indexing the book.")
+        matrices.append(matrix)
+        if progress:
+            progress(min(start + EMBED_BATCH_SIZE, len(texts)), len(texts))
+    return np.vstack(matrices).astype("float32", copy=False)
+
+
+def sync_book(book_id, pdf_path=None, progress=None):
+    """
+    Bring the index in line with one FiqhBook: chunks that disappeared are
+    removed, unchanged chunks keep their vectors, and only new text is
+    embedded. pdf_path None means the book was deleted.
+    """
+    chunks = extract_pdf_chunks(pdf_path, document=os.path.basename(pdf_path)) if pdf_path else []
+    wanted = {}
+    for position, chunk in enumerate(chunks):
+        wanted.setdefault(chunk_hash(chunk["text"]), (position, chunk))
+
+    with index_lock():
+        store = ChunkStore()
+        try:
+            index = load_library_index(store)
+            existing = store.book_chunks(book_id)
+
+            stale_ids = [chunk_id for text_hash, chunk_id in existing.items() if text_hash not in wanted]
+            kept = {existing[text_hash]: position for text_hash, (position, _) in wanted.items() if text_hash in existing}
+            fresh = [(position, chunk) for text_hash, (position, chunk) in wanted.items() if text_hash not in existing]
+
+            added_ids = []
+            if fresh:
+                vectors = embed_chunks([chunk["text"] for _, chunk in fresh], progress)
+                if index is None:
+                    config = get_index_settings()
+                    kind = choose_kind(len(vectors), config)
+                    index = create_index(vectors.shape[1], kind, config,
+                                         train_vectors=normalized(vectors) if kind == "ivfpq" else None)
+                if vectors.shape[1] != index.d:
+                    raise IngestionError(f"Embedding size {vectors.shape[1]} does not match the index ({index.d}).")
+                # Rows first: a worker reloading in between never sees ids without text.
+                added_ids = store.insert([("fiqh_book", book_id, position, chunk["text"], chunk["document"], chunk["page"])
+                                          for position, chunk in fresh])
+                index.add_with_ids(prepare_vectors(index, vectors), np.asarray(added_ids, dtype="int64"))
+                index = resize_for_corpus(index, get_index_settings())
+            if stale_ids and index is not None:
+                index = remove_ids(index, stale_ids, get_index_settings())
+
+            if index is not None and (added_ids or stale_ids):
+                try:
+                    write_index(index)
+                except Exception:
+                    # Rows without vectors would look already embedded to the retry.
+                    store.delete(added_ids)
+                    raise
+            store.delete(stale_ids)
+            store.update_positions(kept)
+        finally:
+            store.close()
+
+    return {"added": len(added_ids), "removed": len(stale_ids), "kept": len(kept), "total": index.ntotal if index else 0}
+
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import weakref
+
+from django.conf import settings
+
+DEFAULT_LLM = {
+    "MODEL": "llama-3.3-70b-versatile",
+    "BASE_URL": None,
+    "TIMEOUT": 30,
+    "MAX_TOKENS": 1024,
+    "TEMPERATURE": 0.7,
+    "MAX_CONCURRENCY": 8,
+    "QUEUE_TIMEOUT": 10,
+}
+
+SYSTEM_PROMPT = """أنت خبير فقهي متخصص في علم الفرائض والمواريث. 
+هدفك تقديم إجابة دقيقة وشاملة وصحيحة شرعاً بناءً على السياق المرفق.
+
+قواعد صارمة للإجابة:
+1. الشمولية في ذكر الحالات: عند السؤال عن نصيب أي وارث، يجب عليك ذكر جميع حالاته الشرعية الممكنة (مثلاً: الزوجة ترث الربع في حال عدم وجود فرع وارث، وترث الثمن في حال وجود فرع وارث). لا تكتفِ أبداً بذكر حالة واحدة فقط.
+2. التحقق من اسم الوارث: تأكد تماماً أن النص المرفق يتحدث عن الوارث المطلوب في السؤال قبل الإجابة.
+3. تجنب الأسهم الحسابية: اذكر الأنصبة كفروض (نصف، ربع، ثمن..) ولا تذكر عدد الأسهم (مثل 8 أسهم) إلا إذا طُلب منك حساب مسألة محددة.
+4. الدقة الفقهية: الثمن للزوجة فقط، والربع للزوج أو الزوجة، والسدس والثلث للأم أو الورثة الآخرين حسب شروطهم.
+5. في حال نقص المعلومات: إذا لم تجد كل الحالات في السياق، اذكر ما وجدته بوضوح وقل 'هذا ما ورد في المستندات'."""
+
+# Async clients and semaphores are bound to the event loop that created them.
+_clients = weakref.WeakKeyDictionary()
+_semaphores = weakref.WeakKeyDictionary()
+
+
+class LLMBusyError(Exception):
+    pass
+
+
+def get_llm_settings():
+    return {**DEFAULT_LLM, **getattr(settings, "CHAT_BOT_LLM", {})}
+
+
+def build_messages(context, question, calculation=None):
+    content = f"السياق المرجعي:\n{context}\n\nالسؤال:\n{question}"
+    if calculation:
+        # Shares come from the calculator engine; the model only explains them.
+        content += (
+            f"\n\nنتيجة محرك المواريث لهذه المسألة:\n{calculation}\n\n"
+            "اعتمد هذه الأنصبة كما هي دون تعديل، واشرح سببها باختصار من السياق المرجعي."
+        )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
+
+
+def get_async_llm_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        from groq import AsyncGroq
+
+        config = get_llm_settings()
+        client = AsyncGroq(
+            api_key=os.environ.get("GROQ_API_KEY"),
+            base_url=config["BASE_URL"],
+            timeout=config["TIMEOUT"],
+            max_retries=1,
+        )
+        _clients[loop] = client
+    return client
+
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_llm_settings()["MAX_CONCURRENCY"])
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+class llm_slot:
+    """
+    Caps concurrent completions per worker; waiting longer than QUEUE_TIMEOUT
+    raises LLMBusyError instead of piling requests onto the provider.
+    """
+
+    async def __aenter__(self):
+        self.semaphore = _get_semaphore()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), get_llm_settings()["QUEUE_TIMEOUT"])
+        except asyncio.TimeoutError as exc:
+            raise LLMBusyError() from exc
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.semaphore.release()
+
+
+async def acomplete(messages, max_tokens=None):
+    config = get_llm_settings()
+    async with llm_slot():
+        completion = await get_async_llm_client().chat.completions.create(
+            model=config["MODEL"],
+            messages=messages,
+            temperature=config["TEMPERATURE"],
+            max_tokens=max_tokens or config["MAX_TOKENS"],
+        )
+    return completion.choices[0].message.content.strip()
+
+
+async def astream(messages, max_tokens=None):
+    """Yield answer text fragments as the provider emits them."""
+    config = get_llm_settings()
+    async with llm_slot():
+        stream = await get_async_llm_client().chat.completions.create(
+            model=config["MODEL"],
+            messages=messages,
+            temperature=config["TEMPERATURE"],
+            max_tokens=max_tokens or config["MAX_TOKENS"],
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    yield text
+        finally:
+            # Drop the upstream connection too when the browser goes away mid-answer.
+            await stream.close()
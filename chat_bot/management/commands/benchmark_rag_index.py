@@ -0,0 +1,49 @@
+import json
+import os
+
+import faiss
+from django.core.management.base import BaseCommand, CommandError
+
+from chat_bot.index_benchmark import corpus_vectors, run_index_benchmark, synthetic_vectors
+from chat_bot.index_factory import INDEX_KINDS, get_index_settings
+from chat_bot.retrieval import INDEX_PATH
+
+
+class Command(BaseCommand):
+    help = (
+        "Report recall@k, per-query latency and size of each FAISS index kind against exact "
+        "cosine search, on the current rag/index.faiss vectors or a synthetic corpus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kinds", default=",".join(INDEX_KINDS), help="Comma-separated: flat,hnsw,ivfpq.")
+        parser.add_argument("--k", default="3,10", help="Comma-separated k values for recall@k.")
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument(
+            "--synthetic", type=int, default=0,
+            help="Benchmark N synthetic vectors instead of the indexed chunks (to project library growth).",
+        )
+        parser.add_argument("--dim", type=int, default=1024, help="Vector size for --synthetic.")
+
+    def handle(self, *args, **options):
+        kinds = [kind.strip() for kind in options["kinds"].split(",") if kind.strip()]
+        unknown = set(kinds) - set(INDEX_KINDS)
+        if unknown:
+            raise CommandError(f"Unknown index kinds: {', '.join(sorted(unknown))}")
+        ks = tuple(int(k) for k in options["k"].split(","))
+
+        if options["synthetic"]:
+            vectors = synthetic_vectors(options["synthetic"], options["dim"])
+            source = f"synthetic ({options['synthetic']} x {options['dim']})"
+        else:
+            if not os.path.exists(INDEX_PATH):
+                raise CommandError(f"{INDEX_PATH} not found; build it first or pass --synthetic N.")
+            try:
+                vectors = corpus_vectors(faiss.read_index(INDEX_PATH))
+            except RuntimeError:
+                raise CommandError("The current index is compressed (IVF-PQ); benchmark with --synthetic N instead.")
+            source = INDEX_PATH
+
+        self.stdout.write(f"Vectors: {len(vectors)} from {source}")
+        report = run_index_benchmark(vectors, kinds, ks=ks, query_count=options["queries"], config=get_index_settings())
+        self.stdout.write(json.dumps(report, indent=2))
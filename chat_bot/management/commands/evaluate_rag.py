@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from chat_bot.chunk_store import CHUNKS_PATH, read_legacy_chunks
+from chat_bot.embeddings import HashingEmbeddingBackend, get_embedding_backend
+from chat_bot.fake_llm import FakeLLMServer
+from chat_bot.index_factory import INDEX_KINDS
+from chat_bot.rag_eval import GOLD_PATH, MODES, load_gold, offline_corpus, run_evaluation
+from chat_bot.retrieval import get_rag_resources
+
+
+class Command(BaseCommand):
+    help = (
+        "Score retrieval on the gold fiqh questions (recall@k, MRR) and break down per-question "
+        "latency (embed, search, prompt build, LLM). Runs offline by default: chunks are embedded "
+        "with a local hashing backend and the LLM is a local fake server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gold", default=GOLD_PATH)
+        parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated: dense,lexical,hybrid.")
+        parser.add_argument("--k", default="1,3,5,10", help="Comma-separated k values for recall@k.")
+        parser.add_argument(
+            "--live", action="store_true",
+            help="Use the configured embedding backend and the current rag/ index instead of offline fakes.",
+        )
+        parser.add_argument("--chunks", default=CHUNKS_PATH, help="Offline mode: chunks.json to index.")
+        parser.add_argument("--index-kind", default="flat", choices=INDEX_KINDS, help="Offline mode index kind.")
+        parser.add_argument("--embed-latency", type=float, default=0.0,
+                            help="Offline mode: simulated embedding round trip in seconds.")
+        parser.add_argument("--llm-first-token-delay", type=float, default=0.3)
+        parser.add_argument("--llm-token-delay", type=float, default=0.01)
+        parser.add_argument("--no-llm", action="store_true", help="Skip the LLM stage.")
+        parser.add_argument("--json", action="store_true", help="Print the full report as JSON.")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        ks = tuple(int(k) for k in options["k"].split(","))
+        if not os.path.exists(options["gold"]):
+            raise CommandError(f"{options['gold']} not found.")
+        gold = load_gold(options["gold"])
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            if options["live"]:
+                index, chunks = get_rag_resources()
+                if not index:
+                    raise CommandError("No RAG index found; build it first or run without --live.")
+                backend = get_embedding_backend()
+            else:
+                corpus = self.read_chunks(options["chunks"])
+                backend = HashingEmbeddingBackend(latency=options["embed_latency"])
+                self.stdout.write(f"Indexing {len(corpus)} chunks from {options['chunks']} with the hashing backend...")
+                index, chunks = offline_corpus(corpus, backend, work_dir, options["index_kind"])
+
+            if options["no_llm"]:
+                reports = run_evaluation(gold, index, chunks, backend, modes=modes, ks=ks, llm=False)
+            else:
+                reports = self.run_with_fake_llm(gold, index, chunks, backend, modes, ks, options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports, indent=2, ensure_ascii=False))
+            return
+        for report in reports:
+            self.write_report(report, ks)
+
+    def read_chunks(self, path):
+        if path == CHUNKS_PATH:
+            corpus = read_legacy_chunks()
+        elif os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                corpus = json.load(f)
+        else:
+            corpus = None
+        if not corpus:
+            raise CommandError(f"{path} not found or empty; run rag/prepare_data.py first.")
+        return corpus
+
+    def run_with_fake_llm(self, gold, index, chunks, backend, modes, ks, options):
+        server = FakeLLMServer(
+            first_token_delay=options["llm_first_token_delay"],
+            token_delay=options["llm_token_delay"],
+        )
+        llm_settings = {**getattr(settings, "CHAT_BOT_LLM", {}), "BASE_URL": server.base_url}
+        # The Groq client refuses to start without a key, even against the fake server.
+        set_key = "GROQ_API_KEY" not in os.environ
+        if set_key:
+            os.environ["GROQ_API_KEY"] = "fake"
+        try:
+            with server, override_settings(CHAT_BOT_LLM=llm_settings):
+                return run_evaluation(gold, index, chunks, backend, modes=modes, ks=ks, llm=True)
+        finally:
+            if set_key:
+                del os.environ["GROQ_API_KEY"]
+
+    def write_report(self, report, ks):
+        recall = "  ".join(f"R@{k} {report[f'recall@{k}']:.3f}" for k in ks)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{report['mode']} ({report['questions']} questions)"))
+        self.stdout.write(f"  {recall}  MRR {report['mrr']:.3f}")
+        for stage, values in report["latency_ms"].items():
+            self.stdout.write(f"  {stage:<16} p50 {values['p50']:>9.3f} ms   p95 {values['p95']:>9.3f} ms")
+        if report["no_relevant_hit"]:
+            self.stdout.write(f"  No relevant chunk for {len(report['no_relevant_hit'])} question(s):")
+            for question in report["no_relevant_hit"]:
+                self.stdout.write(f"    - {question}")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from chat_bot.fake_llm import DEFAULT_REPLY, FakeLLMServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local OpenAI/Groq-compatible completions endpoint that streams a canned answer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8090)
+        parser.add_argument("--reply", default=DEFAULT_REPLY, help="Answer text returned for every question.")
+        parser.add_argument("--first-token-delay", type=float, default=0.3, help="Seconds before the first token.")
+        parser.add_argument("--token-delay", type=float, default=0.03, help="Seconds between tokens.")
+
+    def handle(self, *args, **options):
+        server = FakeLLMServer(
+            host=options["host"],
+            port=options["port"],
+            reply=options["reply"],
+            first_token_delay=options["first_token_delay"],
+            token_delay=options["token_delay"],
+        )
+        self.stdout.write(
+            f"Fake LLM listening on {server.base_url} "
+            f"(set CHAT_BOT_LLM_BASE_URL={server.base_url} and any GROQ_API_KEY)."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from administration.models import FiqhBook
+from jobs.services import enqueue_job
+
+
+class Command(BaseCommand):
+    help = "Queue a chat bot index sync for every uploaded fiqh book (only changed chunks are re-embedded)."
+
+    def handle(self, *args, **options):
+        book_ids = list(FiqhBook.objects.values_list("id", flat=True))
+        for book_id in book_ids:
+            enqueue_job("chat_bot.sync_fiqh_book", dedupe=False, book_id=book_id)
+        self.stdout.write(f"Queued {len(book_ids)} book index jobs.")
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from .arabic import normalize_arabic, tokenize
+from .chunk_store import ChunkTexts, chunk_text, write_corpus_store
+from .hybrid import get_retrieval_settings, hybrid_hits
+from .index_benchmark import percentile_ms
+from .index_factory import build_index
+from .llm import astream, build_messages
+from .retrieval import dense_search
+
+GOLD_PATH = "rag/eval/gold.json"
+MODES = ("dense", "lexical", "hybrid")
+STAGES = ("embed", "search", "prompt", "llm_first_token", "llm_total", "total")
+
+
+def load_gold(path=GOLD_PATH):
+    """
+    [{"question": ..., "expected": [[term, ...], ...]}]. Each expected group
+    describes one source passage by terms it must contain, so the gold set
+    stays valid when the corpus is re-chunked.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        gold = json.load(f)
+    for item in gold:
+        item["expected"] = [[normalize_arabic(term) for term in group] for group in item["expected"]]
+    return gold
+
+
+def matched_groups(text, expected):
+    text = normalize_arabic(text)
+    return {row for row, group in enumerate(expected) if all(term in text for term in group)}
+
+
+def score_hits(hits, expected, ks):
+    """recall@k (share of expected passages found in the top k) and reciprocal rank of the first relevant hit."""
+    found_at = {}
+    first_relevant = None
+    for rank, (_, text) in enumerate(hits, start=1):
+        groups = matched_groups(text, expected)
+        if groups and first_relevant is None:
+            first_relevant = rank
+        for group in groups:
+            found_at.setdefault(group, rank)
+    scores = {f"recall@{k}": sum(1 for rank in found_at.values() if rank <= k) / len(expected) for k in ks}
+    scores["rr"] = 1.0 / first_relevant if first_relevant else 0.0
+    return scores
+
+
+def offline_corpus(chunks, backend, work_dir, index_kind="flat", batch_size=256):
+    """Index and chunk store for `chunks` built under work_dir, leaving the live rag/ files alone."""
+    texts = [chunk_text(chunk) for chunk in chunks]
+    vectors = np.vstack([backend.embed_texts(texts[start:start + batch_size])
+                         for start in range(0, len(texts), batch_size)])
+    index = build_index(vectors, np.arange(len(texts)), kind=index_kind)
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, "chunks.sqlite3")
+    write_corpus_store(chunks, path=path)
+    return index, ChunkTexts(path)
+
+
+def search(mode, index, chunks, question, vector, k, config):
+    if mode == "dense":
+        ids = dense_search(index, vector, k)
+    elif mode == "lexical":
+        ids = chunks.lexical_search(tokenize(question), k)
+    else:
+        return hybrid_hits(index, chunks, question, vector, k, config)
+    texts = chunks.get_many(ids)
+    return [(chunk_id, texts[chunk_id]) for chunk_id in ids if chunk_id in texts]
+
+
+async def evaluate_question(item, mode, index, chunks, backend, ks, config, llm=True):
+    timings = {}
+    started = time.perf_counter()
+    vector = await backend.aembed(item["question"])
+    timings["embed"] = time.perf_counter() - started
+
+    mark = time.perf_counter()
+    hits = search(mode, index, chunks, item["question"], vector, max(ks), config)
+    timings["search"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    # The prompt gets the same number of chunks as the chat view.
+    messages = build_messages("".join(text + "\n" for _, text in hits[:config["K"]]), item["question"])
+    timings["prompt"] = time.perf_counter() - mark
+
+    if llm:
+        mark = time.perf_counter()
+        async for _ in astream(messages):
+            timings.setdefault("llm_first_token", time.perf_counter() - mark)
+        timings["llm_total"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - started
+    return score_hits(hits, item["expected"], ks), timings
+
+
+async def evaluate(gold, index, chunks, backend, modes=MODES, ks=(1, 3, 5, 10), llm=True):
+    """
+    Run every gold question through each retrieval mode; returns one report
+    per mode with mean recall@k, MRR and per-stage latency percentiles.
+    """
+    config = get_retrieval_settings()
+    reports = []
+    for mode in modes:
+        scores, timings = [], {stage: [] for stage in STAGES}
+        misses = []
+        for item in gold:
+            result, stage_times = await evaluate_question(item, mode, index, chunks, backend, ks, config, llm)
+            scores.append(result)
+            for stage, seconds in stage_times.items():
+                timings[stage].append(seconds)
+            if not result["rr"]:
+                misses.append(item["question"])
+
+        report = {"mode": mode, "questions": len(gold)}
+        for k in ks:
+            report[f"recall@{k}"] = round(float(np.mean([s[f"recall@{k}"] for s in scores])), 4)
+        report["mrr"] = round(float(np.mean([s["rr"] for s in scores])), 4)
+        report["latency_ms"] = {
+            stage: {"p50": percentile_ms(samples, 0.5), "p95": percentile_ms(samples, 0.95)}
+            for stage, samples in timings.items() if samples
+        }
+        report["no_relevant_hit"] = misses
+        reports.append(report)
+    return reports
+
+
+def run_evaluation(gold, index, chunks, backend, **options):
+    return asyncio.run(evaluate(gold, index, chunks, backend, **options))
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from .chunk_store import CHUNK_DB_PATH, ChunkTexts, ensure_chunk_store
+from .index_factory import configure_search, get_index_settings, prepare_vectors
+
+INDEX_PATH = "rag/index.faiss"
+RELOAD_CHECK_SECONDS = 5
+# Map the vectors instead of copying them: pages are shared by every worker
+# through the OS cache and only touched parts are read from disk.
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+_resources = None  # (index, ChunkTexts, version)
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def file_version(*paths):
+    return "-".join(f"{os.stat(path).st_mtime_ns}:{os.stat(path).st_size}" for path in paths)
+
+
+def get_rag_resources():
+    """
+    Index and chunk texts for the running worker. The files are re-checked at
+    most every RELOAD_CHECK_SECONDS, so a book ingested by a background job
+    is picked up without restarting the server.
+    """
+    global _resources, _checked_at
+    if _resources is not None and time.monotonic() - _checked_at < RELOAD_CHECK_SECONDS:
+        return _resources[0], _resources[1]
+
+    with _lock:
+        if os.path.exists(INDEX_PATH) and ensure_chunk_store():
+            version = file_version(INDEX_PATH, CHUNK_DB_PATH)
+            if _resources is None or _resources[2] != version:
+                print("📥 Loading RAG index & chunks...")
+                index = configure_search(faiss.read_index(INDEX_PATH, MMAP_FLAGS), get_index_settings())
+                _resources = (index, ChunkTexts(CHUNK_DB_PATH), version)
+        elif _resources is None:
+            print("⚠️ RAG resources not found. Run build_index.py first.")
+            return None, None
+        _checked_at = time.monotonic()
+    return _resources[0], _resources[1]
+
+
+def get_index_version():
+    """Identifies the loaded index so answers cached against an older build are not reused."""
+    get_rag_resources()
+    return _resources[2] if _resources else None
+
+
+def dense_search(index, vector, k):
+    """Chunk ids of the k nearest vectors, best first."""
+    query = prepare_vectors(index, np.asarray(vector, dtype="float32").reshape(1, -1))
+    _, ids = index.search(query, k)
+    return [int(i) for i in ids[0] if i != -1]
+
+
+def search_chunks(vector, k=3):
+    """Return [(chunk_id, text), ...] for the k nearest chunks to the question vector."""
+    index, chunks = get_rag_resources()
+    if not index or not chunks:
+        return None
+    hits = dense_search(index, vector, k)
+    texts = chunks.get_many(hits)
+    return [(i, texts[i]) for i in hits if i in texts]
@@ -0,0 +1,112 @@
+import asyncio
+
+from .answer_cache import get_answer_cache
+from .embeddings import get_embedding_backend
+from .heir_intent import engine_answer, get_calculator_settings
+from .hybrid import get_retrieval_settings, hybrid_search
+from .llm import acomplete, astream, build_messages
+from .retrieval import get_index_version, get_rag_resources, search_chunks
+
+
+class ChatServiceError(Exception):
+    """Expected failure with a message that can be shown to the user as-is."""
+
+
+class Retrieval:
+    def __init__(self, question, vector, hits, index_version):
+        self.question = question
+        self.vector = vector
+        self.hits = hits
+        self.index_version = index_version
+
+    @property
+    def chunk_ids(self):
+        return [chunk_id for chunk_id, _ in self.hits]
+
+    @property
+    def context(self):
+        return "".join(text + "\n" for _, text in self.hits)
+
+
+async def retrieve(question, k=None):
+    # The first call reads the index from disk; keep that off the event loop too.
+    index, chunks = await asyncio.to_thread(get_rag_resources)
+    if not index or not chunks:
+        raise ChatServiceError("عذراً، قاعدة البيانات غير جاهزة حالياً.")
+
+    vector = await get_embedding_backend().aembed(question)
+    if vector is None:
+        raise ChatServiceError("عذراً، خدمة معالجة النصوص تواجه ضغطاً حالياً.")
+
+    # FAISS releases the GIL during search, so a worker thread keeps the loop free.
+    config = get_retrieval_settings()
+    k = k or config["K"]
+    if config["HYBRID"]:
+        hits = await asyncio.to_thread(hybrid_search, question, vector, k)
+    else:
+        hits = await asyncio.to_thread(search_chunks, vector, k)
+    if hits is None:
+        raise ChatServiceError("عذراً، قاعدة البيانات غير جاهزة حالياً.")
+    return Retrieval(question, vector, hits, get_index_version())
+
+
+async def cached_answer(retrieval):
+    cache = get_answer_cache()
+    if cache is None:
+        return None
+    hit = await asyncio.to_thread(cache.lookup, retrieval.vector, retrieval.chunk_ids, retrieval.index_version)
+    return hit["answer"] if hit else None
+
+
+async def remember_answer(retrieval, answer):
+    cache = get_answer_cache()
+    if cache is not None and answer:
+        await asyncio.to_thread(
+            cache.store, retrieval.question, retrieval.vector, retrieval.chunk_ids, answer, retrieval.index_version
+        )
+
+
+async def answer_question(question):
+    computed = engine_answer(question)
+    if computed is not None:
+        if computed.instant:
+            return computed.answer
+        retrieval = await retrieve(question)
+        # Not cached: near-identical enumerations with different heirs embed almost alike.
+        return await acomplete(
+            build_messages(retrieval.context, question, computed.table),
+            max_tokens=get_calculator_settings()["MAX_TOKENS"],
+        )
+
+    retrieval = await retrieve(question)
+    answer = await cached_answer(retrieval)
+    if answer is None:
+        answer = await acomplete(build_messages(retrieval.context, question))
+        await remember_answer(retrieval, answer)
+    return answer
+
+
+async def stream_answer(question):
+    computed = engine_answer(question)
+    if computed is not None:
+        if computed.instant:
+            yield computed.answer
+            return
+        retrieval = await retrieve(question)
+        messages = build_messages(retrieval.context, question, computed.table)
+        async for text in astream(messages, max_tokens=get_calculator_settings()["MAX_TOKENS"]):
+            yield text
+        return
+
+    retrieval = await retrieve(question)
+    answer = await cached_answer(retrieval)
+    if answer is not None:
+        yield answer
+        return
+
+    parts = []
+    async for text in astream(build_messages(retrieval.context, question)):
+        parts.append(text)
+        yield text
+    # Only complete answers are cached; an interrupted stream never gets here.
+    await remember_answer(retrieval, "".join(parts).strip())
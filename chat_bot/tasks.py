@@ -0,0 +1,21 @@
+from administration.models import FiqhBook
+from jobs.registry import JobError, register_task
+
+from .ingestion import IngestionError, sync_book
+
+
+@register_task("chat_bot.sync_fiqh_book")
+def sync_fiqh_book_task(job, book_id):
+    book = FiqhBook.objects.filter(id=book_id).first()
+    pdf_path = book.pdf_file.path if book and book.pdf_file else None
+    job.report_progress(5, "جارٍ استخراج نصوص الكتاب" if pdf_path else "جارٍ حذف الكتاب من فهرس المساعد")
+
+    def progress(done, total):
+        job.report_progress(10 + done * 80 / total, f"تمت فهرسة {done} من {total} مقطع")
+
+    try:
+        result = sync_book(book_id, pdf_path, progress=progress)
+    except IngestionError as exc:
+        raise JobError(str(exc))
+    title = book.title if book else f"#{book_id}"
+    return {"message": f"تم تحديث فهرس المساعد للكتاب {title}.", **result}
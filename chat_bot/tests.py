@@ -1,3 +1,68 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, override_settings
 
-# Create your tests here.
+from cases.models import Heir
+
+from .heir_intent import engine_answer, parse_heir_question
+
+R = Heir.Relationship
+
+
+class ParseHeirQuestionTests(SimpleTestCase):
+    def assertHeirs(self, question, heirs):
+        parsed = parse_heir_question(question)
+        self.assertIsNotNone(parsed, question)
+        self.assertEqual(parsed.heirs, heirs, question)
+
+    def test_explanation_after_the_heirs_is_not_counted(self):
+        self.assertHeirs("توفي عن زوجة وابن لماذا يأخذ الابن الباقي", [(R.WIFE, 1), (R.SON, 1)])
+        self.assertHeirs(
+            "توفي رجل عن زوجة وابن وبنت فلماذا يأخذ الابن ضعف البنت",
+            [(R.WIFE, 1), (R.SON, 1), (R.DAUGHTER, 1)],
+        )
+        self.assertHeirs("توفيت امرأة عن زوج وأم ولماذا ترث الأم الثلث", [(R.HUSBAND, 1), (R.MOTHER, 1)])
+
+    def test_explanation_questions_are_not_answered_instantly(self):
+        answer = engine_answer("توفي عن زوجة وابن لماذا يأخذ الابن الباقي")
+        self.assertIsNotNone(answer)
+        self.assertFalse(answer.instant)
+
+    def test_question_part_is_not_counted(self):
+        self.assertHeirs("توفي رجل عن أم وأخوين فما نصيب الأم", [(R.MOTHER, 1), (R.BROTHER, 2)])
+
+    def test_possessive_forms_of_the_five_nouns_and_duals(self):
+        self.assertHeirs("مات رجل وترك أباه وأمه", [(R.FATHER, 1), (R.MOTHER, 1)])
+        self.assertHeirs("ماتت عن زوجها وأخيها", [(R.HUSBAND, 1), (R.BROTHER, 1)])
+        self.assertHeirs("توفي رجل عن أخاه وأمه", [(R.BROTHER, 1), (R.MOTHER, 1)])
+        self.assertHeirs("توفيت عن ابنيها وزوجها", [(R.SON, 2), (R.HUSBAND, 1)])
+        self.assertHeirs("توفي رجل وترك زوجته وابناه وبنتاه", [(R.WIFE, 1), (R.SON, 2), (R.DAUGHTER, 2)])
+
+    def test_filler_words_and_amounts_are_skipped(self):
+        self.assertHeirs("هلك هالك عن بنت وأخت", [(R.DAUGHTER, 1), (R.SISTER, 1)])
+        self.assertHeirs("توفي عن زوجة وابنين وترك 100000 ريال", [(R.WIFE, 1), (R.SON, 2)])
+        self.assertHeirs("الورثة زوجة وابن", [(R.WIFE, 1), (R.SON, 1)])
+
+    def test_unreadable_word_among_the_heirs_is_not_guessed(self):
+        self.assertIsNone(parse_heir_question("توفي عن زوجة وحفيد وأم"))
+        self.assertIsNone(parse_heir_question("توفي عن زوجة وابن وربيبه"))
+
+
+@override_settings(CHAT_BOT_CALCULATOR={"ENABLED": True, "INSTANT": True})
+class EngineAnswerTests(SimpleTestCase):
+    def test_father_and_mother(self):
+        answer = engine_answer("مات رجل وترك أباه وأمه")
+        self.assertTrue(answer.instant)
+        self.assertIn("- أب: عصبة — 66.67% من التركة", answer.table)
+        self.assertIn("- أم: 1/3 — 33.33% من التركة", answer.table)
+
+    def test_amounts_are_computed_from_the_estate(self):
+        answer = engine_answer("توفي عن زوجة وابنين وترك 100000 ريال")
+        self.assertIn("- زوجة: 1/8 — 12.50% من التركة (12,500.00)", answer.table)
+        self.assertIn("- ابن ×2: عصبة — لكل واحد 43.75% من التركة (43,750.00)", answer.table)
+        self.assertIn("صافي التركة: 100,000.00", answer.table)
+
+    def test_heir_left_without_a_share_is_not_answered(self):
+        # The engine assigns nothing to the paternal sister here; that is not a ruling to pass on.
+        self.assertIsNone(engine_answer("توفي عن أم وأخ لأم وأخت لأب"))
+
+    def test_unreadable_heir_is_not_answered(self):
+        self.assertIsNone(engine_answer("توفي عن زوجة وحفيد"))
@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path("chat/", views.chat, name="chat"),
+    path("chat/stream/", views.chat_stream, name="chat_stream"),
     path("chat_page/", views.chat_page, name="chat_page"), 
 ]
\ No newline at end of file
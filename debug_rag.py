@@ -81,7 +81,8 @@ def test_rag():
         context = ""
         for i in I[0]:
             if i != -1:
-                context += chunks[i] + "\n"
+                chunk = chunks[i]
+                context += (chunk if isinstance(chunk, str) else chunk["text"]) + "\n"
         print(f"   Context found: {len(context)} chars")
         
         print("5. Testing Groq API...")
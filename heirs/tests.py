@@ -1,3 +1,49 @@
+import datetime
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+
+from cases.models import Asset, AssetComponent, Case, Deceased, Heir, HeirAssetSelection, PaymentSettlement, SelectionLog
+from monitoring.testing import QueryBudgetMixin
+from users.models import User
+
+
+class HeirViewsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        judge = User.objects.create_user("judge", password="x", role=User.Role.JUDGE)
+        cls.heir_user = User.objects.create_user("heir", password="x", role=User.Role.HEIR)
+        # Several estates with several assets each, so a per-row query shows up as a blown budget.
+        cls.cases = []
+        for number in range(3):
+            case = Case.objects.create(judge=judge, case_number=str(number), status=Case.Status.MUTUAL_SELECTION)
+            Deceased.objects.create(case=case, name="deceased", date_of_death=datetime.date(2020, 1, 1), national_id="1")
+            heirs = [
+                Heir.objects.create(case=case, name=f"heir {i}", relationship="ابن", gender="ذكر", share_value=Decimal("100"),
+                                    user=cls.heir_user if i == 0 else None)
+                for i in range(5)
+            ]
+            for i in range(8):
+                asset = Asset.objects.create(case=case, description=f"asset {i}", value=Decimal("50"),
+                                             assigned_to=heirs[i % 5] if i % 2 else None)
+                for j in range(3):
+                    AssetComponent.objects.create(asset=asset, description=f"component {j}", value=Decimal("10"),
+                                                  assigned_to=heirs[j % 5] if j % 2 else None)
+            for heir in heirs[1:]:
+                HeirAssetSelection.objects.create(heir=heir, asset=asset)
+                PaymentSettlement.objects.create(case=case, payer=heir, amount=Decimal("5"), reason="فرق قيمة")
+            SelectionLog.objects.create(case=case, heir=heirs[1], action_text="اختيار")
+            cls.cases.append((case, heirs[0]))
+
+    def test_select_assets_stays_within_budget(self):
+        case, heir = self.cases[0]
+        response = self.client.get(reverse("heirs:select_assets", args=[case.session_link, heir.id]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
 
-# Create your tests here.
+    def test_dashboard_stays_within_budget(self):
+        self.client.force_login(self.heir_user)
+        response = self.client.get(reverse("heirs:dashboard"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
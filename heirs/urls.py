@@ -8,6 +8,7 @@ urlpatterns = [
     path('session/<uuid:link>/', views.session_lobby, name='session_lobby'),
     path('session/<uuid:link>/<int:heir_id>/', views.session_home, name='session_home'),
     path('session/<uuid:link>/<int:heir_id>/select/', views.select_assets, name='select_assets'),
+    path('session/<uuid:link>/<int:heir_id>/select/validate/', views.validate_selection, name='validate_selection'),
     path('session/<uuid:link>/<int:heir_id>/reselect/', views.reselect_assets, name='reselect_assets'),
     path('case/<int:case_id>/<int:heir_id>/report/', views.final_report, name='final_report'),
     path('my-assets-sale/', views.my_assets_for_sale, name='my_assets_for_sale'),
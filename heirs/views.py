@@ -1,7 +1,11 @@
+from decimal import Decimal
 from django.db import models, transaction
-from django.db.models import Q
+from django.db.models import Count, DecimalField, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from cases.models import Case, Heir, Asset, HeirAssetSelection, AssetComponent, SelectionLog, DisputeRaffle, PaymentSettlement, ComponentConflictRequest, AllocationProposal, EstateObligationAllocation
+from cases.realtime import SessionEvent, conflict_event_data, get_heir_selection_keys, publish_selection_changes, publish_session_event, settlement_event_data
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
@@ -22,6 +26,7 @@ def dashboard(request):
             )
             
             target = conflict.component or conflict.parent_asset
+            selections_before = get_heir_selection_keys(heir)
             
             if conflict.component:
                 holds_full_asset = HeirAssetSelection.objects.filter(heir=heir, asset=conflict.parent_asset).exists()
@@ -54,6 +59,9 @@ def dashboard(request):
                 parent_asset=conflict.parent_asset,
                 status=ComponentConflictRequest.Status.PENDING
             ).exclude(id=conflict.id).update(status=ComponentConflictRequest.Status.CANCELED)
+
+            publish_selection_changes(conflict.case, heir, selections_before)
+            publish_session_event(conflict.case, SessionEvent.CONFLICT_RESOLVED, **conflict_event_data(conflict))
             
             messages.success(request, f'تم التنازل عن {target.description} وتحريره من اختياراتك بنجاح.')
             return redirect('heirs:dashboard')
@@ -81,6 +89,7 @@ def dashboard(request):
             
             raffle.contenders.add(conflict.owner_heir, conflict.requesting_heir)
             raffle.save()
+            publish_session_event(conflict.case, SessionEvent.CONFLICT_RESOLVED, **conflict_event_data(conflict))
             
             messages.warning(request, 'تم رفض التنازل وطلب إحالة النزاع للقرعة. بانتظار نتيجة القرعة.')
             return redirect('heirs:dashboard')
@@ -122,65 +131,100 @@ def dashboard(request):
             messages.warning(request, 'تم رفض المقترح المالي.')
             return redirect('heirs:dashboard')
 
-    # Find all heir records associated with this user
-    my_heir_records = Heir.objects.filter(user=request.user)
-    
-    # Pre-fetch objecting heirs and settlements for each case record
+    # Find all heir records associated with this user. Everything the dashboard
+    # shows per record is prefetched in one query per relation, so the page
+    # cost does not grow with the number of estates the user is an heir in.
+    raffle_contender_count = (
+        DisputeRaffle.contenders.through.objects
+        .filter(disputeraffle_id=OuterRef('pk'))
+        .values('disputeraffle_id')
+        .annotate(total=Count('heir_id'))
+        .values('total')
+    )
+    my_heir_records = list(
+        Heir.objects.filter(user=request.user)
+        .select_related('case', 'case__deceased')
+        .prefetch_related(
+            Prefetch(
+                'case__heirs',
+                queryset=Heir.objects.filter(acceptance_status=Heir.AcceptanceStatus.OBJECTION_WITH_SELECTION),
+                to_attr='objecting_heirs',
+            ),
+            Prefetch(
+                'case__selection_logs',
+                queryset=SelectionLog.objects.select_related('heir')[:5],
+                to_attr='recent_logs',
+            ),
+            Prefetch('allocated_assets', to_attr='my_assets'),
+            Prefetch(
+                'allocated_components',
+                queryset=AssetComponent.objects.select_related('asset'),
+                to_attr='my_components',
+            ),
+            Prefetch(
+                'selections',
+                queryset=HeirAssetSelection.objects.filter(status='PENDING').select_related('asset', 'component', 'component__asset'),
+                to_attr='my_selections',
+            ),
+            Prefetch(
+                'payments_owed',
+                queryset=PaymentSettlement.objects.filter(is_paid_to_judge=False),
+                to_attr='bills',
+            ),
+            Prefetch(
+                'payments_expected',
+                queryset=PaymentSettlement.objects.filter(is_paid_to_judge=True, is_delivered_to_owner=False),
+                to_attr='receipts_waiting',
+            ),
+            Prefetch(
+                'received_conflicts',
+                queryset=ComponentConflictRequest.objects.filter(
+                    status=ComponentConflictRequest.Status.PENDING
+                ).select_related('requesting_heir', 'component', 'parent_asset'),
+                to_attr='received_pending_conflicts',
+            ),
+            Prefetch(
+                'initiated_conflicts',
+                queryset=ComponentConflictRequest.objects.select_related('owner_heir', 'component', 'parent_asset'),
+                to_attr='initiated_conflicts_list',
+            ),
+            Prefetch(
+                'raffle_entries',
+                queryset=DisputeRaffle.objects.select_related('asset', 'component').annotate(
+                    contender_count=Subquery(raffle_contender_count)
+                ),
+                to_attr='raffles',
+            ),
+            Prefetch(
+                'allocation_proposals',
+                queryset=AllocationProposal.objects.filter(status=AllocationProposal.Status.PENDING).select_related('case'),
+                to_attr='pending_proposals',
+            ),
+        )
+    )
+
     total_conflicts_count = 0
     total_proposals_count = 0
-    
+
     for record in my_heir_records:
         case = record.case
-        if case.status != Case.Status.COMPLETED:
-            case.objecting_heirs = case.heirs.filter(acceptance_status=Heir.AcceptanceStatus.OBJECTION_WITH_SELECTION)
-        
-        # Attach allocated items and pending selections for the dashboard
-        record.my_assets = record.allocated_assets.all()
-        record.my_components = record.allocated_components.select_related('asset').all()
-        record.my_selections = record.selections.filter(status='PENDING').select_related('asset', 'component', 'component__asset')
-        
-        # Settlements
-        record.bills = PaymentSettlement.objects.filter(payer=record, is_paid_to_judge=False)
-        record.receipts_waiting = PaymentSettlement.objects.filter(original_owner=record, is_paid_to_judge=True, is_delivered_to_owner=False)
-        
-        # Activity Feed
-        case.recent_logs = case.selection_logs.all()[:5]
+        if case.status == Case.Status.COMPLETED:
+            case.objecting_heirs = []
 
         # Conflicts Dashboard Trackers - ONLY show if already accepted/objected
         if record.acceptance_status != Heir.AcceptanceStatus.PENDING:
-            record.pending_conflict_requests = ComponentConflictRequest.objects.filter(
-                owner_heir=record,
-                status=ComponentConflictRequest.Status.PENDING
-            ).select_related('requesting_heir', 'component', 'parent_asset')
-            
-            record.sent_conflict_requests = ComponentConflictRequest.objects.filter(
-                requesting_heir=record
-            ).select_related('owner_heir', 'component', 'parent_asset')
-            
-            total_conflicts_count += record.pending_conflict_requests.count()
+            record.pending_conflict_requests = record.received_pending_conflicts
+            record.sent_conflict_requests = record.initiated_conflicts_list
+            total_conflicts_count += len(record.pending_conflict_requests)
         else:
-            record.pending_conflict_requests = ComponentConflictRequest.objects.none()
-            record.sent_conflict_requests = ComponentConflictRequest.objects.none()
-
-        record.active_raffles = DisputeRaffle.objects.filter(
-            contenders=record,
-            is_resolved=False
-        ).distinct()
-
-        record.won_raffles_list = DisputeRaffle.objects.filter(
-            contenders=record,
-            is_resolved=True,
-            winner=record
-        ).distinct()
-
-        # Mutual Consent Proposals
-        record.pending_proposals = AllocationProposal.objects.filter(
-            heir=record,
-            status=AllocationProposal.Status.PENDING
-        ).select_related('case')
-        
-        total_proposals_count += record.pending_proposals.count()
-    
+            record.pending_conflict_requests = []
+            record.sent_conflict_requests = []
+
+        record.active_raffles = [raffle for raffle in record.raffles if not raffle.is_resolved]
+        record.won_raffles_list = [raffle for raffle in record.raffles if raffle.is_resolved and raffle.winner_id == record.id]
+
+        total_proposals_count += len(record.pending_proposals)
+
     return render(request, 'heirs/dashboard.html', {
         'my_heir_records': my_heir_records,
         'total_conflicts_count': total_conflicts_count,
@@ -248,7 +292,7 @@ def _sync_all_selection_conflicts(case):
 
         if owner and owner != challenger:
             # Create conflict request for the Owner to see
-            ComponentConflictRequest.objects.get_or_create(
+            conflict, created = ComponentConflictRequest.objects.get_or_create(
                 case=case,
                 parent_asset=asset or (comp.asset if comp else None),
                 component=comp,
@@ -259,6 +303,8 @@ def _sync_all_selection_conflicts(case):
                     'is_full_asset': comp is None
                 }
             )
+            if created:
+                publish_session_event(case, SessionEvent.CONFLICT_CREATED, **conflict_event_data(conflict))
 
 
 def _get_acceptance_conflicts(heir, case):
@@ -375,6 +421,7 @@ def session_home(request, link, heir_id):
         action = request.POST.get('action')
         
         if action == 'accept':
+            selections_before = get_heir_selection_keys(heir)
             with transaction.atomic():
                 heir.acceptance_status = Heir.AcceptanceStatus.ACCEPTED
                 heir.mutual_consent_status = Heir.MutualConsentStatus.AGREED
@@ -398,12 +445,14 @@ def session_home(request, link, heir_id):
                         defaults={'status': HeirAssetSelection.SelectionStatus.ACCEPTED}
                     )
 
+            publish_selection_changes(case, heir, selections_before)
             messages.success(request, 'تم قبول القسمة بنجاح، وتم حجز نصيبك رسمياً في جدول الطلبات.')
             return redirect('heirs:session_home', link=link, heir_id=heir.id)
 
 
 
         elif action == 'reject_with_selection':
+            selections_before = get_heir_selection_keys(heir)
             # --- Clear Slate Logic for Objectors ---
             # 1. Unassign all assets and components currently allocated to the heir
             Asset.objects.filter(assigned_to=heir, case=case).update(assigned_to=None, is_locked=False)
@@ -431,6 +480,8 @@ def session_home(request, link, heir_id):
             
             # Resetting: delete previous automated debt/will allocations to allow judge a clean slate
             EstateObligationAllocation.objects.filter(case=case).delete()
+
+            publish_selection_changes(case, heir, selections_before)
             
             messages.success(request, 'تم تسجيل رغبتك بالرفض مع المطالبة بأصول محددة. يمكنك الآن اختيار العينات.')
             return redirect('heirs:select_assets', link=link, heir_id=heir.id)
@@ -446,6 +497,7 @@ def session_home(request, link, heir_id):
             )
             
             target = conflict.component or conflict.parent_asset
+            selections_before = get_heir_selection_keys(heir)
             
             if conflict.component:
                 holds_full_asset = HeirAssetSelection.objects.filter(heir=heir, asset=conflict.parent_asset).exists()
@@ -481,6 +533,9 @@ def session_home(request, link, heir_id):
                 parent_asset=conflict.parent_asset,
                 status=ComponentConflictRequest.Status.PENDING
             ).exclude(id=conflict.id).update(status=ComponentConflictRequest.Status.CANCELED)
+
+            publish_selection_changes(conflict.case, heir, selections_before)
+            publish_session_event(conflict.case, SessionEvent.CONFLICT_RESOLVED, **conflict_event_data(conflict))
             
             messages.success(request, f'تم التنازل عن {target.description} وتحريره من اختياراتك بنجاح.')
             return redirect('heirs:session_home', link=link, heir_id=heir.id)
@@ -509,6 +564,7 @@ def session_home(request, link, heir_id):
             # Add the two contenders (Owner and Requester)
             raffle.contenders.add(conflict.owner_heir, conflict.requesting_heir)
             raffle.save()
+            publish_session_event(conflict.case, SessionEvent.CONFLICT_RESOLVED, **conflict_event_data(conflict))
             
             messages.warning(request, 'تم رفض التنازل وطلب إحالة النزاع للقرعة. سيتمكن القاضي من بدء القرعة الآن.')
             return redirect('heirs:session_home', link=link, heir_id=heir.id)
@@ -585,100 +641,149 @@ def session_home(request, link, heir_id):
         'pending_proposal': pending_proposal,
     })
 
-def select_assets(request, link, heir_id):
-    case = get_object_or_404(Case, session_link=link)
-    heir = get_object_or_404(Heir, id=heir_id, case=case)
-    
-    allow_selection = case.status in [Case.Status.MUTUAL_SELECTION, Case.Status.ALTERNATIVE_SELECTION]
-    if heir.acceptance_status == Heir.AcceptanceStatus.OBJECTION_WITH_SELECTION:
-        allow_selection = True
-        
-    if not allow_selection:
-        messages.error(request, 'لا يمكنك اختيار الأصول في هذه المرحلة.')
-        return redirect('heirs:session_home', link=link, heir_id=heir.id)
-    
-    from cases.models import AssetComponent
-    available_assets = Asset.objects.filter(case=case)
-    available_components = AssetComponent.objects.filter(asset__case=case)
-    
-    # Decorate assets with selection logic for the template
-    for asset in available_assets:
+def _obligation_amount():
+    # Same total as the obligation_total property, without a query per card.
+    return Coalesce(
+        Sum('obligation_allocations__allocated_amount'),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def _selection_catalog(case):
+    """
+    Assets and components offered on the selection page, each marked with
+    is_selectable / unavailable_reason, loaded with their owners in two queries.
+    """
+    assets = list(
+        Asset.objects.filter(case=case)
+        .select_related('assigned_to')
+        .annotate(obligation_amount=_obligation_amount())
+        .order_by('id')
+    )
+    components = list(
+        AssetComponent.objects.filter(asset__case=case)
+        .select_related('assigned_to', 'asset', 'asset__assigned_to')
+        .annotate(obligation_amount=_obligation_amount())
+        .order_by('id')
+    )
+
+    # In ALTERNATIVE_SELECTION, we allow selecting even if assigned (Challenging)
+    mutual = case.status == Case.Status.MUTUAL_SELECTION
+    for asset in assets:
         asset.is_selectable = True
         asset.unavailable_reason = ""
-        
-        if case.status == Case.Status.MUTUAL_SELECTION:
+        if mutual:
             if asset.assigned_to:
                 asset.is_selectable = False
                 asset.unavailable_reason = f"مخصص لـ {asset.assigned_to.name}"
             elif asset.is_locked:
                 asset.is_selectable = False
                 asset.unavailable_reason = "هذا الأصل مقفل حالياً"
-        # In ALTERNATIVE_SELECTION, we allow selecting even if assigned (Challenging)
-        
-    for comp in available_components:
+
+    for comp in components:
         comp.is_selectable = True
         comp.unavailable_reason = ""
-        
-        if case.status == Case.Status.MUTUAL_SELECTION:
+        if mutual:
             if comp.assigned_to:
                 comp.is_selectable = False
                 comp.unavailable_reason = f"مخصص لـ {comp.assigned_to.name}"
             elif comp.asset.is_locked: # If parent asset is locked, component is locked
                 comp.is_selectable = False
                 comp.unavailable_reason = "الأصل التابع له هذا الجزء مقفل"
+
+    return assets, components
+
+
+def _full_asset_partial_conflicts(heir, assets):
+    """
+    Components of the fully selected assets that other heirs picked on their
+    own (excluding those this heir already ceded), grouped per asset for the
+    confirmation modal.
+    """
+    if not assets:
+        return []
+    ceded_ids = set(ComponentConflictRequest.objects.filter(
+        requesting_heir=heir,
+        component__asset__in=assets,
+        status=ComponentConflictRequest.Status.ACCEPTED
+    ).values_list('component_id', flat=True))
+    claims = HeirAssetSelection.objects.filter(
+        component__asset__in=assets,
+        asset__isnull=True
+    ).exclude(heir=heir).exclude(component_id__in=ceded_ids).select_related('heir', 'component').order_by('id')
+
+    by_asset = {}
+    for sel in claims:
+        comp_data = by_asset.setdefault(sel.component.asset_id, {})
+        comp_data.setdefault(sel.component.id, {'component': sel.component, 'claimants': []})['claimants'].append(sel)
+    return [
+        {'asset': asset, 'components': list(by_asset[asset.id].values())}
+        for asset in assets if asset.id in by_asset
+    ]
+
+
+def _posted_ids(values):
+    return {int(value) for value in values if value.isdigit()}
+
+
+def _evaluate_selection(heir, assets, components, asset_ids, component_ids):
+    """Running totals, unavailable items and conflicts for a proposed selection."""
+    asset_ids, component_ids = _posted_ids(asset_ids), _posted_ids(component_ids)
+    selected_assets = [asset for asset in assets if asset.id in asset_ids]
+    selected_components = [comp for comp in components if comp.id in component_ids]
+    total = sum((a.value for a in selected_assets), Decimal('0.00')) + sum(
+        (c.value for c in selected_components), Decimal('0.00')
+    )
+    return {
+        'assets': selected_assets,
+        'components': selected_components,
+        'total': total,
+        'difference': total - heir.share_value,
+        'unavailable': [item for item in selected_assets + selected_components if not item.is_selectable],
+        'conflicts': _full_asset_partial_conflicts(heir, selected_assets),
+    }
+
+
+def select_assets(request, link, heir_id):
+    case = get_object_or_404(Case, session_link=link)
+    heir = get_object_or_404(Heir, id=heir_id, case=case)
+    
+    allow_selection = case.status in [Case.Status.MUTUAL_SELECTION, Case.Status.ALTERNATIVE_SELECTION]
+    if heir.acceptance_status == Heir.AcceptanceStatus.OBJECTION_WITH_SELECTION:
+        allow_selection = True
+        
+    if not allow_selection:
+        messages.error(request, 'لا يمكنك اختيار الأصول في هذه المرحلة.')
+        return redirect('heirs:session_home', link=link, heir_id=heir.id)
+    
+    available_assets, available_components = _selection_catalog(case)
     
     if request.method == 'POST':
         selected_asset_ids = request.POST.getlist('selected_assets')
         selected_component_ids = request.POST.getlist('selected_components')
         confirm_balance = request.POST.get('confirm_balance')
         
-        selected_assets = Asset.objects.filter(id__in=selected_asset_ids)
-        selected_components = AssetComponent.objects.filter(id__in=selected_component_ids)
+        selection = _evaluate_selection(heir, available_assets, available_components, selected_asset_ids, selected_component_ids)
+        selected_assets = selection['assets']
+        selected_components = selection['components']
         
-        total_value = sum(a.value for a in selected_assets) + sum(c.value for c in selected_components)
+        total_value = selection['total']
         share_value = heir.share_value
         
-        diff = total_value - share_value
+        diff = selection['difference']
         is_valid = True
         
+        if selection['unavailable']:
+            is_valid = False
+            names = '، '.join(item.description for item in selection['unavailable'])
+            messages.error(request, f'لا يمكن اختيار: {names}.')
+        
         # --- SCENARIO 2 DETECTION: Full Asset vs Pre-existing Components ---
         confirm_conflicts = request.POST.get('confirm_full_asset_partial_conflicts')
-        full_asset_partial_conflicts = []
-        
-        for asset in selected_assets:
-            # Check if any component of this asset is already selected by others
-            conflicting_selections = HeirAssetSelection.objects.filter(
-                component__asset=asset,
-                asset__isnull=True
-            ).exclude(heir=heir).select_related('heir', 'component')
-
-            # --- Exclude components already ceded by this heir ---
-            from cases.models import ComponentConflictRequest
-            already_ceded_ids = set(ComponentConflictRequest.objects.filter(
-                requesting_heir=heir,
-                component__asset=asset,
-                status=ComponentConflictRequest.Status.ACCEPTED
-            ).values_list('component_id', flat=True))
-
-            if already_ceded_ids:
-                conflicting_selections = conflicting_selections.exclude(component_id__in=already_ceded_ids)
-            
-            if conflicting_selections.exists():
-                comp_data = {}
-                for sel in conflicting_selections:
-                    if sel.component.id not in comp_data:
-                        comp_data[sel.component.id] = {
-                            'component': sel.component,
-                            'claimants': []
-                        }
-                    comp_data[sel.component.id]['claimants'].append(sel)
-                
-                full_asset_partial_conflicts.append({
-                    'asset': asset,
-                    'components': list(comp_data.values())
-                })
+        full_asset_partial_conflicts = selection['conflicts']
 
-        if full_asset_partial_conflicts and confirm_conflicts != '1':
+        if is_valid and full_asset_partial_conflicts and confirm_conflicts != '1':
             is_valid = False
             # Return to page to show the modal
             return render(request, 'heirs/select_assets.html', {
@@ -702,6 +807,7 @@ def select_assets(request, link, heir_id):
             messages.error(request, f'القيمة المختارة ({total_value}) أكبر من نصيبك. يجب إعطاء تعهد بتوفية الفرق المتبقي ({diff}).')
 
         if is_valid:
+             selections_before = get_heir_selection_keys(heir)
              HeirAssetSelection.objects.filter(heir=heir).delete()
              
              for asset in selected_assets:
@@ -743,7 +849,7 @@ def select_assets(request, link, heir_id):
                                  )
                                  
                                  # Re-select all components of this asset EXCEPT the ceded ones
-                                 for comp in asset.components.all():
+                                 for comp in [c for c in available_components if c.asset_id == asset.id]:
                                      if comp.id not in ceded_ids:
                                          # Select the remainder
                                          HeirAssetSelection.objects.create(
@@ -758,11 +864,13 @@ def select_assets(request, link, heir_id):
                                                  if comp_conflict['component'].id == comp.id:
                                                      for sel in comp_conflict['claimants']:
                                                          from cases.models import ComponentConflictRequest
-                                                         ComponentConflictRequest.objects.get_or_create(
+                                                         conflict, created = ComponentConflictRequest.objects.get_or_create(
                                                              case=case, requesting_heir=heir, owner_heir=sel.heir,
                                                              component=comp, parent_asset=asset,
                                                              status=ComponentConflictRequest.Status.PENDING
                                                          )
+                                                         if created:
+                                                             publish_session_event(case, SessionEvent.CONFLICT_CREATED, **conflict_event_data(conflict))
                              else:
                                  # Normal Raffle Handling (no ceding, keeping the Full Asset selection)
                                  for comp_id in raffle_ids:
@@ -771,11 +879,13 @@ def select_assets(request, link, heir_id):
                                              comp = comp_conflict['component']
                                              for sel in comp_conflict['claimants']:
                                                  from cases.models import ComponentConflictRequest
-                                                 ComponentConflictRequest.objects.get_or_create(
+                                                 conflict, created = ComponentConflictRequest.objects.get_or_create(
                                                      case=case, requesting_heir=heir, owner_heir=sel.heir,
                                                      component=comp, parent_asset=asset,
                                                      status=ComponentConflictRequest.Status.PENDING
                                                  )
+                                                 if created:
+                                                     publish_session_event(case, SessionEvent.CONFLICT_CREATED, **conflict_event_data(conflict))
                  
                  # Log selection
                  SelectionLog.objects.create(
@@ -816,6 +926,7 @@ def select_assets(request, link, heir_id):
                  heir.allocation_description = "تم اختيار أصول مطابقة للنصيب"
                   
              heir.save()
+             publish_selection_changes(case, heir, selections_before)
              
              # Check if all heirs have submitted their selections
              if not case.heirs.exclude(acceptance_status__in=[Heir.AcceptanceStatus.ACCEPTED, Heir.AcceptanceStatus.SELECTION_FINISHED]).exists():
@@ -852,6 +963,55 @@ def select_assets(request, link, heir_id):
         'estate_components': available_components
     })
 
+@require_POST
+def validate_selection(request, link, heir_id):
+    """
+    Totals, overage and conflicts for the selection currently ticked on the
+    select page, so heirs can adjust it before the full POST.
+    """
+    case = get_object_or_404(Case, session_link=link)
+    heir = get_object_or_404(Heir, id=heir_id, case=case)
+    assets, components = _selection_catalog(case)
+    selection = _evaluate_selection(
+        heir, assets, components,
+        request.POST.getlist('selected_assets'), request.POST.getlist('selected_components'),
+    )
+    diff = selection['difference']
+    unavailable = selection['unavailable']
+    return JsonResponse({
+        'total': str(selection['total']),
+        'share': str(heir.share_value),
+        'difference': str(diff),
+        'overage': str(max(diff, Decimal('0.00'))),
+        'remaining': str(max(-diff, Decimal('0.00'))),
+        'requires_pledge': diff > 0,
+        'valid': not unavailable and (diff <= 0 or request.POST.get('confirm_balance') == 'on'),
+        'unavailable': [
+            {
+                'kind': 'asset' if isinstance(item, Asset) else 'component',
+                'id': item.id,
+                'description': item.description,
+                'reason': item.unavailable_reason,
+            }
+            for item in unavailable
+        ],
+        'conflicts': [
+            {
+                'asset_id': entry['asset'].id,
+                'asset': entry['asset'].description,
+                'components': [
+                    {
+                        'id': comp_conflict['component'].id,
+                        'description': comp_conflict['component'].description,
+                        'claimants': [sel.heir.name for sel in comp_conflict['claimants']],
+                    }
+                    for comp_conflict in entry['components']
+                ],
+            }
+            for entry in selection['conflicts']
+        ],
+    })
+
 @login_required
 def final_report(request, case_id, heir_id):
     case = get_object_or_404(Case, id=case_id, status=Case.Status.COMPLETED)
@@ -1000,7 +1160,9 @@ def reselect_assets(request, link, heir_id):
     heir = get_object_or_404(Heir, id=heir_id, case=case, user=request.user)
     
     # Delete current selections for this heir
+    selections_before = get_heir_selection_keys(heir)
     HeirAssetSelection.objects.filter(heir=heir).delete()
+    publish_selection_changes(case, heir, selections_before)
     
     # Update status to allow re-selection
     # If they were REJECTED (original objector), keep it so they stay in Alternative flow if needed
@@ -1022,6 +1184,7 @@ def confirm_payment_sent(request, settlement_id):
     if request.method == 'POST':
         settlement.heir_confirmed_payment = True # Need to add this field to model
         settlement.save()
+        publish_session_event(settlement.case, SessionEvent.SETTLEMENT_CONFIRMED, **settlement_event_data(settlement))
         
         # Log action
         SelectionLog.objects.create(
@@ -1044,6 +1207,7 @@ def confirm_receipt(request, settlement_id):
     if request.method == 'POST':
         settlement.is_delivered_to_owner = True
         settlement.save()
+        publish_session_event(settlement.case, SessionEvent.SETTLEMENT_CONFIRMED, **settlement_event_data(settlement))
         
         # Log action
         SelectionLog.objects.create(
@@ -1067,6 +1231,7 @@ def confirm_settlement_action(request, settlement_id):
         if settlement.payer == heir:
             settlement.heir_confirmed_payment = True
             settlement.save()
+            publish_session_event(settlement.case, SessionEvent.SETTLEMENT_CONFIRMED, **settlement_event_data(settlement))
             messages.success(request, "تم تأكيد دفع الفرق المالي بنجاح.")
         else:
             messages.error(request, "لا تملك صلاحية تأكيد هذا الدفع.")
@@ -1076,6 +1241,7 @@ def confirm_settlement_action(request, settlement_id):
             if settlement.heir_confirmed_payment:
                 settlement.receiver_confirmed_payment = True
                 settlement.save()
+                publish_session_event(settlement.case, SessionEvent.SETTLEMENT_CONFIRMED, **settlement_event_data(settlement))
                 messages.success(request, "تم تأكيد استلام المبلغ بنجاح.")
             else:
                 messages.error(request, "يجب أن يقوم الدافع بتأكيد الدفع أولاً.")
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import BackgroundJob
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task_name', 'case', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'task_name')
+    search_fields = ('task_name', 'case__case_number')
@@ -0,0 +1,80 @@
+import logging
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+class BaseJobBackend:
+    """
+    Transport for queued jobs. BackgroundJob rows stay the source of truth for
+    status and progress; a backend only decides how workers learn about and
+    claim queued work, so a Redis list can replace polling later.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    def enqueue(self, job):
+        raise NotImplementedError
+
+    def claim(self, worker_id):
+        raise NotImplementedError
+
+    def requeue_stale(self, timeout_seconds, max_attempts=None):
+        raise NotImplementedError
+
+
+class DatabaseJobBackend(BaseJobBackend):
+    """Workers poll the jobs table and claim rows with a conditional update."""
+
+    def enqueue(self, job):
+        # The row itself is the queue entry.
+        return job
+
+    def claim(self, worker_id):
+        candidate_ids = list(
+            BackgroundJob.objects.filter(status=BackgroundJob.Status.QUEUED)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)[:10]
+        )
+        now = timezone.now()
+        for job_id in candidate_ids:
+            claimed = BackgroundJob.objects.filter(
+                id=job_id, status=BackgroundJob.Status.QUEUED
+            ).update(
+                status=BackgroundJob.Status.RUNNING,
+                worker_id=worker_id,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                return BackgroundJob.objects.get(id=job_id)
+        return None
+
+    def requeue_stale(self, timeout_seconds, max_attempts=None):
+        """
+        Queue again the running jobs whose worker stopped sending heartbeats.
+        A job that already used max_attempts is marked FAILED instead, so one
+        that kills its worker (OOM, segfault) does not loop forever.
+        """
+        now = timezone.now()
+        stale = BackgroundJob.objects.filter(
+            status=BackgroundJob.Status.RUNNING,
+            heartbeat_at__lt=now - timedelta(seconds=timeout_seconds),
+        )
+        if max_attempts:
+            failed = stale.filter(attempts__gte=max_attempts).update(
+                status=BackgroundJob.Status.FAILED,
+                worker_id="",
+                finished_at=now,
+                error=f"توقف العامل أثناء تنفيذ المهمة في {max_attempts} محاولات، فلن تُعاد تلقائيًا.",
+            )
+            if failed:
+                logger.error("Marked %s job(s) failed after their worker died %s times", failed, max_attempts)
+        return stale.update(status=BackgroundJob.Status.QUEUED, worker_id="")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from jobs.registry import registered_tasks
+from jobs.worker import run_worker_pool
+
+
+class Command(BaseCommand):
+    help = "Run background job workers for heavy case operations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Number of worker processes to fork.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Registered tasks: {', '.join(registered_tasks()) or '-'}")
+        run_worker_pool(
+            options["processes"],
+            poll_interval=options["poll_interval"],
+            burst=options["burst"],
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('cases', '0038_publicassetlisting_asset_publicassetlisting_image_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(db_index=True, max_length=100, verbose_name='اسم المهمة')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='بيانات المهمة')),
+                ('status', models.CharField(choices=[('QUEUED', 'في قائمة الانتظار'), ('RUNNING', 'قيد التنفيذ'), ('SUCCEEDED', 'اكتملت بنجاح'), ('FAILED', 'فشلت')], db_index=True, default='QUEUED', max_length=20, verbose_name='الحالة')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='نسبة الإنجاز %')),
+                ('progress_message', models.CharField(blank=True, max_length=255, verbose_name='رسالة التقدم')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='النتيجة')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('worker_id', models.CharField(blank=True, max_length=100, verbose_name='معرف العامل')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بدء التنفيذ')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر نبضة')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='انتهاء التنفيذ')),
+                ('case', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to='cases.case', verbose_name='القضية')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_jobs', to=settings.AUTH_USER_MODEL, verbose_name='طلبها')),
+            ],
+            options={
+                'verbose_name': 'مهمة خلفية',
+                'verbose_name_plural': 'المهام الخلفية',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='jobs_backgr_status_226590_idx')],
+            },
+        ),
+    ]
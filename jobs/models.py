@@ -0,0 +1,110 @@
+import threading
+
+from django.conf import settings
+from django.db import connections, models, router
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# Per-thread connections used to publish progress while the task's own
+# connection is inside transaction.atomic(); see BackgroundJob.report_progress.
+_progress_connections = threading.local()
+
+
+def _progress_connection(alias):
+    connection = getattr(_progress_connections, alias, None)
+    if connection is None:
+        connection = connections.create_connection(alias)
+        setattr(_progress_connections, alias, connection)
+    return connection
+
+
+def close_progress_connections():
+    for alias, connection in list(vars(_progress_connections).items()):
+        connection.close()
+        delattr(_progress_connections, alias)
+
+
+class BackgroundJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", _("في قائمة الانتظار")
+        RUNNING = "RUNNING", _("قيد التنفيذ")
+        SUCCEEDED = "SUCCEEDED", _("اكتملت بنجاح")
+        FAILED = "FAILED", _("فشلت")
+
+    task_name = models.CharField(max_length=100, db_index=True, verbose_name=_("اسم المهمة"))
+    case = models.ForeignKey("cases.Case", on_delete=models.CASCADE, null=True, blank=True, related_name="background_jobs", verbose_name=_("القضية"))
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="background_jobs", verbose_name=_("طلبها"))
+    payload = models.JSONField(default=dict, blank=True, verbose_name=_("بيانات المهمة"))
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, db_index=True, verbose_name=_("الحالة"))
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name=_("نسبة الإنجاز %"))
+    progress_message = models.CharField(max_length=255, blank=True, verbose_name=_("رسالة التقدم"))
+    result = models.JSONField(null=True, blank=True, verbose_name=_("النتيجة"))
+    error = models.TextField(blank=True, verbose_name=_("الخطأ"))
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_("عدد المحاولات"))
+    worker_id = models.CharField(max_length=100, blank=True, verbose_name=_("معرف العامل"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("تاريخ الإنشاء"))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_("بدء التنفيذ"))
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name=_("آخر نبضة"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("انتهاء التنفيذ"))
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+        verbose_name = _("مهمة خلفية")
+        verbose_name_plural = _("المهام الخلفية")
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+    @property
+    def display_error(self):
+        """The failure reason to show users; crash tracebacks stay in the admin."""
+        if self.error.startswith("Traceback"):
+            return "تعذر إكمال المهمة بسبب خطأ غير متوقع، يرجى المحاولة مرة أخرى أو التواصل مع الدعم الفني."
+        return self.error
+
+    def report_progress(self, percent, message=""):
+        """
+        Persist progress from inside a running task so pollers can see it.
+        Updates made inside the task's transaction.atomic() would only become
+        visible at commit, so those go through a separate autocommit connection.
+        SQLite allows one writer at a time, which would make that connection
+        wait on the task's own lock; there progress lands at commit instead.
+        """
+        self.progress = max(0, min(100, int(percent)))
+        self.progress_message = message[:255]
+        self.heartbeat_at = timezone.now()
+        alias = router.db_for_write(BackgroundJob, instance=self)
+        connection = connections[alias]
+        if connection.in_atomic_block and connection.vendor != "sqlite":
+            side = _progress_connection(alias)
+            quote = side.ops.quote_name
+            with side.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {quote(self._meta.db_table)} SET {quote('progress')} = %s, "
+                    f"{quote('progress_message')} = %s, {quote('heartbeat_at')} = %s WHERE {quote('id')} = %s",
+                    [self.progress, self.progress_message, side.ops.adapt_datetimefield_value(self.heartbeat_at), self.pk],
+                )
+        else:
+            BackgroundJob.objects.using(alias).filter(pk=self.pk).update(
+                progress=self.progress,
+                progress_message=self.progress_message,
+                heartbeat_at=self.heartbeat_at,
+            )
+
+    def as_status_dict(self):
+        return {
+            "id": self.id,
+            "task": self.task_name,
+            "status": self.status,
+            "status_display": self.get_status_display(),
+            "progress": self.progress,
+            "message": self.progress_message,
+            "result": self.result,
+            "error": self.display_error,
+            "is_finished": self.is_finished,
+        }
+
+    def __str__(self):
+        return f"{self.task_name} #{self.id} ({self.get_status_display()})"
@@ -0,0 +1,23 @@
+_TASKS = {}
+
+
+class JobError(Exception):
+    """Raised by a task to fail its job with a user-facing message."""
+
+
+def register_task(name):
+    def decorator(func):
+        _TASKS[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _TASKS[name]
+    except KeyError:
+        raise JobError(f"Unknown background task: {name}")
+
+
+def registered_tasks():
+    return sorted(_TASKS)
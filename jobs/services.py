@@ -0,0 +1,119 @@
+import logging
+import traceback
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BackgroundJob, close_progress_connections
+from .registry import JobError, get_task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_QUEUE = {
+    "BACKEND": "jobs.backends.DatabaseJobBackend",
+    "OPTIONS": {},
+    "EAGER": False,
+    "MAX_ATTEMPTS": 3,
+    "STALE_AFTER_SECONDS": 600,
+    # Running jobs refresh heartbeat_at this often; workers check for stale jobs as often.
+    "HEARTBEAT_SECONDS": 30,
+}
+
+
+def get_job_queue_settings():
+    return {**DEFAULT_JOB_QUEUE, **getattr(settings, "JOB_QUEUE", {})}
+
+
+@lru_cache(maxsize=None)
+def get_job_backend():
+    config = get_job_queue_settings()
+    return import_string(config["BACKEND"])(**config["OPTIONS"])
+
+
+def get_active_job(task_name, case=None):
+    return (
+        BackgroundJob.objects.filter(
+            task_name=task_name,
+            case=case,
+            status__in=[BackgroundJob.Status.QUEUED, BackgroundJob.Status.RUNNING],
+        )
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def get_failed_job(task_name, case=None):
+    """The latest job of the task for the case, if that run failed."""
+    job = BackgroundJob.objects.filter(task_name=task_name, case=case).order_by("-created_at", "-id").first()
+    if job and job.status == BackgroundJob.Status.FAILED:
+        return job
+    return None
+
+
+def enqueue_job(task_name, case=None, user=None, dedupe=True, **payload):
+    """
+    Queue a registered task and return its BackgroundJob. With dedupe, a job of
+    the same task for the same case that is still pending is returned instead
+    of queueing a duplicate (e.g. a judge double-submitting finalization).
+    """
+    get_task(task_name)
+    if dedupe:
+        existing = get_active_job(task_name, case)
+        if existing:
+            return existing
+
+    job = BackgroundJob.objects.create(
+        task_name=task_name,
+        case=case,
+        requested_by=user,
+        payload=payload,
+    )
+    if get_job_queue_settings()["EAGER"]:
+        BackgroundJob.objects.filter(id=job.id).update(
+            status=BackgroundJob.Status.RUNNING, started_at=timezone.now(), attempts=1
+        )
+        job.refresh_from_db()
+        execute_job(job)
+        job.refresh_from_db()
+        return job
+
+    get_job_backend().enqueue(job)
+    return job
+
+
+def execute_job(job):
+    """Run a claimed job to completion and record its outcome."""
+    config = get_job_queue_settings()
+    try:
+        func = get_task(job.task_name)
+        result = func(job, **job.payload)
+    except JobError as exc:
+        _finish(job, BackgroundJob.Status.FAILED, error=str(exc))
+    except Exception:
+        logger.exception("Background job %s (%s) crashed", job.id, job.task_name)
+        if job.attempts < config["MAX_ATTEMPTS"]:
+            BackgroundJob.objects.filter(id=job.id).update(
+                status=BackgroundJob.Status.QUEUED,
+                worker_id="",
+                error=traceback.format_exc(),
+            )
+        else:
+            _finish(job, BackgroundJob.Status.FAILED, error=traceback.format_exc())
+    else:
+        _finish(job, BackgroundJob.Status.SUCCEEDED, result=result)
+    finally:
+        close_progress_connections()
+        close_old_connections()
+
+
+def _finish(job, status, result=None, error=""):
+    job.status = status
+    job.result = result
+    job.error = error
+    job.finished_at = timezone.now()
+    if status == BackgroundJob.Status.SUCCEEDED:
+        job.progress = 100
+    job.save(update_fields=["status", "result", "error", "finished_at", "progress"])
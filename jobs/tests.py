@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import BackgroundJob
+from .registry import JobError, register_task
+from .services import enqueue_job
+from .worker import Worker
+
+
+@register_task("jobs_tests.add")
+def add_task(job, a, b):
+    job.report_progress(50, "halfway")
+    return {"sum": a + b}
+
+
+@register_task("jobs_tests.refuse")
+def refuse_task(job):
+    raise JobError("لا يمكن تنفيذ المهمة.")
+
+
+@register_task("jobs_tests.crash")
+def crash_task(job):
+    raise RuntimeError("boom")
+
+
+# TransactionTestCase: execute_job closes stale connections, which a TestCase transaction would not survive.
+@override_settings(JOB_QUEUE={"EAGER": False, "MAX_ATTEMPTS": 2, "STALE_AFTER_SECONDS": 60})
+class JobQueueTests(TransactionTestCase):
+    def run_worker(self):
+        return Worker(name="test-worker").run_once()
+
+    def test_worker_runs_a_queued_job(self):
+        job = enqueue_job("jobs_tests.add", a=2, b=3)
+        self.assertEqual(job.status, BackgroundJob.Status.QUEUED)
+
+        self.assertTrue(self.run_worker())
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.SUCCEEDED)
+        self.assertEqual(job.result, {"sum": 5})
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.worker_id, "test-worker")
+        self.assertFalse(self.run_worker())
+
+    def test_pending_job_is_not_queued_twice(self):
+        first = enqueue_job("jobs_tests.add", a=1, b=1)
+        self.assertEqual(enqueue_job("jobs_tests.add", a=1, b=1), first)
+        self.assertNotEqual(enqueue_job("jobs_tests.add", dedupe=False, a=1, b=1), first)
+
+    @override_settings(JOB_QUEUE={"EAGER": True})
+    def test_eager_mode_runs_inline(self):
+        job = enqueue_job("jobs_tests.add", a=4, b=5)
+        self.assertEqual(job.status, BackgroundJob.Status.SUCCEEDED)
+        self.assertEqual(job.result, {"sum": 9})
+
+    def test_job_error_fails_without_retry(self):
+        job = enqueue_job("jobs_tests.refuse")
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.FAILED)
+        self.assertEqual(job.display_error, "لا يمكن تنفيذ المهمة.")
+        self.assertEqual(job.attempts, 1)
+        self.assertFalse(self.run_worker())
+
+    def test_crash_is_retried_until_max_attempts(self):
+        job = enqueue_job("jobs_tests.crash")
+        with self.assertLogs("jobs.services", "ERROR"):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.QUEUED)
+        self.assertIn("RuntimeError: boom", job.error)
+
+        with self.assertLogs("jobs.services", "ERROR"):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        # Tracebacks stay in the admin; users get a generic message.
+        self.assertNotIn("boom", job.as_status_dict()["error"])
+
+    def _stale_job(self, attempts):
+        return BackgroundJob.objects.create(
+            task_name="jobs_tests.add",
+            payload={"a": 1, "b": 2},
+            status=BackgroundJob.Status.RUNNING,
+            worker_id="dead-worker",
+            attempts=attempts,
+            heartbeat_at=timezone.now() - timedelta(minutes=5),
+        )
+
+    def test_stale_job_is_requeued_and_run(self):
+        job = self._stale_job(attempts=1)
+        fresh = BackgroundJob.objects.create(
+            task_name="jobs_tests.add", status=BackgroundJob.Status.RUNNING, worker_id="live-worker",
+            attempts=1, heartbeat_at=timezone.now(),
+        )
+        with self.assertLogs("jobs.worker", "WARNING"):
+            Worker(name="test-worker").run(burst=True)
+        job.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(fresh.status, BackgroundJob.Status.RUNNING)
+
+    def test_stale_job_out_of_attempts_fails(self):
+        job = self._stale_job(attempts=2)
+        with self.assertLogs("jobs.backends", "ERROR"):
+            Worker(name="test-worker").run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(job.error)
@@ -0,0 +1,18 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .models import BackgroundJob
+
+
+@login_required
+def job_status(request, job_id):
+    job = get_object_or_404(BackgroundJob.objects.select_related("case"), id=job_id)
+    allowed = (
+        request.user.role == "ADMIN"
+        or job.requested_by_id == request.user.id
+        or (job.case is not None and job.case.judge_id == request.user.id)
+    )
+    if not allowed:
+        return JsonResponse({"error": "غير مصرح لك بمتابعة هذه المهمة."}, status=403)
+    return JsonResponse(job.as_status_dict())
@@ -0,0 +1,129 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.db import DatabaseError, connection, connections
+from django.utils import timezone
+
+from .models import BackgroundJob
+from .services import execute_job, get_job_backend, get_job_queue_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat(threading.Thread):
+    """
+    Refreshes heartbeat_at while a job runs, so requeue_stale only picks up
+    jobs whose worker died, not tasks that are slow between progress reports.
+    """
+
+    def __init__(self, job, worker_id, interval):
+        super().__init__(name=f"job-heartbeat-{job.id}", daemon=True)
+        self.job_id = job.id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    BackgroundJob.objects.filter(
+                        id=self.job_id,
+                        status=BackgroundJob.Status.RUNNING,
+                        worker_id=self.worker_id,
+                    ).update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    logger.warning("Heartbeat for job %s failed", self.job_id, exc_info=True)
+        finally:
+            # Django connections are per thread; this one belongs to the heartbeat.
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Worker:
+    def __init__(self, poll_interval=1.0, name=None):
+        self.poll_interval = poll_interval
+        self.worker_id = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.should_stop = False
+        self.config = get_job_queue_settings()
+        self.next_stale_check = 0.0
+
+    def stop(self, *args):
+        self.should_stop = True
+
+    def run_once(self):
+        job = get_job_backend().claim(self.worker_id)
+        if job is None:
+            return False
+        logger.info("Worker %s running job %s (%s)", self.worker_id, job.id, job.task_name)
+        heartbeat = Heartbeat(job, self.worker_id, self.config["HEARTBEAT_SECONDS"])
+        heartbeat.start()
+        try:
+            execute_job(job)
+        finally:
+            heartbeat.stop()
+        return True
+
+    def requeue_stale(self):
+        """Put back jobs of dead workers, at most once per heartbeat interval."""
+        now = time.monotonic()
+        if now < self.next_stale_check:
+            return 0
+        self.next_stale_check = now + self.config["HEARTBEAT_SECONDS"]
+        requeued = get_job_backend().requeue_stale(self.config["STALE_AFTER_SECONDS"], self.config["MAX_ATTEMPTS"])
+        if requeued:
+            logger.warning("Worker %s requeued %s stale job(s)", self.worker_id, requeued)
+        return requeued
+
+    def run(self, burst=False):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.should_stop:
+            self.requeue_stale()
+            if self.run_once():
+                continue
+            if burst:
+                break
+            time.sleep(self.poll_interval)
+
+
+def run_worker_pool(processes, poll_interval=1.0, burst=False):
+    """Fork `processes` workers that share the queue and wait for them to exit."""
+    if processes <= 1:
+        Worker(poll_interval).run(burst=burst)
+        return
+
+    # Children must open their own database connections.
+    connections.close_all()
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                Worker(poll_interval).run(burst=burst)
+            except Exception:
+                logger.exception("Job worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children.append(pid)
+
+    def _forward(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for pid in children:
+        os.waitpid(pid, 0)
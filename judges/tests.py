@@ -1,3 +1,30 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+
+from cases.models import Asset, AssetComponent, Case, Heir
+from monitoring.testing import QueryBudgetMixin
+from users.models import User
+
+
+class AllocateHeirsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.judge = User.objects.create_user("judge", password="x", role=User.Role.JUDGE)
+        cls.case = Case.objects.create(judge=cls.judge, case_number="1", status=Case.Status.READY_FOR_CALCULATION)
+        heirs = [
+            Heir.objects.create(case=cls.case, name=f"heir {i}", relationship="ابن", gender="ذكر", share_value=Decimal("300"))
+            for i in range(6)
+        ]
+        for i in range(10):
+            asset = Asset.objects.create(case=cls.case, description=f"asset {i}", value=Decimal("100"),
+                                         assigned_to=heirs[i % 6] if i % 2 else None)
+            for j in range(3):
+                AssetComponent.objects.create(asset=asset, description=f"component {j}", value=Decimal("20"))
 
-# Create your tests here.
+    def test_allocation_page_with_suggestion_stays_within_budget(self):
+        self.client.force_login(self.judge)
+        response = self.client.get(reverse("judges:allocate_heirs", args=[self.case.id]) + "?suggest=1", secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response)
@@ -10,7 +10,12 @@ from cases.models import Case, Asset, Debt, Will, Heir, Deceased, HeirAssetSelec
 from cases.forms import AssetForm, DebtForm, WillForm, DeceasedForm
 from django.forms import modelformset_factory
 from calculator.engine import InheritanceEngine
-from cases.services import get_case_judge_completion_status
+from cases.realtime import SessionEvent, publish_session_event, raffle_event_data, settlement_event_data
+from cases.services import (
+    apply_optimal_allocation, build_optimal_allocation, get_case_judge_completion_status, get_heir_allocation_errors,
+    get_publish_blocking_settlements, get_unpaid_suggested_settlements, load_heir_allocation,
+    optimal_allocation_fingerprint, save_heir_allocation,
+)
 
 User = get_user_model()
 
@@ -655,7 +660,7 @@ def allocate_assets(request, case_id):
             return redirect('judges:allocate_assets', case_id=case.id)
             
         elif action == 'publish_session':
-             if PaymentSettlement.objects.filter(case=case, is_delivered_to_owner=False).exists():
+             if get_publish_blocking_settlements(case).exists():
                  messages.error(request, "لا يمكن اعتماد القسمة النهائية لوجود تسويات مالية معلقة لم تكتمل دورتها (سداد وتأكيد استلام).")
                  return redirect('judges:allocate_assets', case_id=case.id)
 
@@ -728,7 +733,7 @@ def allocate_assets(request, case_id):
     assets = case.assets.prefetch_related('components', 'selection_intents__heir').all()
     heirs = case.heirs.all()
     
-    has_pending_payments = PaymentSettlement.objects.filter(case=case, is_delivered_to_owner=False).exists()
+    has_pending_payments = get_publish_blocking_settlements(case).exists()
     
     return render(request, 'judges/allocate_assets.html', {
         'case': case,
@@ -865,6 +870,7 @@ def resolve_raffle(request, dispute_id):
                 heir=winner,
                 action_text=f"فاز بالقرعة الإلكترونية على {asset.description}."
             )
+            publish_session_event(dispute.case, SessionEvent.RAFFLE_RESOLVED, **raffle_event_data(dispute))
             # ------------------------------
         
     return redirect('judges:dashboard')
@@ -879,6 +885,7 @@ def confirm_payment(request, settlement_id):
     if request.method == 'POST':
         settlement.is_paid_to_judge = True
         settlement.save()
+        publish_session_event(settlement.case, SessionEvent.SETTLEMENT_CONFIRMED, **settlement_event_data(settlement))
         
         # New: Official ownership transfer happens here if it was a raffle winner
         target = settlement.asset or settlement.component
@@ -936,7 +943,7 @@ def _allocate_case_stage(request, case_id, stage='assets'):
     targets = []
     
     # 1. Assets (Only those that haven't been split)
-    for asset in case.assets.filter(components__isnull=True):
+    for asset in case.assets.filter(components__isnull=True).select_related('assigned_to'):
         targets.append({
             'kind': 'asset',
             'id': asset.id,
@@ -948,7 +955,7 @@ def _allocate_case_stage(request, case_id, stage='assets'):
         })
         
     # 2. Components
-    for comp in AssetComponent.objects.filter(asset__case=case):
+    for comp in AssetComponent.objects.filter(asset__case=case).select_related('asset', 'assigned_to'):
         targets.append({
             'kind': 'component',
             'id': comp.id,
@@ -1080,175 +1087,69 @@ def allocate_heirs(request, case_id):
     if request.method == 'POST':
         action = request.POST.get('action')
         if action == 'save_allocation':
-            # 1. Validation Step: Ensure allocations match shares
-            proposed_allocations = {heir.id: 0.0 for heir in case.heirs.all()}
-            res_ass_ids = case.obligation_allocations.filter(asset__isnull=False).values_list('asset_id', flat=True)
-            res_cmp_ids = case.obligation_allocations.filter(component__isnull=False).values_list('component_id', flat=True)
-
-            for key, val in request.POST.items():
-                if val:
-                    if key.startswith('asset_'):
-                        a_id = key.replace('asset_', '')
-                        if int(a_id) not in res_ass_ids:
-                             asset_obj = Asset.objects.get(id=a_id)
-                             proposed_allocations[int(val)] += float(asset_obj.value)
-                    elif key.startswith('comp_'):
-                        c_id = key.replace('comp_', '')
-                        if int(c_id) not in res_cmp_ids:
-                             comp_obj = AssetComponent.objects.get(id=c_id)
-                             proposed_allocations[int(val)] += float(comp_obj.value)
-
-            has_errors = False
-            for heir in case.heirs.all():
-                m_share = request.POST.get(f'value_{heir.id}')
-                target_share = float(m_share) if m_share else float(heir.share_value)
-                if round(proposed_allocations[heir.id], 2) != round(target_share, 2):
-                    messages.error(request, f"خطأ في تخصيص الوريث {heir.name}: إجمالي ما تم تخصيصه للوريث ({round(proposed_allocations[heir.id], 2)}) لا يساوي نصيبه الشرعي ({round(target_share, 2)}).")
-                    has_errors = True
-
-            if has_errors:
+            allocation = load_heir_allocation(case, request.POST)
+            errors = get_heir_allocation_errors(allocation)
+            if errors:
+                for error in errors:
+                    messages.error(request, error)
                 return redirect('judges:allocate_heirs', case_id=case.id)
 
-            # 2. Validation Passed. Perform Save ---
-            # (Keeping existing save logic below, properly indented)
-            case.assets.exclude(id__in=res_ass_ids).update(assigned_to=None)
-            AssetComponent.objects.filter(asset__case=case).exclude(id__in=res_cmp_ids).update(assigned_to=None)
-            
-            # Save new assignments
-            for key, val in request.POST.items():
-                if val:
-                    if key.startswith('asset_'):
-                        a_id = key.replace('asset_', '')
-                        Asset.objects.filter(id=a_id, case=case).exclude(id__in=res_ass_ids).update(assigned_to_id=val)
-                    elif key.startswith('comp_'):
-                        c_id = key.replace('comp_', '')
-                        AssetComponent.objects.filter(id=c_id).exclude(id__in=res_cmp_ids).update(assigned_to_id=val)
-
-            # Update Heir shares and notes
-            for heir in case.heirs.all():
-                m_share = request.POST.get(f'value_{heir.id}')
-                m_desc = request.POST.get(f'desc_{heir.id}')
-                if m_share:
-                    heir.share_value = Decimal(str(m_share))
-                if m_desc:
-                    heir.allocation_description = m_desc
-                
-                sum_a = heir.allocated_assets.aggregate(t=Sum('value'))['t'] or Decimal('0')
-                sum_c = heir.allocated_components.aggregate(t=Sum('value'))['t'] or Decimal('0')
-                heir.allocated_share = sum_a + sum_c
-                heir.save()
-
+            save_heir_allocation(case, allocation)
             messages.success(request, "تم حفظ تخصيصات الورثة بنجاح.")
             return redirect('judges:allocate_heirs', case_id=case.id)
 
+        elif action == 'apply_suggested_allocation':
+            proposal = build_optimal_allocation(case)
+            # Apply only the proposal the judge previewed; estate data may have changed since.
+            if optimal_allocation_fingerprint(proposal) != request.POST.get('suggestion_fingerprint'):
+                messages.error(request, "تغيّر التوزيع المقترح منذ عرضه. يرجى مراجعة الاقتراح المحدّث قبل اعتماده.")
+                return redirect(f"{reverse('judges:allocate_heirs', args=[case.id])}?suggest=1")
+            apply_optimal_allocation(case, proposal, request.user)
+            messages.success(request, f"تم اعتماد التوزيع المقترح. إجمالي الفروقات النقدية بين الورثة: {proposal['settlement_total']} ر.س.")
+            return redirect('judges:allocate_heirs', case_id=case.id)
+
         elif action == 'reset_allocation':
             res_ass_ids = case.obligation_allocations.filter(asset__isnull=False).values_list('asset_id', flat=True)
             res_cmp_ids = case.obligation_allocations.filter(component__isnull=False).values_list('component_id', flat=True)
             case.assets.exclude(id__in=res_ass_ids).update(assigned_to=None)
             AssetComponent.objects.filter(asset__case=case).exclude(id__in=res_cmp_ids).update(assigned_to=None)
             case.heirs.all().update(allocated_share=0)
+            get_unpaid_suggested_settlements(case).delete()
             messages.success(request, "تمت إعادة تعيين التوزيعات بنجاح.")
             return redirect('judges:allocate_heirs', case_id=case.id)
 
         elif action == 'publish_session':
-            if PaymentSettlement.objects.filter(case=case, is_delivered_to_owner=False).exists():
+            if get_publish_blocking_settlements(case).exists():
                 messages.error(request, "لا يمكن الاعتماد لوجود مبالغ معلقة لم تكتمل دورتها.")
                 return redirect('judges:allocate_heirs', case_id=case.id)
             
             # --- AUTO-SAVE & VALIDATE CURRENT SELECTIONS BEFORE PUBLISHING ---
             with transaction.atomic():
-                # 0. Validation Step: Ensure allocations match shares
-                proposed_allocations = {heir.id: 0.0 for heir in case.heirs.all()}
-                res_ass_ids = case.obligation_allocations.filter(asset__isnull=False).values_list('asset_id', flat=True)
-                res_cmp_ids = case.obligation_allocations.filter(component__isnull=False).values_list('component_id', flat=True)
-
-                for key, val in request.POST.items():
-                    if val:
-                        if key.startswith('asset_'):
-                            a_id = key.replace('asset_', '')
-                            if int(a_id) not in res_ass_ids:
-                                 asset_obj = Asset.objects.get(id=a_id)
-                                 proposed_allocations[int(val)] += float(asset_obj.value)
-                        elif key.startswith('comp_'):
-                            c_id = key.replace('comp_', '')
-                            if int(c_id) not in res_cmp_ids:
-                                 comp_obj = AssetComponent.objects.get(id=c_id)
-                                 proposed_allocations[int(val)] += float(comp_obj.value)
-
-                has_errors = False
-                for heir in case.heirs.all():
-                    m_share = request.POST.get(f'value_{heir.id}')
-                    target_share = float(m_share) if m_share else float(heir.share_value)
-                    
-                    if not heir.is_blocked and (target_share <= 0):
-                         messages.error(request, f"خطأ في بيانات الوريث {heir.name}: النصيب الشرعي غير محتسب.")
-                         has_errors = True
-                    
-                    if round(proposed_allocations[heir.id], 2) != round(target_share, 2):
-                        messages.error(request, f"خطأ في تخصيص الوريث {heir.name}: إجمالي ما تم تخصيصه ({round(proposed_allocations[heir.id], 2)}) لا يساوي نصيبه الشرعي ({round(target_share, 2)}).")
-                        has_errors = True
-
-                if has_errors:
+                # 1. Validation: allocations must match shares, and no heir may be published with a zero share
+                allocation = load_heir_allocation(case, request.POST)
+                errors = get_heir_allocation_errors(allocation, require_shares=True)
+                if errors:
+                    for error in errors:
+                        messages.error(request, error)
                     transaction.set_rollback(True)
                     return redirect('judges:allocate_heirs', case_id=case.id)
 
-                # 1. Clear existing assignments (unburdened by obligations)
-                res_ass_ids = case.obligation_allocations.filter(asset__isnull=False).values_list('asset_id', flat=True)
-                res_cmp_ids = case.obligation_allocations.filter(component__isnull=False).values_list('component_id', flat=True)
-                case.assets.exclude(id__in=res_ass_ids).update(assigned_to=None)
-                AssetComponent.objects.filter(asset__case=case).exclude(id__in=res_cmp_ids).update(assigned_to=None)
-                
-                # 2. Save new assignments from POST
-                for key, val in request.POST.items():
-                    if val:
-                        if key.startswith('asset_'):
-                            a_id = key.replace('asset_', '')
-                            Asset.objects.filter(id=a_id, case=case).exclude(id__in=res_ass_ids).update(assigned_to_id=val)
-                        elif key.startswith('comp_'):
-                            c_id = key.replace('comp_', '')
-                            AssetComponent.objects.filter(id=c_id).exclude(id__in=res_cmp_ids).update(assigned_to_id=val)
-                
-                # 3. Update Heir shares/notes and calculate allocated_share
-                for heir in case.heirs.all():
-                    m_share = request.POST.get(f'value_{heir.id}')
-                    m_desc = request.POST.get(f'desc_{heir.id}')
-                    if m_share and m_share.strip():
-                        try:
-                            heir.share_value = Decimal(str(m_share))
-                        except: pass # Keep old value on error
-                    if m_desc:
-                        heir.allocation_description = m_desc
-                    
-                    # --- SAFETY CHECK: Don't allow publishing with zero share ---
-                    if not heir.is_blocked and (heir.share_value is None or heir.share_value <= 0):
-                         messages.error(request, f"خطأ في بيانات الوريث {heir.name}: النصيب الشرعي يساوي صفر. يرجى التأكد من الضغط على زر احتساب المواريث في الصفحة المخصصة.")
-                         transaction.set_rollback(True) # Abort the whole publication
-                         return redirect('judges:allocate_heirs', case_id=case.id)
-
-                    sum_a = heir.allocated_assets.aggregate(t=Sum('value'))['t'] or Decimal('0')
-                    sum_c = heir.allocated_components.aggregate(t=Sum('value'))['t'] or Decimal('0')
-                    heir.allocated_share = sum_a + sum_c
-                    heir.save()
+                # 2. Save assignments, heir shares/notes and allocated_share
+                save_heir_allocation(case, allocation)
 
-                # 4. UNIFIED SELECTION: Populate HeirAssetSelection
+                # 3. UNIFIED SELECTION: Populate HeirAssetSelection
                 HeirAssetSelection.objects.filter(heir__case=case).delete()
-                
-                # Create for assets
-                for asset in case.assets.filter(assigned_to__isnull=False):
-                    HeirAssetSelection.objects.create(
-                        heir=asset.assigned_to,
-                        asset=asset,
-                        status=HeirAssetSelection.SelectionStatus.PENDING
-                    )
-                # Create for components
-                for comp in AssetComponent.objects.filter(asset__case=case, assigned_to__isnull=False):
-                    HeirAssetSelection.objects.create(
-                        heir=comp.assigned_to,
-                        component=comp,
-                        status=HeirAssetSelection.SelectionStatus.PENDING
-                    )
-
-                # 5. Formalize publication
+                HeirAssetSelection.objects.bulk_create([
+                    HeirAssetSelection(heir_id=heir_id, asset_id=asset_id, status=HeirAssetSelection.SelectionStatus.PENDING)
+                    for asset_id, heir_id in case.assets.filter(assigned_to__isnull=False).values_list('id', 'assigned_to_id')
+                ] + [
+                    HeirAssetSelection(heir_id=heir_id, component_id=comp_id, status=HeirAssetSelection.SelectionStatus.PENDING)
+                    for comp_id, heir_id in AssetComponent.objects.filter(
+                        asset__case=case, assigned_to__isnull=False
+                    ).values_list('id', 'assigned_to_id')
+                ])
+
+                # 4. Formalize publication
                 case.status = Case.Status.SESSION_ACTIVE
                 case.save()
 
@@ -1279,6 +1180,30 @@ def allocate_heirs(request, case_id):
     # Components must not be reserved for obligations
     available_components = AssetComponent.objects.filter(asset__case=case).exclude(id__in=reserved_comp_ids)
 
+    # Optional preview of the solver's proposal; radios default to it instead of the saved owner.
+    allocation_suggestion = None
+    suggested_owners = {}
+    if request.GET.get('suggest'):
+        allocation_suggestion = build_optimal_allocation(case)
+        suggested_owners = allocation_suggestion['assignment']
+        allocation_suggestion['fingerprint'] = optimal_allocation_fingerprint(allocation_suggestion)
+        heir_names = {heir.id: heir.name for heir in case.heirs.all()}
+        allocation_suggestion['transfer_rows'] = [
+            {
+                'payer': heir_names.get(transfer['payer'], '-'),
+                'receiver': heir_names.get(transfer['receiver'], 'التركة'),
+                'amount': transfer['amount'],
+            }
+            for transfer in allocation_suggestion['transfers']
+        ]
+
+    allocation_assets = list(available_assets)
+    for asset in allocation_assets:
+        asset.selected_heir_id = suggested_owners.get(f"asset:{asset.id}", asset.assigned_to_id)
+    allocation_components = list(available_components.select_related('asset'))
+    for comp in allocation_components:
+        comp.selected_heir_id = suggested_owners.get(f"component:{comp.id}", comp.assigned_to_id)
+
     # Calculate Distribution Summary for Dashboard Cards
     all_assets_val = case.assets.aggregate(total=Sum('value'))['total'] or Decimal('0.00')
     
@@ -1293,7 +1218,7 @@ def allocate_heirs(request, case_id):
         'reserved_value': res_ass_val + res_cmp_val
     }
 
-    has_pending_payments = PaymentSettlement.objects.filter(case=case, is_delivered_to_owner=False).exists()
+    has_pending_payments = get_publish_blocking_settlements(case).exists()
 
     total_estate_value = sum(a.value for a in case.assets.all())
 
@@ -1303,8 +1228,9 @@ def allocate_heirs(request, case_id):
         'total_estate_value': total_estate_value,
         'total_allocated_all': total_allocated_all,
         'total_remaining_estate': total_estate_value - total_allocated_all,
-        'available_assets': available_assets,
-        'available_components': available_components,
+        'available_assets': allocation_assets,
+        'available_components': allocation_components,
+        'allocation_suggestion': allocation_suggestion,
         'distribution_summary': distribution_summary,
         'has_pending_payments': has_pending_payments,
         'allocation_stage': 'heirs',
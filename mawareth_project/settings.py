@@ -72,10 +72,13 @@ INSTALLED_APPS = [
     'heirs',
     'administration',
     'chat_bot',
+    'jobs',
     'channels',
+    'monitoring',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -90,7 +93,8 @@ ROOT_URLCONF = 'mawareth_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for the request metrics.
+        'BACKEND': 'monitoring.backends.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -109,12 +113,128 @@ TEMPLATES = [
 WSGI_APPLICATION = 'mawareth_project.wsgi.application'
 ASGI_APPLICATION = 'mawareth_project.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+# Channel layer: the in-memory layer only fans out inside one daphne process,
+# so set REDIS_URL (any Redis-compatible server) when running several workers.
+CHANNEL_LAYER_OPTIONS = {
+    "capacity": int(os.environ.get("CHANNEL_LAYER_CAPACITY", 100)),
+    "expiry": int(os.environ.get("CHANNEL_LAYER_EXPIRY", 60)),
+    "group_expiry": int(os.environ.get("CHANNEL_LAYER_GROUP_EXPIRY", 86400)),
+}
+redis_url = os.environ.get("REDIS_URL")
+
+if redis_url:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [redis_url],
+                "prefix": os.environ.get("CHANNEL_LAYER_PREFIX", "mawareth"),
+                **CHANNEL_LAYER_OPTIONS,
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+            "CONFIG": CHANNEL_LAYER_OPTIONS,
+        }
     }
+
+# Per-request SQL query count/time, template time and latency, sent as
+# Server-Timing headers and scraped from /metrics/ (Prometheus text format).
+# Views over their query budget are logged; tests assert budgets with
+# monitoring.testing.QueryBudgetMixin.
+REQUEST_METRICS = {
+    "ENABLED": os.environ.get("REQUEST_METRICS", "True") == "True",
+    "SERVER_TIMING": os.environ.get("REQUEST_METRICS_SERVER_TIMING", "True") == "True",
+    "TOKEN": os.environ.get("METRICS_TOKEN") or None,
+    # Enforced by monitoring.testing.QueryBudgetMixin in each app's tests.
+    "QUERY_BUDGETS": {
+        "judges:allocate_heirs": 30,
+        "heirs:select_assets": 8,
+        "heirs:dashboard": 20,
+    },
+    "DEFAULT_QUERY_BUDGET": int(os.environ.get("DEFAULT_QUERY_BUDGET", 50)),
+}
+
+# Background jobs for long case operations (run workers with `manage.py run_jobs`).
+# EAGER runs jobs inline in the request, for local development without a worker.
+JOB_QUEUE = {
+    "BACKEND": os.environ.get("JOB_QUEUE_BACKEND", "jobs.backends.DatabaseJobBackend"),
+    "OPTIONS": {},
+    "EAGER": os.environ.get("JOB_QUEUE_EAGER", "False") == "True",
+    "MAX_ATTEMPTS": 3,
+    "STALE_AFTER_SECONDS": 600,
+    "HEARTBEAT_SECONDS": 30,
+}
+
+# Chat bot question embeddings. Swap BACKEND for chat_bot.embeddings.LocalEmbeddingBackend
+# to embed on CPU inside the worker (needs sentence-transformers) instead of calling HF.
+CHAT_BOT_EMBEDDINGS = {
+    "BACKEND": os.environ.get("CHAT_BOT_EMBEDDING_BACKEND", "chat_bot.embeddings.RemoteEmbeddingBackend"),
+    "MODEL": os.environ.get("CHAT_BOT_EMBEDDING_MODEL", "BAAI/bge-m3"),
+    "MAX_CHARS": 350,
+    "TIMEOUT": 20,
+    "RETRIES": 2,
+    "MEMORY_CACHE_SIZE": 2048,
+    "DISK_CACHE_PATH": BASE_DIR / "rag" / "embedding_cache.sqlite3",
+    "PRELOAD": os.environ.get("CHAT_BOT_EMBEDDING_PRELOAD", "False") == "True",
+}
+
+CHAT_BOT_LLM = {
+    "MODEL": os.environ.get("CHAT_BOT_LLM_MODEL", "llama-3.3-70b-versatile"),
+    "BASE_URL": os.environ.get("CHAT_BOT_LLM_BASE_URL") or None,
+    "TIMEOUT": 30,
+    "MAX_TOKENS": 1024,
+    "TEMPERATURE": 0.7,
+    "MAX_CONCURRENCY": int(os.environ.get("CHAT_BOT_LLM_MAX_CONCURRENCY", 8)),
+    "QUEUE_TIMEOUT": 10,
+}
+
+# FAISS index for the fiqh library (cosine similarity). "auto" uses an exact flat
+# scan for small corpora, HNSW from HNSW_MIN_VECTORS and IVF-PQ from IVFPQ_MIN_VECTORS.
+# Compare them on the real chunks with `python manage.py benchmark_rag_index`.
+CHAT_BOT_INDEX = {
+    "KIND": os.environ.get("CHAT_BOT_INDEX_KIND", "auto"),
+    "HNSW_MIN_VECTORS": 50000,
+    "IVFPQ_MIN_VECTORS": 1000000,
+    "HNSW_M": 32,
+    "HNSW_EF_CONSTRUCTION": 200,
+    "HNSW_EF_SEARCH": int(os.environ.get("CHAT_BOT_INDEX_EF_SEARCH", 64)),
+    "IVF_NPROBE": int(os.environ.get("CHAT_BOT_INDEX_NPROBE", 16)),
+    "PQ_BYTES": 64,
+    "MAX_TRAINING_VECTORS": 100000,
 }
 
+# Hybrid retrieval: FAISS neighbours and BM25 over normalized Arabic tokens
+# (SQLite FTS5 in rag/chunks.sqlite3), fused by reciprocal rank and re-ranked.
+# "chat_bot.hybrid.CrossEncoderReranker" needs sentence-transformers.
+CHAT_BOT_RETRIEVAL = {
+    "HYBRID": os.environ.get("CHAT_BOT_HYBRID_RETRIEVAL", "True") == "True",
+    "K": 3,
+    "CANDIDATES": 20,
+    "RRF_K": 60,
+    "RERANKER": os.environ.get("CHAT_BOT_RERANKER", "chat_bot.hybrid.TermCoverageReranker"),
+    "RERANKER_OPTIONS": {},
+}
+
+# Questions that list the heirs ("توفي رجل عن زوجة وبنتين...") are computed by
+# calculator.engine; INSTANT returns the table without calling the LLM.
+CHAT_BOT_CALCULATOR = {
+    "ENABLED": os.environ.get("CHAT_BOT_CALCULATOR", "True") == "True",
+    "INSTANT": os.environ.get("CHAT_BOT_CALCULATOR_INSTANT", "True") == "True",
+    "MAX_TOKENS": 400,
+}
+
+CHAT_BOT_ANSWER_CACHE = {
+    "ENABLED": os.environ.get("CHAT_BOT_ANSWER_CACHE", "True") == "True",
+    "PATH": BASE_DIR / "rag" / "answer_cache.sqlite3",
+    "THRESHOLD": float(os.environ.get("CHAT_BOT_ANSWER_CACHE_THRESHOLD", 0.9)),
+    "TTL": 7 * 24 * 3600,
+    "MAX_ENTRIES": 5000,
+    "REQUIRE_SAME_CHUNKS": True,
+}
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
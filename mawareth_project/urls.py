@@ -16,6 +16,8 @@ urlpatterns = [
     path('clerks/', include('clerks.urls')),
     path('heirs/', include('heirs.urls')),
     path('administration/', include('administration.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('metrics/', include('monitoring.urls')),
 
     path('chat/', include('chat_bot.urls')),
     path('sw.js', TemplateView.as_view(template_name='sw.js', content_type='application/javascript'), name='sw.js'),
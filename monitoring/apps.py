@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from .metrics import install_query_recorder
+
+        # Connections are per thread (and reopened per request), so the query
+        # recorder is attached to each one as it is created.
+        connection_created.connect(install_query_recorder, dispatch_uid="monitoring.query_recorder")
@@ -0,0 +1,180 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULT_REQUEST_METRICS = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    # Bearer token for scrapers; without one the endpoint is open to admins only.
+    "TOKEN": None,
+    # URL name -> max SQL queries per request, e.g. {"judges:case_detail": 25}.
+    "QUERY_BUDGETS": {},
+    # Budget for views not listed above; None disables the check.
+    "DEFAULT_QUERY_BUDGET": None,
+    "LATENCY_BUCKETS": (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    "QUERY_BUCKETS": (1, 2, 5, 10, 20, 50, 100, 200),
+}
+
+# Metrics of the request being served; sync_to_async copies the context, so
+# queries run in worker threads are counted against the right request.
+_current = ContextVar("request_metrics", default=None)
+
+
+def get_metrics_settings():
+    return {**DEFAULT_REQUEST_METRICS, **getattr(settings, "REQUEST_METRICS", {})}
+
+
+def query_budget(view_name):
+    config = get_metrics_settings()
+    return config["QUERY_BUDGETS"].get(view_name, config["DEFAULT_QUERY_BUDGET"])
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total = 0.0
+
+    def finish(self, view_name):
+        self.view_name = view_name
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ", ".join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f"tpl;dur={self.template_time * 1000:.1f}",
+            f"total;dur={self.total * 1000:.1f}",
+        ])
+
+
+def current_metrics():
+    return _current.get()
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Per-process aggregates by URL name. Each worker keeps its own counters,
+    as with any Prometheus client without a shared store; scrape every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = {}
+        self.views = {}
+
+    def observe(self, view_name, method, status, metrics):
+        config = get_metrics_settings()
+        with self._lock:
+            key = (view_name, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            view = self.views.get(view_name)
+            if view is None:
+                view = self.views[view_name] = {
+                    "latency": Histogram(config["LATENCY_BUCKETS"]),
+                    "queries": Histogram(config["QUERY_BUCKETS"]),
+                    "db_seconds": 0.0,
+                    "template_seconds": 0.0,
+                }
+            view["latency"].observe(metrics.total)
+            view["queries"].observe(metrics.queries)
+            view["db_seconds"] += metrics.db_time
+            view["template_seconds"] += metrics.template_time
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP mawareth_http_requests_total Requests served, by URL name, method and status.",
+                "# TYPE mawareth_http_requests_total counter",
+            ]
+            for (view_name, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f"mawareth_http_requests_total{_labels(view=view_name, method=method, status=status)} {count}"
+                )
+            lines += self._histogram("mawareth_http_request_duration_seconds",
+                                     "Time to produce the response (headers, for streaming responses).", "latency")
+            lines += self._histogram("mawareth_db_queries_per_request", "SQL queries per request.", "queries")
+            lines += self._counter("mawareth_db_query_seconds_total", "Time spent in SQL queries.", "db_seconds")
+            lines += self._counter("mawareth_template_render_seconds_total", "Time spent rendering templates.",
+                                   "template_seconds")
+        return "\n".join(lines) + "\n"
+
+    def _histogram(self, name, help_text, field):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for view_name, view in sorted(self.views.items()):
+            histogram = view[field]
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{name}_bucket{_labels(view=view_name, le=_number(bound))} {count}")
+            lines.append(f"{name}_bucket{_labels(view=view_name, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(view=view_name)} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{_labels(view=view_name)} {histogram.count}")
+        return lines
+
+    def _counter(self, name, help_text, field):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for view_name, view in sorted(self.views.items()):
+            lines.append(f"{name}{_labels(view=view_name)} {_number(view[field])}")
+        return lines
+
+
+registry = MetricsRegistry()
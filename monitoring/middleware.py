@@ -0,0 +1,62 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import end_request, get_metrics_settings, query_budget, registry, start_request
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records SQL query count and time, template render time and total latency
+    per request; adds them as a Server-Timing header and to the /metrics/
+    aggregates. Keep it first in MIDDLEWARE so the total covers the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_metrics_settings()["ENABLED"]:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.process(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.process(request, response, metrics)
+
+    def process(self, request, response, metrics):
+        match = request.resolver_match
+        metrics.finish(match.view_name if match else "unresolved")
+        registry.observe(metrics.view_name, request.method, response.status_code, metrics)
+        if get_metrics_settings()["SERVER_TIMING"]:
+            response["Server-Timing"] = metrics.server_timing()
+        # Read by QueryBudgetMixin through the test client's response.
+        response.request_metrics = metrics
+
+        budget = query_budget(metrics.view_name)
+        if budget is not None and metrics.queries > budget:
+            logger.warning(
+                "%s ran %d SQL queries (budget %d) for %s",
+                metrics.view_name, metrics.queries, budget, request.path,
+            )
+        return response
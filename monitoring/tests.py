@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from users.models import User
+
+from .metrics import MetricsRegistry, RequestMetrics, registry
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_renders_cumulative_histograms_and_escaped_labels(self):
+        metrics = RequestMetrics()
+        metrics.queries = 3
+        metrics.db_time = 0.02
+        metrics.finish('cases:"odd"')
+        metrics.total = 0.03
+
+        aggregates = MetricsRegistry()
+        aggregates.observe(metrics.view_name, "GET", 200, metrics)
+        aggregates.observe(metrics.view_name, "GET", 200, metrics)
+        text = aggregates.render()
+
+        self.assertIn('mawareth_http_requests_total{view="cases:\\"odd\\"",method="GET",status="200"} 2', text)
+        self.assertIn('mawareth_db_queries_per_request_bucket{view="cases:\\"odd\\"",le="2"} 0', text)
+        self.assertIn('mawareth_db_queries_per_request_bucket{view="cases:\\"odd\\"",le="5"} 2', text)
+        self.assertIn('mawareth_db_queries_per_request_bucket{view="cases:\\"odd\\"",le="+Inf"} 2', text)
+        self.assertIn('mawareth_db_queries_per_request_sum{view="cases:\\"odd\\""} 6', text)
+        self.assertIn("# TYPE mawareth_http_request_duration_seconds histogram", text)
+        self.assertTrue(text.endswith("\n"))
+
+
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role=User.Role.ADMIN)
+        cls.judge = User.objects.create_user("judge", password="x", role=User.Role.JUDGE)
+
+    def setUp(self):
+        registry.reset()
+        self.url = reverse("monitoring:metrics")
+
+    def test_admin_gets_prometheus_text(self):
+        self.client.force_login(self.admin)
+        self.client.get(self.url, secure=True)
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        body = response.content.decode()
+        # The first request is recorded once its response is done, so the second one reports it.
+        self.assertIn('mawareth_http_requests_total{view="monitoring:metrics",method="GET",status="200"} 1', body)
+        self.assertIn('mawareth_http_request_duration_seconds_count{view="monitoring:metrics"} 1', body)
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    def test_other_users_are_refused(self):
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 403)
+        self.client.force_login(self.judge)
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 403)
+
+    @override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, "TOKEN": "scrape-token"})
+    def test_token_replaces_the_admin_check(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 403)
+        self.client.logout()
+        wrong = self.client.get(self.url, secure=True, HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(wrong.status_code, 403)
+        response = self.client.get(self.url, secure=True, HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE mawareth_http_requests_total counter", response.content.decode())
@@ -0,0 +1,16 @@
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .metrics import get_metrics_settings, registry
+
+
+def metrics(request):
+    """Prometheus text exposition of this worker's request metrics."""
+    token = get_metrics_settings()["TOKEN"]
+    if token:
+        allowed = constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = request.user.is_authenticated and request.user.role == "ADMIN"
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
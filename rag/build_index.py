@@ -1,111 +1,235 @@
-import os
+import argparse
+import hashlib
 import json
-import numpy as np
-import faiss
+import os
+import sys
+import threading
 import time
-from huggingface_hub import InferenceClient
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 
+# Run as `python rag/build_index.py` from the project root; the embedding
+# backends live in the Django app so queries and the index embed text the same way.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_bot.embeddings import normalize_text  # noqa: E402
+from chat_bot.index_factory import DEFAULT_INDEX, INDEX_KINDS, choose_kind  # noqa: E402
+from chat_bot.index_factory import build_index as build_faiss_index  # noqa: E402
+from chat_bot.chunk_store import chunk_text, index_lock, write_corpus_store  # noqa: E402
+from django.utils.module_loading import import_string  # noqa: E402
+
 # Load Environment Variables
 load_dotenv()
 
-def build_index():
-    print("Starting RAG Super-Robust Index Build (BGE-M3)...")
-    
-    # 1. Load Chunks
-    json_path = "rag/chunks.json"
-    if not os.path.exists(json_path):
-        print(f"Error: {json_path} not found. Run prepare_data.py first.")
-        return
-        
-    with open(json_path, "r", encoding="utf-8") as f:
-        all_chunks = json.load(f)
-    
-    print(f"Chunks to process: {len(all_chunks)}")
-    
-    # 2. HF Settings
-    hf_token = os.environ.get("HUGGINGFACE_API_KEY")
-    model_id = "BAAI/bge-m3"
-    client = InferenceClient(token=hf_token)
-    
-    embeddings = []
-    valid_chunks = []
-    consecutive_failures = 0
-    
-    for i, chunk in enumerate(all_chunks):
-        # 350 char limit
-        safe_text = chunk[:350]
-        success = False
-        
+CHUNKS_PATH = "rag/chunks.json"
+INDEX_PATH = "rag/index.faiss"
+WORK_DIR = "rag/build"
+BACKENDS = {
+    "remote": "chat_bot.embeddings.RemoteEmbeddingBackend",
+    "local": "chat_bot.embeddings.LocalEmbeddingBackend",
+}
+
+
+class RateLimiter:
+    """Spaces request starts so all workers together stay under `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """
+    Vectors already embedded for one chunks.json + model, kept in memory-mapped
+    .npy files under rag/build/<fingerprint>/ so an interrupted run resumes
+    where it stopped instead of starting over.
+    """
+
+    def __init__(self, work_dir, chunks, model, max_chars):
+        digest = hashlib.sha256()
+        digest.update(f"{model}\0{max_chars}\0".encode("utf-8"))
+        for chunk in chunks:
+            digest.update(chunk_text(chunk).encode("utf-8") + b"\0")
+        self.path = os.path.join(work_dir, digest.hexdigest()[:16])
+        self.size = len(chunks)
+        self.vectors = None
+        os.makedirs(self.path, exist_ok=True)
+
+        done_path = os.path.join(self.path, "done.npy")
+        if os.path.exists(done_path):
+            self.done = np.load(done_path, mmap_mode="r+")
+        else:
+            self.done = np.lib.format.open_memmap(done_path, mode="w+", dtype=np.bool_, shape=(self.size,))
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        if os.path.exists(vectors_path):
+            self.vectors = np.load(vectors_path, mmap_mode="r+")
+
+    def pending(self):
+        return np.flatnonzero(~np.asarray(self.done)).tolist()
+
+    def write(self, rows, matrix):
+        if self.vectors is None:
+            # The dimension is only known once the first batch comes back.
+            self.vectors = np.lib.format.open_memmap(
+                os.path.join(self.path, "vectors.npy"), mode="w+", dtype=np.float32, shape=(self.size, matrix.shape[1])
+            )
+        self.vectors[rows] = matrix
+        self.done[rows] = True
+
+    def flush(self):
+        # Vectors reach disk before the flags that claim them.
+        if self.vectors is not None:
+            self.vectors.flush()
+        self.done.flush()
+
+
+def batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def embed_pending(backend, chunks, checkpoint, batch_size, workers, rate, max_failures):
+    pending = checkpoint.pending()
+    print(f"Already embedded: {checkpoint.size - len(pending)}/{checkpoint.size}. Pending: {len(pending)}")
+    if not pending:
+        return 0
+
+    limiter = RateLimiter(rate)
+
+    def embed(rows):
+        texts = [normalize_text(chunk_text(chunks[row]), backend.max_chars) for row in rows]
         for attempt in range(3):
-            try:
-                # Use feature_extraction from InferenceClient
-                vector = client.feature_extraction(safe_text, model=model_id)
-                
-                # Validation: check if it's a numeric list or numpy array
-                if hasattr(vector, 'tolist'): vector = vector.tolist()
-                
-                if isinstance(vector, list) and len(vector) > 0:
-                    # Sometimes returns [[vector]], flatten if needed
-                    if isinstance(vector[0], list):
-                        vector = vector[0]
-                        if isinstance(vector[0], list): # deeper?
-                            vector = vector[0]
-
-                    # Final check: is it numeric?
-                    if len(vector) > 0 and isinstance(vector[0], (int, float)):
-                        embeddings.append(vector)
-                        valid_chunks.append(chunk)
-                        success = True
-                        consecutive_failures = 0
-                        break
-                
-                print(f"Chunk {i}: API returned non-numeric format. Attempt {attempt+1}")
-                time.sleep(2)
-            except Exception as e:
-                if "503" in str(e) or "loading" in str(e).lower():
-                    print(f"Model loading at chunk {i}... waiting 20s")
-                    time.sleep(20)
-                else:
-                    print(f"Error at chunk {i}: {e}")
-                    time.sleep(5)
-        
-        if not success:
-            consecutive_failures += 1
-            print(f"Skipping chunk {i}")
-            if consecutive_failures >= 15:
-                print("Circuit Breaker: Too many consecutive failures. Stopping.")
+            limiter.wait()
+            matrix = backend.embed_batch(texts)
+            if matrix is not None and len(matrix) == len(rows):
+                return rows, matrix
+            time.sleep(2 * (attempt + 1))
+        return rows, None
+
+    work = iter(batches(pending, batch_size))
+    failed = consecutive_failures = finished = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = set()
+        while True:
+            while len(running) < workers * 2:
+                rows = next(work, None)
+                if rows is None:
+                    break
+                running.add(executor.submit(embed, rows))
+            if not running:
                 break
-        
-        if (i + 1) % 10 == 0:
-            print(f"Progress: {i + 1}/{len(all_chunks)} chunks processed...")
 
-    if not embeddings:
+            completed, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                rows, matrix = future.result()
+                if matrix is None:
+                    failed += len(rows)
+                    consecutive_failures += 1
+                    print(f"Skipping batch starting at chunk {rows[0]} ({len(rows)} chunks)")
+                    continue
+                consecutive_failures = 0
+                checkpoint.write(rows, matrix)
+                finished += len(rows)
+            checkpoint.flush()
+
+            elapsed = time.perf_counter() - started
+            print(f"Progress: {finished}/{len(pending)} chunks ({finished / elapsed:.1f}/s), failed: {failed}")
+            if consecutive_failures >= max_failures:
+                print("Circuit Breaker: Too many consecutive failed batches. Stopping; re-run to resume.")
+                for future in running:
+                    future.cancel()
+                break
+    return failed
+
+
+def write_index(checkpoint, chunks, allow_partial, index_kind="auto"):
+    done = np.asarray(checkpoint.done)
+    if not done.any():
         print("Error: No embeddings collected. Build failed.")
-        return
+        return False
+    if not done.all() and not allow_partial:
+        print(f"{int((~done).sum())} chunks still missing. Re-run to resume, or pass --allow-partial.")
+        return False
+
+    rows = np.flatnonzero(done)
+    matrix = np.ascontiguousarray(checkpoint.vectors[rows], dtype=np.float32)
+    kind = choose_kind(len(rows)) if index_kind == "auto" else index_kind
+    print(f"Building FAISS {kind} index (cosine, Dim: {matrix.shape[1]}, vectors: {len(rows)})...")
+    # Ids are positions in chunks.json. The file is left as is, so chunks that
+    # failed to embed keep their positions and the checkpoint for the next run.
+    index = build_faiss_index(matrix, rows, kind=kind, config=DEFAULT_INDEX)
+
+    with index_lock():
+        # Write next to the live files and swap them in, so readers never see half a file.
+        faiss.write_index(index, INDEX_PATH + ".tmp")
+        os.replace(INDEX_PATH + ".tmp", INDEX_PATH)
+        # The rebuilt index only covers the corpus; uploaded books are re-added by sync_fiqh_books.
+        write_corpus_store(chunks, positions=rows.tolist())
+    print("Uploaded fiqh books are not part of this build. Run `python manage.py sync_fiqh_books` to re-add them.")
+    print(f"SUCCESS! Indexed {len(rows)} chunks.")
+    return True
+
+
+def build_index(backend="remote", model="BAAI/bge-m3", batch_size=32, workers=4, rate=5.0,
+                max_chars=350, max_failures=5, allow_partial=False, index_kind="auto"):
+    print(f"Starting batched RAG index build ({model})...")
+
+    # 1. Load Chunks
+    if not os.path.exists(CHUNKS_PATH):
+        print(f"Error: {CHUNKS_PATH} not found. Run prepare_data.py first.")
+        return False
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        all_chunks = json.load(f)
+    print(f"Chunks to process: {len(all_chunks)}")
+
+    # 2. Embed whatever the checkpoint does not have yet
+    backend_class = import_string(BACKENDS.get(backend, backend))
+    embedder = backend_class(model, max_chars=max_chars, timeout=60, retries=2)
+    checkpoint = Checkpoint(WORK_DIR, all_chunks, model, max_chars)
+    print(f"Checkpoint: {checkpoint.path}")
+    embed_pending(embedder, all_chunks, checkpoint, batch_size, workers, rate, max_failures)
 
     # 3. Build Index
-    print(f"Processing {len(embeddings)} valid vectors...")
-    try:
-        lengths = [len(v) for v in embeddings]
-        common_len = max(set(lengths), key=lengths.count)
-        
-        final_embeddings = [v for v in embeddings if len(v) == common_len]
-        final_chunks = [c for c, v in zip(valid_chunks, embeddings) if len(v) == common_len]
-        
-        matrix = np.array(final_embeddings).astype('float32')
-        print(f"Building FAISS Index (Dim: {common_len})...")
-        
-        index = faiss.IndexFlatL2(common_len)
-        index.add(matrix)
-        
-        faiss.write_index(index, "rag/index.faiss")
-        with open("rag/chunks.json", "w", encoding="utf-8") as f:
-            json.dump(final_chunks, f, ensure_ascii=False)
-            
-        print(f"SUCCESS! Indexed {len(final_chunks)} chunks.")
-    except Exception as e:
-        print(f"Finalization Error: {e}")
+    return write_index(checkpoint, all_chunks, allow_partial, index_kind)
+
 
 if __name__ == "__main__":
-    build_index()
+    parser = argparse.ArgumentParser(description="Embed rag/chunks.json in batches and build rag/index.faiss.")
+    parser.add_argument("--backend", default="remote", help="remote, local, or a dotted backend class path.")
+    parser.add_argument("--model", default=os.environ.get("CHAT_BOT_EMBEDDING_MODEL", "BAAI/bge-m3"))
+    parser.add_argument("--batch-size", type=int, default=32, help="Chunks per request / forward pass.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests (use 1 for the local backend).")
+    parser.add_argument("--rate", type=float, default=5.0, help="Maximum requests per second across workers (0 = no limit).")
+    parser.add_argument("--max-chars", type=int, default=350)
+    parser.add_argument("--max-failures", type=int, default=5, help="Consecutive failed batches before stopping.")
+    parser.add_argument("--allow-partial", action="store_true", help="Build the index even if some chunks failed.")
+    parser.add_argument("--index-kind", default="auto", choices=("auto",) + INDEX_KINDS,
+                        help="auto: flat below 50k chunks, HNSW below 1M, IVF-PQ above.")
+    args = parser.parse_args()
+
+    ok = build_index(
+        backend=args.backend,
+        model=args.model,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        rate=args.rate,
+        max_chars=args.max_chars,
+        max_failures=args.max_failures,
+        allow_partial=args.allow_partial,
+        index_kind=args.index_kind,
+    )
+    sys.exit(0 if ok else 1)
@@ -1,46 +1,65 @@
+import argparse
 import os
-import fitz
+import sys
 import json
+from concurrent.futures import ProcessPoolExecutor
+
+# Run as `python rag/prepare_data.py` from the project root; chunking is shared
+# with the incremental book ingestion in the chat_bot app.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_bot.chunking import CHUNK_MAX_CHARS, CHUNK_TOKENS, OVERLAP_TOKENS  # noqa: E402
+from chat_bot.chunking import chunk_paragraphs, iter_paragraphs  # noqa: E402
 
 # المجلد الذي يحتوي على ملفات PDF
 DATA_FOLDER = "knowledg_pdf"
+CHUNKS_PATH = "rag/chunks.json"
+
 
-def extract_text_from_folder(folder_path):
-    all_chunks = []
-    if not os.path.exists(folder_path):
-        print(f"Error: Folder '{folder_path}' not found!")
-        return []
-        
-    for filename in os.listdir(folder_path):
+def iter_folder_chunks(folder_path, executor, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS,
+                       max_chars=CHUNK_MAX_CHARS):
+    """Chunks of every PDF in the folder, one book after another, pages extracted in parallel."""
+    for filename in sorted(os.listdir(folder_path)):
         if filename.endswith(".pdf"):
             path = os.path.join(folder_path, filename)
             print(f"Processing: {filename}")
             try:
-                doc = fitz.open(path)
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-
-                words = text.split()
-                # 80 words for safety
-                chunk_size = 80
-
-                for i in range(0, len(words), chunk_size):
-                    chunk = " ".join(words[i:i+chunk_size])
-                    if len(chunk.strip()) > 10:
-                        all_chunks.append(chunk)
+                yield from chunk_paragraphs(iter_paragraphs(path, executor), document=filename,
+                                            max_tokens=max_tokens, overlap_tokens=overlap_tokens, max_chars=max_chars)
             except Exception as e:
                 print(f"Error reading {filename}: {e}")
-    return all_chunks
+
+
+def write_chunks(chunks, path=CHUNKS_PATH):
+    """Stream chunks into a JSON array without holding the corpus in memory; returns the count."""
+    count = 0
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("[")
+        for chunk in chunks:
+            f.write(",\n" if count else "\n")
+            json.dump(chunk, f, ensure_ascii=False)
+            count += 1
+        f.write("\n]")
+    os.replace(path + ".tmp", path)
+    return count
+
 
 if __name__ == "__main__":
-    print("Cleaning old chunks...")
-    if not os.path.exists("rag"):
-        os.makedirs("rag", exist_ok=True)
-        
-    chunks = extract_text_from_folder(DATA_FOLDER)
-    
-    with open("rag/chunks.json", "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False)
-
-    print(f"Created {len(chunks)} chunks in rag/chunks.json")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split the fiqh PDFs into rag/chunks.json.")
+    parser.add_argument("--folder", default=DATA_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes extracting pages.")
+    parser.add_argument("--max-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=OVERLAP_TOKENS)
+    parser.add_argument("--max-chars", type=int, default=CHUNK_MAX_CHARS,
+                        help="Keep at or below the embedding MAX_CHARS so chunks are embedded whole.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.folder):
+        print(f"Error: Folder '{args.folder}' not found!")
+        sys.exit(1)
+    os.makedirs("rag", exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        total = write_chunks(iter_folder_chunks(args.folder, executor, args.max_tokens, args.overlap_tokens,
+                                                args.max_chars))
+
+    print(f"Created {total} chunks in {CHUNKS_PATH}")
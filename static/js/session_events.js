@@ -0,0 +1,143 @@
+// Live session deltas pushed over the session websocket (see cases/realtime.py).
+// Pages that already own a session socket pass messages to handle(); pages
+// without one call connect().
+(function () {
+    const ITEM_LABELS = { asset: 'الأصل', component: 'العينة' };
+    const STATUS_LABELS = {
+        PENDING: 'بانتظار الرد',
+        ACCEPTED: 'تم التنازل',
+        RAFFLE_REQUIRED: 'أحيل للقرعة',
+        CANCELED: 'ملغي',
+    };
+
+    function itemLabel(data) {
+        return `${ITEM_LABELS[data.item_type] || 'العنصر'} #${data.item_id}`;
+    }
+
+    function describe(event, data) {
+        switch (event) {
+            case 'selection_added':
+                return `${data.heir_name} اختار ${itemLabel(data)}`;
+            case 'selection_removed':
+                return `${data.heir_name} ألغى اختيار ${itemLabel(data)}`;
+            case 'conflict_created':
+                return `طلب تنازل جديد على ${itemLabel(data)}`;
+            case 'conflict_resolved':
+                return `تحديث طلب التنازل على ${itemLabel(data)}: ${STATUS_LABELS[data.status] || data.status}`;
+            case 'raffle_resolved':
+                return `نتيجة القرعة على ${itemLabel(data)}: الفائز ${data.winner_name || '-'}`;
+            case 'settlement_confirmed':
+                return `تم تحديث تسوية مالية بقيمة ${data.amount} ريال`;
+            default:
+                return '';
+        }
+    }
+
+    function involvesHeir(event, data, heirId) {
+        if (!heirId) {
+            return true;
+        }
+        const ids = [data.heir_id, data.owner_heir_id, data.requesting_heir_id, data.winner_id, data.payer_id, data.receiver_id];
+        return ids.some((id) => String(id) === String(heirId));
+    }
+
+    function updateItemPicks(data, added, heirId) {
+        if (String(data.heir_id) === String(heirId)) {
+            return;
+        }
+        document.querySelectorAll(`[data-session-item="${data.item_type}-${data.item_id}"]`).forEach((el) => {
+            const picks = JSON.parse(el.dataset.sessionPicks || '{}');
+            if (added) {
+                picks[data.heir_id] = data.heir_name;
+            } else {
+                delete picks[data.heir_id];
+            }
+            el.dataset.sessionPicks = JSON.stringify(picks);
+
+            let note = el.querySelector('.session-live-picks');
+            const names = Object.values(picks);
+            if (!names.length) {
+                if (note) note.remove();
+                return;
+            }
+            if (!note) {
+                note = document.createElement('div');
+                note.className = 'session-live-picks mt-2';
+                note.style.cssText = 'font-size: 0.8rem; color: #f5c46b; background: rgba(245, 196, 107, 0.1); padding: 6px 8px; border-radius: 8px;';
+                (el.querySelector('.card-body') || el).appendChild(note);
+            }
+            note.textContent = `اختاره أيضاً الآن: ${names.join('، ')}`;
+        });
+    }
+
+    function pushFeed(text) {
+        const feed = document.getElementById('session-live-feed');
+        if (!feed || !text) {
+            return;
+        }
+        const entry = document.createElement('div');
+        entry.className = feed.dataset.entryClass || 'session-live-entry';
+        entry.style.cssText = feed.dataset.entryStyle || '';
+        entry.textContent = text;
+        feed.prepend(entry);
+        while (feed.children.length > 8) {
+            feed.lastElementChild.remove();
+        }
+    }
+
+    function showRefreshBanner(text) {
+        let banner = document.getElementById('session-live-banner');
+        if (!banner) {
+            banner = document.createElement('div');
+            banner.id = 'session-live-banner';
+            banner.style.cssText = 'position: fixed; bottom: 20px; left: 50%; transform: translateX(-50%); z-index: 2000; display: flex; gap: 12px; align-items: center; padding: 12px 18px; border-radius: 16px; background: rgba(20,20,20,0.95); border: 1px solid rgba(212,175,55,0.4); color: #fff; box-shadow: 0 12px 30px rgba(0,0,0,0.35);';
+            const label = document.createElement('span');
+            label.className = 'session-live-banner-text';
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'btn btn-sm btn-warning';
+            button.textContent = 'تحديث الصفحة';
+            button.addEventListener('click', () => window.location.reload());
+            banner.append(label, button);
+            document.body.appendChild(banner);
+        }
+        banner.querySelector('.session-live-banner-text').textContent = text;
+    }
+
+    function handle(message, options = {}) {
+        if (!message || message.type !== 'session_event') {
+            return false;
+        }
+        const { event, data } = message;
+        const text = describe(event, data);
+
+        if (event === 'selection_added' || event === 'selection_removed') {
+            updateItemPicks(data, event === 'selection_added', options.heirId);
+        } else if (involvesHeir(event, data, options.heirId)) {
+            showRefreshBanner(text);
+        }
+        pushFeed(text);
+        document.dispatchEvent(new CustomEvent('mawareth:session-event', { detail: message }));
+        return true;
+    }
+
+    function connect(sessionLink, options = {}) {
+        const wsScheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        let retryDelay = 1000;
+
+        function open() {
+            const socket = new WebSocket(`${wsScheme}://${window.location.host}/ws/session/${sessionLink}/`);
+            socket.onopen = () => { retryDelay = 1000; };
+            socket.onmessage = (e) => handle(JSON.parse(e.data), options);
+            socket.onclose = () => {
+                window.setTimeout(open, retryDelay);
+                retryDelay = Math.min(retryDelay * 2, 30000);
+            };
+            return socket;
+        }
+
+        return open();
+    }
+
+    window.MawarethSessionEvents = { handle, connect };
+})();